@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+# Runner asyncio para main.py: solapa la escritura de archivos con el cómputo.
+#
+# - La lectura del dataset (CSV, comprimido, JSONL o SQLite; ver utils.readers) se hace por chunks
+#   en un hilo aparte, con una cola acotada de prefetch. Las preguntas necesitan el catálogo
+#   entero, así que el cómputo arranca recién cuando termina la lectura (no se solapan).
+# - Las preguntas corren (vía scheduler) en un executor de un solo hilo (pyplot no es thread-safe,
+#   así que todo el cómputo y el render quedan serializados en ese hilo).
+# - Las figuras se renderizan a bytes en memoria (ps.figure_sink) y se encolan; una corrutina
+#   las escribe a disco desde un pool de I/O mientras la pregunta siguiente ya está calculando.
+#   Solo se solapa la escritura de PNGs: los CSV los escribe cada pregunta en el hilo de cómputo.
+# - Al final se reporta cuánto del tiempo de escritura de PNGs cayó dentro de la ejecución de
+#   alguna pregunta (un intervalo por pregunta; las escrituras que quedan para después de la
+#   última pregunta, o que caen mientras se construyen tablas derivadas, no cuentan).
+#
+# Uso:
+#   python main.py --async
+#   python async_runner.py
+
+from __future__ import annotations
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import pandas as pd
+
+import main as pipeline
+import scheduler
+from utils import plot_style as ps
+from utils import readers
+
+CHUNKSIZE = 20000
+PREFETCH_CHUNKS = 4
+IO_WORKERS = 4
+
+
+# Intervalos (tipo, inicio, fin) registrados desde varios hilos
+class _Timeline:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.spans = []
+
+    def add(self, kind: str, start: float, end: float) -> None:
+        with self._lock:
+            self.spans.append((kind, start, end))
+
+    def total(self, kind: str) -> float:
+        return sum(e - s for k, s, e in self.spans if k == kind)
+
+    # Tiempo de 'kind' que cae dentro de algún intervalo de 'other'
+    def overlap(self, kind: str, other: str) -> float:
+        merged = []
+        for s, e in sorted((s, e) for k, s, e in self.spans if k == other):
+            if merged and s <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], e)
+            else:
+                merged.append([s, e])
+        total = 0.0
+        for k, s, e in self.spans:
+            if k != kind:
+                continue
+            for ms, me in merged:
+                total += max(0.0, min(e, me) - max(s, ms))
+        return total
+
+
+def _read_chunks(path: str, chunksize: int, put, columns=None) -> None:
+    try:
+        for chunk in readers.iter_chunks(path, chunksize=chunksize, columns=columns):
+            put(chunk)
+    finally:
+        put(None)
+
+
+async def read_dataset_async(path: str, chunksize: int = CHUNKSIZE, columns=None) -> pd.DataFrame:
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=PREFETCH_CHUNKS)
+
+    def put(item):
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    reader = loop.run_in_executor(None, _read_chunks, path, chunksize, put, columns)
+    chunks = []
+    while (chunk := await queue.get()) is not None:
+        chunks.append(chunk)
+    await reader
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+
+# Escritura atómica (tmp + replace) para no dejar PNGs truncados si el proceso se corta
+def _write_bytes(path: str, data: bytes, timeline: _Timeline) -> None:
+    t0 = time.perf_counter()
+    tmp = f"{path}.tmp-{threading.get_ident()}"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+    timeline.add("io", t0, time.perf_counter())
+
+
+async def _writer(queue: asyncio.Queue, io_pool: ThreadPoolExecutor, timeline: _Timeline) -> int:
+    loop = asyncio.get_running_loop()
+    pending = []
+    while (item := await queue.get()) is not None:
+        path, data = item
+        pending.append(loop.run_in_executor(io_pool, _write_bytes, path, data, timeline))
+    await asyncio.gather(*pending)
+    return len(pending)
+
+
+# Corre una pregunta y registra su intervalo de cómputo
+def _timed(fn, timeline: _Timeline, df: pd.DataFrame, outdir: str, tables=None):
+    t0 = time.perf_counter()
+    try:
+        return fn(df, outdir, tables)
+    finally:
+        timeline.add("compute", t0, time.perf_counter())
+
+
+# Corre todas las preguntas (scheduler DAG) en el hilo de cómputo, con las figuras yendo al sink
+def _run_pipeline(df: pd.DataFrame, outdir: str, questions, sink, timeline: _Timeline) -> dict:
+    scheduled = [(key, partial(_timed, partial(pipeline._run_question, mod, kwargs), timeline), mod.TABLES)
+                 for key, mod, kwargs in (pipeline.QUESTIONS if questions is None else questions)]
+    with ps.figure_sink(sink):
+        res, _ = scheduler.run_scheduled(df, scheduled, outdir)
+    return res
+
+
+async def run_all_async(path: str, outdir: str, questions=None, columns=None) -> tuple:
+    loop = asyncio.get_running_loop()
+    timeline = _Timeline()
+    t_start = time.perf_counter()
+
+    df = await read_dataset_async(path, columns=columns)
+    timeline.add("read", t_start, time.perf_counter())
+
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def sink(outpath: str, data: bytes) -> None:
+        loop.call_soon_threadsafe(queue.put_nowait, (outpath, data))
+
+    with ThreadPoolExecutor(max_workers=1) as compute_pool, ThreadPoolExecutor(max_workers=IO_WORKERS) as io_pool:
+        writer = asyncio.create_task(_writer(queue, io_pool, timeline))
+        try:
+            results = await loop.run_in_executor(compute_pool, _run_pipeline, df, outdir, questions, sink, timeline)
+        finally:
+            queue.put_nowait(None)
+            n_files = await writer
+
+    wall = time.perf_counter() - t_start
+    io_total = timeline.total("io")
+    overlap = timeline.overlap("io", "compute")
+    stats = {
+        "rows": len(df),
+        "files": n_files,
+        "wall_s": wall,
+        "read_s": timeline.total("read"),
+        "compute_s": timeline.total("compute"),
+        "io_s": io_total,
+        "overlap_s": overlap,
+        "overlap_pct": (overlap / io_total * 100.0) if io_total > 0 else 0.0,
+    }
+    return results, stats
+
+
+def report_overlap(stats: dict) -> None:
+    print("[async] Resumen de solapamiento I/O–cómputo:")
+    print(f"  filas leídas:        {stats['rows']}")
+    print(f"  archivos escritos:   {stats['files']}")
+    print(f"  lectura:             {stats['read_s']:.2f}s")
+    print(f"  cómputo (preguntas): {stats['compute_s']:.2f}s")
+    print(f"  escritura de PNGs:   {stats['io_s']:.2f}s")
+    print(f"  PNGs solapados:      {stats['overlap_s']:.2f}s ({stats['overlap_pct']:.0f}%)")
+    print(f"  total (wall):        {stats['wall_s']:.2f}s")
+    print()
+
+
+def main(path: str = pipeline.DATA_PATH, outdir: str = pipeline.OUTDIR, questions=None, columns=None):
+    print()
+    print("Cargando dataset (async, por chunks)...")
+    results, stats = asyncio.run(run_all_async(path, outdir, questions=questions, columns=columns))
+    print(f"Dataset cargado desde '{path}' con {stats['rows']} filas.")
+    print()
+    pipeline.report(results)
+    report_overlap(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+# Modo batch: corre q1–q12 sobre varios snapshots mensuales y compara meses consecutivos.
+#
+# Uso:
+#   python batch.py "snapshots/netflix_*.csv" otro.csv --outdir outputs/batch --workers 4
+#
+# Pipeline:
+# 1. Expandir globs y ordenar snapshots por nombre (se asume orden cronológico)
+# 2. Leer solo 'country' y 'rating' de todos los snapshots, armar el vocabulario conjunto
+#    y precalcular una sola vez los memos de canonicalización (fuzzy match de países, ratings)
+# 3. Correr cada snapshot en paralelo (procesos), con los memos sembrados en cada worker
+# 4. Guardar agregados por snapshot y tablas de diferencias entre snapshots consecutivos
+#
+# Con --store DIR cada snapshot tiene su almacén de tablas derivadas (utils.store) en DIR/<snapshot>:
+# la primera corrida las publica y las siguientes las adjuntan por mmap, sin re-cleaning, mientras
+# el snapshot no cambie.
+#
+# Outputs:
+# - <outdir>/<snapshot>/qN/...                (PNGs de cada pregunta)
+# - <outdir>/<snapshot>/agregados/*.csv       (top países, rankings q7/q8, palabras q10)
+# - <outdir>/diffs/<prev>__<cur>_*.csv        (países nuevos en el top, movimientos q7/q8, cambios q10)
+
+from __future__ import annotations
+import os
+import sys
+import glob
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import main as pipeline
+from utils import cleaning as cl
+from utils import readers
+from utils import store
+
+
+TOP_COUNTRIES = 10
+
+
+def expand_snapshots(patterns) -> list:
+    paths = []
+    for p in patterns:
+        matches = sorted(glob.glob(p))
+        paths.extend(matches if matches else [p])
+    # sin duplicados, respetando el orden
+    return list(dict.fromkeys(paths))
+
+
+def _snapshot_name(path: str) -> str:
+    name = os.path.basename(path)
+    for ext in (".gz", ".zst", ".bz2", ".xz", ".csv", ".jsonl", ".ndjson", ".json", ".sqlite", ".db"):
+        if name.endswith(ext):
+            name = name[: -len(ext)]
+    return name
+
+
+# Vocabulario crudo (tokens sin limpiar) de países y ratings en todos los snapshots
+def _collect_vocabularies(paths) -> tuple:
+    countries, ratings = set(), set()
+    for path in paths:
+        sub = readers.read_frame(path, columns=["country", "rating"])
+        countries.update(sub["country"].dropna().astype(str).str.split(",").explode().unique())
+        ratings.update(sub["rating"].dropna().astype(str).str.split(",").explode().unique())
+    return countries, ratings
+
+
+def _init_worker(caches: dict) -> None:
+    import matplotlib
+    matplotlib.use("Agg")
+    cl.seed_canon_caches(caches)
+
+
+# Corre todas las preguntas sobre un snapshot y devuelve solo los agregados compactos
+def _run_snapshot(path: str, outdir: str, store_root: str | None = None) -> dict:
+    name = _snapshot_name(path)
+    snap_dir = os.path.join(outdir, name)
+    df = pipeline.load_dataset(path)
+    mapped = None
+    if store_root is not None:
+        mapped = store.open_derived_tables(df, os.path.join(store_root, name), store.required_tables(pipeline.QUESTIONS))
+    res, _ = pipeline.run_all_with_stages(df, outdir=snap_dir, store=mapped)
+
+    aggregates = {
+        "countries": res["q3"]["pivot_total"],
+        "directors": res["q7"]["pivot_tipo"]["Total"].sort_values(ascending=False),
+        "actors": res["q8"]["ranking"]["Total"].sort_values(ascending=False),
+        "words": pd.Series(cl.count_words(df["description"]), dtype=int).sort_values(ascending=False),
+    }
+
+    agg_dir = os.path.join(snap_dir, "agregados")
+    os.makedirs(agg_dir, exist_ok=True)
+    for key, table in aggregates.items():
+        table.to_csv(os.path.join(agg_dir, f"{key}.csv"))
+
+    return {"name": name, "rows": len(df), "aggregates": aggregates}
+
+
+# Países que entran al Top-N y variación de totales
+def _diff_countries(prev: pd.DataFrame, cur: pd.DataFrame, topn: int = TOP_COUNTRIES) -> pd.DataFrame:
+    tot = pd.concat([prev["Total"].rename("Total_prev"), cur["Total"].rename("Total_cur")], axis=1).fillna(0).astype(int)
+    tot["delta"] = tot["Total_cur"] - tot["Total_prev"]
+    top_prev = set(prev.index[:topn])
+    top_cur = set(cur.index[:topn])
+    tot["nuevo_en_top"] = tot.index.isin(top_cur - top_prev)
+    tot["sale_del_top"] = tot.index.isin(top_prev - top_cur)
+    tot = tot[tot.index.isin(top_prev | top_cur)]
+    return tot.sort_values(["nuevo_en_top", "Total_cur"], ascending=False)
+
+
+# Movimientos de ranking (1 = primero); NaN si la entidad no estaba en el ranking
+def _diff_ranking(prev: pd.Series, cur: pd.Series) -> pd.DataFrame:
+    rank_prev = pd.Series(range(1, len(prev) + 1), index=prev.index, name="rank_prev")
+    rank_cur = pd.Series(range(1, len(cur) + 1), index=cur.index, name="rank_cur")
+    out = pd.concat([rank_prev, rank_cur, prev.rename("Total_prev"), cur.rename("Total_cur")], axis=1)
+    out["movimiento"] = out["rank_prev"] - out["rank_cur"]
+    return out.sort_values(["rank_cur", "rank_prev"], na_position="last")
+
+
+# Cambios de frecuencia de palabras (absolutos y en proporción del total)
+def _diff_words(prev: pd.Series, cur: pd.Series, topn: int = 50) -> pd.DataFrame:
+    out = pd.concat([prev.rename("freq_prev"), cur.rename("freq_cur")], axis=1).fillna(0).astype(int)
+    out["delta"] = out["freq_cur"] - out["freq_prev"]
+    share_prev = out["freq_prev"] / max(int(out["freq_prev"].sum()), 1)
+    share_cur = out["freq_cur"] / max(int(out["freq_cur"].sum()), 1)
+    out["delta_share"] = share_cur - share_prev
+    order = out["delta_share"].abs().sort_values(ascending=False).index
+    return out.loc[order].head(topn)
+
+
+def compare_snapshots(snapshots: list, outdir: str) -> dict:
+    diff_dir = os.path.join(outdir, "diffs")
+    os.makedirs(diff_dir, exist_ok=True)
+
+    diffs = {}
+    for prev, cur in zip(snapshots, snapshots[1:]):
+        a, b = prev["aggregates"], cur["aggregates"]
+        key = f"{prev['name']}__{cur['name']}"
+        tables = {
+            "paises_top": _diff_countries(a["countries"], b["countries"]),
+            "directores_movimientos": _diff_ranking(a["directors"], b["directors"]),
+            "actores_movimientos": _diff_ranking(a["actors"], b["actors"]),
+            "palabras_cambios": _diff_words(a["words"], b["words"]),
+        }
+        for name, table in tables.items():
+            table.to_csv(os.path.join(diff_dir, f"{key}_{name}.csv"))
+        diffs[key] = tables
+    return diffs
+
+
+def run_batch(paths: list, outdir: str = "outputs/batch", workers: int | None = None,
+              store_root: str | None = None) -> dict:
+    if not paths:
+        raise ValueError("No se encontraron snapshots.")
+
+    countries, ratings = _collect_vocabularies(paths)
+    caches = cl.warm_canon_caches(countries, ratings)
+    print(f"Vocabulario compartido: {len(caches['country'])} países, {len(caches['rating'])} ratings "
+          f"({len(paths)} snapshots)")
+
+    workers = workers or min(len(paths), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(caches,)) as ex:
+        snapshots = list(ex.map(_run_snapshot, paths, [outdir] * len(paths), [store_root] * len(paths)))
+
+    for snap in snapshots:
+        print(f"[batch] {snap['name']}: {snap['rows']} filas")
+
+    diffs = compare_snapshots(snapshots, outdir)
+    return {"snapshots": snapshots, "diffs": diffs}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Corre todas las preguntas sobre varios snapshots y los compara.")
+    parser.add_argument("snapshots", nargs="+", help="Rutas o globs de CSVs (orden cronológico por nombre)")
+    parser.add_argument("--outdir", default=os.path.join(pipeline.OUTDIR, "batch"))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--store", metavar="DIR",
+                        help="Almacén de tablas derivadas por snapshot (se reutiliza mientras el snapshot no cambie)")
+    args = parser.parse_args(argv)
+
+    res = run_batch(expand_snapshots(args.snapshots), outdir=args.outdir, workers=args.workers,
+                    store_root=args.store)
+    for key, tables in res["diffs"].items():
+        print(f"\n[batch] {key}: países nuevos en el top")
+        top = tables["paises_top"]
+        print(top[top["nuevo_en_top"]])
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
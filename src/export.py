@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+# Exportación columnar de todas las tablas que devuelven las preguntas.
+#
+# Recorre el dict de resultados de main.run_all (DataFrames, Series, Index, tuplas de
+# segmentos, dicts anidados), convierte todo a tablas Arrow en memoria y recién después
+# escribe el dataset completo de la corrida en una sola pasada:
+#
+#   <outdir>/export/<run_id>/manifest.json
+#   <outdir>/export/<run_id>/<qN>__<ruta>.parquet    (o .arrow con format="arrow")
+#
+# El directorio se escribe con nombre temporal y se publica con rename, así un dashboard nunca
+# lee una corrida a medias. Los frames "base" (explosiones por fila, no agregados) se omiten
+# salvo include_base=True. Con 'estimate' (corridas con --sample) el manifest marca el dataset
+# como estimación escalada de una muestra, con su fracción y semilla.
+#
+# Uso:
+#   python main.py --export                 (Parquet)
+#   python main.py --export --export-format arrow
+
+from __future__ import annotations
+import os
+import json
+import time
+import shutil
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from utils.results import Result
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+BASE_KEYS = {"base"}
+
+
+def _as_frame(obj) -> pd.DataFrame | None:
+    if isinstance(obj, pd.DataFrame):
+        df = obj
+    elif isinstance(obj, pd.Series):
+        df = obj.to_frame(name=obj.name if obj.name is not None else "value")
+    elif isinstance(obj, pd.Index):
+        df = pd.DataFrame({obj.name or "value": obj.to_numpy()})
+    elif isinstance(obj, dict) and obj and all(pd.api.types.is_scalar(v) for v in obj.values()):
+        df = pd.DataFrame([obj])  # p. ej. q9 stats: una fila con count/mean/median
+    else:
+        return None
+    # Parquet/Arrow exigen nombres de columna string
+    df = df.copy(deep=False)
+    df.columns = [str(c) for c in df.columns]
+    return df
+
+
+# Aplana resultados anidados en {nombre_tabla: DataFrame}
+def collect_tables(results: dict, include_base: bool = False) -> dict:
+    tables = {}
+
+    def visit(obj, path):
+        frame = _as_frame(obj)
+        if frame is not None:
+            tables["__".join(path)] = frame
+        elif isinstance(obj, dict):
+            # en un Result las claves perezosas (frames por fila) se reconstruyen al exportarlas
+            keys = list(obj) + (obj.lazy_keys() if isinstance(obj, Result) else [])
+            for k in keys:
+                if not include_base and k in BASE_KEYS:
+                    continue
+                visit(obj[k], path + [str(k)])
+        elif isinstance(obj, (list, tuple)):
+            for i, v in enumerate(obj):
+                visit(v, path + [f"{i:02d}"])
+
+    for key, res in results.items():
+        visit(res, [key])
+    return tables
+
+
+def _to_arrow(df: pd.DataFrame) -> pa.Table:
+    preserve = not isinstance(df.index, pd.RangeIndex)
+    return pa.Table.from_pandas(df, preserve_index=preserve)
+
+
+def export_results(results: dict, outdir: str, fmt: str = "parquet", run_id: str | None = None,
+                   include_base: bool = False, estimate: dict | None = None) -> str:
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato no soportado: {fmt} (opciones: {sorted(FORMATS)})")
+
+    run_id = run_id or time.strftime("%Y%m%dT%H%M%S")
+    root = os.path.join(outdir, "export")
+    final_dir = os.path.join(root, run_id)
+    if os.path.exists(final_dir):
+        raise FileExistsError(f"Ya existe un export con run_id '{run_id}'.")
+
+    # 1) Conversión completa a Arrow en memoria (si algo falla, no se escribió nada)
+    arrow_tables = {name: _to_arrow(df) for name, df in collect_tables(results, include_base).items()}
+
+    # 2) Escritura en una sola pasada a un directorio temporal
+    os.makedirs(root, exist_ok=True)
+    tmp_dir = os.path.join(root, f".tmp-{run_id}-{uuid.uuid4().hex[:8]}")
+    os.makedirs(tmp_dir)
+    entries = []
+    try:
+        for name, table in arrow_tables.items():
+            fname = name + FORMATS[fmt]
+            path = os.path.join(tmp_dir, fname)
+            if fmt == "parquet":
+                pq.write_table(table, path)
+            else:
+                feather.write_feather(table, path)
+            entries.append({
+                "table": name,
+                "question": name.split("__", 1)[0],
+                "file": fname,
+                "rows": table.num_rows,
+                "columns": {f.name: str(f.type) for f in table.schema},
+            })
+
+        manifest = {
+            "run_id": run_id,
+            "format": fmt,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "tables": entries,
+        }
+        if estimate is not None:
+            manifest["estimate"] = estimate
+        with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh, ensure_ascii=False, indent=2)
+        os.rename(tmp_dir, final_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return final_dir
+
+
+# Lee un export completo de vuelta como {tabla: DataFrame}
+def load_export(path: str) -> dict:
+    with open(os.path.join(path, "manifest.json"), encoding="utf-8") as fh:
+        manifest = json.load(fh)
+    read = pq.read_table if manifest["format"] == "parquet" else feather.read_table
+    return {e["table"]: read(os.path.join(path, e["file"])).to_pandas() for e in manifest["tables"]}
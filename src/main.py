@@ -1,7 +1,22 @@
 # -*- coding: utf-8 -*-
 import os
+import time
+import argparse
+from functools import partial
+
+import numpy as np
 import pandas as pd
 
+import scheduler
+from utils import cleaning as cl
+from utils import dedup
+from utils import derived as dv
+from utils import plot_style as ps
+from utils import schema
+from utils import readers
+from utils import postings
+from utils import bitmaps
+from utils import store
 from questions import q1_proporcion_peliculas_series as q1
 from questions import q2_evolucion_estrenos as q2
 from questions import q3_paises as q3
@@ -12,6 +27,8 @@ from questions import q7_directores as q7
 from questions import q8_actores_populares as q8
 from questions import q9_duracion_contenido as q9
 from questions import q10_palabras as q10
+from questions import q11_colaboraciones as q11
+from questions import q12_lag_catalogo as q12
 
 DATA_PATH = os.getenv(
     "DATA_PATH",
@@ -19,84 +36,457 @@ DATA_PATH = os.getenv(
 )
 OUTDIR = os.getenv("OUTDIR", "outputs")
 
+# (clave, módulo, kwargs extra para run). Cada módulo declara TABLES (tablas derivadas que
+# consume) y COLUMNS (columnas del CSV que necesita).
+QUESTIONS = [
+    ("q1",  q1,  {}),
+    ("q2",  q2,  {}),
+    ("q3",  q3,  {}),
+    ("q4",  q4,  {}),
+    ("q5",  q5,  {}),
+    ("q6",  q6,  {}),
+    ("q7",  q7,  {"topn": 20}),
+    ("q8",  q8,  {}),
+    ("q9",  q9,  {}),
+    ("q10", q10, {"topn": 20}),
+    ("q11", q11, {"topn": 20}),
+    ("q12", q12, {"by": "country"}),
+]
+QUESTION_KEYS = [key for key, _, _ in QUESTIONS]
+
+
+def _parse_keys(value: str | None) -> list:
+    if not value:
+        return []
+    keys = [k.strip().lower() for k in value.split(",") if k.strip()]
+    unknown = [k for k in keys if k not in QUESTION_KEYS]
+    if unknown:
+        raise ValueError(f"Preguntas desconocidas: {unknown} (opciones: {QUESTION_KEYS})")
+    return keys
+
+
+# Filtra QUESTIONS según --only / --skip (listas "q3,q7"), respetando el orden original
+def select_questions(only: str | None = None, skip: str | None = None) -> list:
+    only_keys, skip_keys = _parse_keys(only), _parse_keys(skip)
+    return [q for q in QUESTIONS
+            if (not only_keys or q[0] in only_keys) and q[0] not in skip_keys]
+
+
+def required_columns(questions: list) -> list:
+    cols = []
+    for _, mod, _ in questions:
+        cols.extend(c for c in mod.COLUMNS if c not in cols)
+    return cols
+
+
+# Etapas de cleaning (tablas derivadas) que no hace falta construir para estas preguntas
+def pruned_stages(questions: list) -> list:
+    needed = dv.closure(t for _, mod, _ in questions for t in mod.TABLES)
+    return [t for t in dv.TABLES if t not in needed]
 
-def main():
+
+# CSV plano, .csv.gz / .csv.zst, JSON Lines o SQLite (formato detectado en utils.readers).
+# Con el motor de strings "arrow" el texto queda como string[pyarrow] para los kernels de Arrow.
+def load_dataset(path: str = DATA_PATH, columns: list | None = None) -> pd.DataFrame:
+    df = readers.read_frame(path, columns=columns)
+    if cl.get_string_engine() == "arrow":
+        df = readers.to_arrow_strings(df)
+    return df
+
+
+# Valida el esquema (utils.schema), escribe la cuarentena y resume los problemas encontrados
+def validate_dataset(df: pd.DataFrame, quarantine_path: str | None = None) -> pd.DataFrame:
+    clean, quarantine = schema.validate(df)
+    if quarantine_path is None:
+        name = os.path.splitext(os.path.basename(DATA_PATH))[0]
+        quarantine_path = os.path.join(OUTDIR, "cuarentena", f"{name}_cuarentena.csv")
+    schema.write_quarantine(quarantine, quarantine_path)
+
+    dropped = int((quarantine["accion"] == "descartada").sum())
+    print(f"[schema] {len(quarantine)} filas con problemas: {dropped} descartadas, "
+          f"{len(quarantine) - dropped} con campos anulados. Cuarentena en '{quarantine_path}'.")
+    summary = schema.summarize(quarantine)
+    if not summary.empty:
+        print(summary.to_string())
     print()
-    print("Cargando dataset...")
-    df = pd.read_csv(DATA_PATH)
-    print(f"Dataset cargado desde '{DATA_PATH}' con {len(df)} filas y {len(df.columns)} columnas.")
+    return clean
+
+
+# Marca (o colapsa) casi-duplicados por título + descripción (utils.dedup) y escribe los clusters
+def dedup_dataset(df: pd.DataFrame, mode: str = "flag", threshold: float = dedup.THRESHOLD,
+                  report_path: str | None = None) -> pd.DataFrame:
+    dups = dedup.near_duplicates(df, threshold=threshold)
+    if report_path is None:
+        name = os.path.splitext(os.path.basename(DATA_PATH))[0]
+        report_path = os.path.join(OUTDIR, "dedup", f"{name}_duplicados.csv")
+    os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+    cols = [c for c in ("show_id", "type", "title") if c in df.columns]
+    flagged = df.loc[dups["cluster"] >= 0, cols].join(dups).sort_values(["cluster", "canonica"], ascending=[True, False])
+    flagged.to_csv(report_path, index_label="fila")
+
+    extra = int((~dups["canonica"]).sum())
+    print(f"[dedup] {int(dups['cluster'].max()) + 1} clusters de casi-duplicados (similitud >= {threshold:.2f}), "
+          f"{extra} filas de más. Detalle en '{report_path}'.")
+    if mode == "collapse":
+        df = dedup.collapse(df, dups)
+        print(f"[dedup] Se colapsaron a su fila canónica: quedan {len(df)} filas.")
     print()
+    return df
 
-    # --- Pregunta 1 ----
-    pivot_q1 = q1.run(df, outdir=OUTDIR)
-    print("[Q1] Proporciones (primeras filas):")
-    print(pivot_q1.head())
+
+# Drill-down por entidad (utils.postings): títulos que cumplen la búsqueda, sin explotar ni releer el CSV
+def find_titles(items, root: str | None = None) -> pd.DataFrame:
+    query = postings.parse_query(items)
+    if root is None:
+        name = os.path.splitext(os.path.basename(DATA_PATH))[0]
+        root = os.path.join(OUTDIR, "postings", name)
+    lists = postings.open_postings(DATA_PATH, root)
+
+    t0 = time.perf_counter()
+    rows = postings.query_rows(lists, query)
+    elapsed = (time.perf_counter() - t0) * 1000
+    titles = postings.load_titles(root, rows)
+    desc = " AND ".join(f"{k} in {v}" if len(v) > 1 else f"{k}={v[0]}" for k, v in query.items())
+    print(f"[postings] {desc}: {len(rows)} títulos ({elapsed:.3f} ms)")
+    with pd.option_context("display.width", 160, "display.max_rows", 50):
+        print(titles.to_string() if len(titles) <= 50 else titles)
+    return titles
+
+
+# Recorte por índices bitmap (utils.bitmaps): máscara de las filas de df que cumplen 'query'.
+# 'tables' es el caché de tablas derivadas, para que las preguntas las recorten sin re-cleaning
+def where_mask(df: pd.DataFrame, query: dict, tables: dict | None = None) -> np.ndarray:
+    t0 = time.perf_counter()
+    index = bitmaps.build_bitmaps(df, tables, fields={key for key, _ in query})
+    t1 = time.perf_counter()
+    bits = bitmaps.select(index, query, len(df))
+    elapsed = (time.perf_counter() - t1) * 1000
+    print(f"[bitmaps] {bitmaps.describe(query)}: {bitmaps.count(bits)} de {len(df)} títulos "
+          f"(índices {t1 - t0:.2f}s, filtro {elapsed:.3f} ms)")
     print()
+    return bitmaps.to_mask(bits, len(df))
+
+
+def _run_question(mod, kwargs: dict, df: pd.DataFrame, outdir: str, tables=None):
+    return mod.run(df, outdir=outdir, tables=tables, **kwargs)
+
+
+# Corre las preguntas con el scheduler DAG; devuelve ({clave: resultado}, etapas).
+# 'cache': dict de tablas derivadas que se reutiliza y se conserva (ver scheduler.run_scheduled).
+# 'store': tablas mapeadas de utils.store, que se adjuntan en vez de construirse
+def run_all_with_stages(df: pd.DataFrame, outdir: str = OUTDIR, questions: list | None = None,
+                        cache: dict | None = None, store: dict | None = None) -> tuple:
+    scheduled = [(key, partial(_run_question, mod, kwargs), mod.TABLES)
+                 for key, mod, kwargs in (QUESTIONS if questions is None else questions)]
+    return scheduler.run_scheduled(df, scheduled, outdir, cache=cache, store=store)
+
+
+def run_all(df: pd.DataFrame, outdir: str = OUTDIR, questions: list | None = None) -> dict:
+    return run_all_with_stages(df, outdir, questions)[0]
+
+
+def report(results: dict) -> None:
+    # --- Pregunta 1 ----
+    if "q1" in results:
+        pivot_q1 = results["q1"]
+        print("[Q1] Proporciones (primeras filas):")
+        print(pivot_q1.head())
+        print()
 
     # ---- Pregunta 2 ----
-    pivot_q2 = q2.run(df, outdir=OUTDIR)
-    print("[Q2] Estrenos por año y tipo (primeras filas):")
-    print(pivot_q2.head())
-    print()
+    if "q2" in results:
+        pivot_q2 = results["q2"]
+        print("[Q2] Estrenos por año y tipo (primeras filas):")
+        print(pivot_q2.head())
+        print()
 
     # ---- Pregunta 3 ----
-    pivot_q3 = q3.run(df, outdir=OUTDIR)
-    print("[Q3] Top países (primeras filas):")
-    print("[Q3] Resultados disponibles:", list(pivot_q3.keys()))
-    for name, df_top in pivot_q3.items():
-        print(f"\n[Q3] {name} (últimas filas para ver los más altos):")
-        print(df_top.tail())  
-        print()
+    if "q3" in results:
+        pivot_q3 = results["q3"]
+        print("[Q3] Top países (primeras filas):")
+        print("[Q3] Resultados disponibles:", list(pivot_q3.keys()))
+        for name, df_top in pivot_q3.items():
+            print(f"\n[Q3] {name} (últimas filas para ver los más altos):")
+            print(df_top.tail())
+            print()
 
     # ---- Pregunta 4 ----
-    pivot_q4 = q4.run(df, outdir=OUTDIR)
-    print("[Q4] Rating vs Tipo:")
-    print(pivot_q4["counts"].head())  
-    print()
+    if "q4" in results:
+        pivot_q4 = results["q4"]
+        print("[Q4] Rating vs Tipo:")
+        print(pivot_q4["counts"].head())
+        print()
 
     # ---- Pregunta 5 ----
-    pivot_q5 = q5.run(df, outdir=OUTDIR)
-    print("[Q5] Audiencia vs Pais:")
-    print(pivot_q5["top1_10"].head())
-    print()
+    if "q5" in results:
+        pivot_q5 = results["q5"]
+        print("[Q5] Audiencia vs Pais:")
+        print(pivot_q5["top1_10"].head())
+        print()
 
     # ---- Pregunta 6 ----
-    pivot_q6 = q6.run(df, outdir=OUTDIR)
-    print("[Q6] tabla mes×categoría")
-    print("[Q6] totales por mes (primeros):")
-    print(pivot_q6["totales_mes"].head())
-    print()
+    if "q6" in results:
+        pivot_q6 = results["q6"]
+        print("[Q6] tabla mes×categoría")
+        print("[Q6] totales por mes (primeros):")
+        print(pivot_q6["totales_mes"].head())
+        print()
 
     # ---- Pregunta 7 ----
-    pivot_q7 = q7.run(df, outdir=OUTDIR, topn=20)
-    print("[Q7] Top 20 directores por tipo (primeras filas):")
-    print(pivot_q7["pivot_tipo"].tail())  
-    print()
+    if "q7" in results:
+        pivot_q7 = results["q7"]
+        print("[Q7] Top 20 directores por tipo (primeras filas):")
+        print(pivot_q7["pivot_tipo"].tail())
+        print()
 
     # ---- Pregunta 8 ----
-    pivot_q8 = q8.run(df, outdir=OUTDIR)
-    print("[Q8] Top actores por cantidad de títulos (primeras filas):")
-    print(pivot_q8["ranking"].head())
-    print()
+    if "q8" in results:
+        pivot_q8 = results["q8"]
+        print("[Q8] Top actores por cantidad de títulos (primeras filas):")
+        print(pivot_q8["ranking"].head())
+        print()
 
     # ---- Pregunta 9 ----
-    res_q9 = q9.run(df, outdir=OUTDIR)
-    print("[Q9] Duración de películas y series:")
-    print(res_q9["movies"].head())
-    print(res_q9["tvshows"].head())
-    print()
+    if "q9" in results:
+        res_q9 = results["q9"]
+        print("[Q9] Duración de películas y series:")
+        print(res_q9["movies"].head())
+        print(res_q9["tvshows"].head())
+        print()
 
 
     # ---- Pregunta 10 ----
-    res_q10 = q10.run(df, outdir=OUTDIR, topn=20)
-    print("[Q10] Top palabras en títulos y descripciones:")
-    print()
-    print("Palabras en Títulos:")
-    print(res_q10["top_words_titles"].tail())        
+    if "q10" in results:
+        res_q10 = results["q10"]
+        print("[Q10] Top palabras en títulos y descripciones:")
+        print()
+        print("Palabras en Títulos:")
+        print(res_q10["top_words_titles"].tail())
+        print()
+        print("Palabras en Descripciones:")
+        print(res_q10["top_words_descriptions"].tail())
+        print()
+
+    # ---- Pregunta 11 ----
+    if "q11" in results:
+        res_q11 = results["q11"]
+        print("[Q11] Top parejas de co-protagonistas:")
+        print(res_q11["costar_pairs"].head())
+        print()
+        print("[Q11] Top personas por PageRank:")
+        print(res_q11["ranking"].head())
+        print()
+
+    # ---- Pregunta 12 ----
+    if "q12" in results:
+        res_q12 = results["q12"]
+        print("[Q12] Lag estreno → catálogo (años) por tipo:")
+        print(res_q12["lag_percentiles"])
+        print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Visualización de datos de Netflix (q1–q12).")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Solapa la escritura de PNGs con el cómputo (asyncio)")
+    parser.add_argument("--mem-report", action="store_true",
+                        help="Muestra tiempo y RSS de cada etapa del scheduler")
+    parser.add_argument("--export", action="store_true",
+                        help="Exporta todas las tablas de resultados a <OUTDIR>/export/<run_id>/")
+    parser.add_argument("--export-format", choices=["parquet", "arrow"], default="parquet")
+    parser.add_argument("--only", help="Corre solo estas preguntas (p. ej. q3,q7)")
+    parser.add_argument("--skip", help="Omite estas preguntas (p. ej. q10)")
+    parser.add_argument("--sample", type=float, metavar="FRACTION",
+                        help="Preview sobre una muestra estratificada (type × year_added), con IC bootstrap")
+    parser.add_argument("--sample-seed", type=int, default=0)
+    parser.add_argument("--validate", action="store_true",
+                        help="Valida el esquema al cargar y manda las filas con problemas a cuarentena")
+    parser.add_argument("--quarantine", metavar="PATH",
+                        help="CSV de cuarentena (default: <OUTDIR>/cuarentena/<dataset>_cuarentena.csv)")
+    parser.add_argument("--dedup", choices=["flag", "collapse"],
+                        help="Detecta casi-duplicados (MinHash + LSH sobre título y descripción); collapse los quita antes de correr")
+    parser.add_argument("--dedup-threshold", type=float, default=dedup.THRESHOLD)
+    parser.add_argument("--engine", choices=list(cl.STRING_ENGINES), default="object",
+                        help="Motor de strings para split/strip/regex del cleaning (arrow = pyarrow.compute)")
+    parser.add_argument("--sql", metavar="DB",
+                        help="Calcula los pivotes de q1–q9 con SQL sobre una base SQLite indexada (se crea o reutiliza en DB)")
+    parser.add_argument("--sql-rebuild", action="store_true", help="Fuerza la reingesta de la base de --sql")
+    parser.add_argument("--where", action="append", metavar="CLAVE=VALOR",
+                        help="Recorte (repetible), p. ej. --where type=Movie --where country=Japan. Con --sql filtra "
+                             "la base; si no, corre las preguntas sobre el recorte con índices bitmap "
+                             "(type, rating, year_added, country, genre; campo!=valor, year_added=2019-2021)")
+    parser.add_argument("--watch", action="store_true",
+                        help="Queda vigilando DATA_PATH y re-corre solo las preguntas afectadas por cada cambio")
+    parser.add_argument("--watch-interval", type=float, default=2.0, metavar="SEG")
+    parser.add_argument("--find", action="append", metavar="ENTIDAD=VALOR",
+                        help="Títulos por cast/director/country/genre con listas de posteo (repetible; "
+                             "misma entidad = OR, distintas = AND), p. ej. --find country=Spain --find genre=Dramas")
+    parser.add_argument("--postings", metavar="DIR",
+                        help="Listas de posteo de --find (default: <OUTDIR>/postings/<dataset>)")
+    parser.add_argument("--shards", type=int, metavar="N",
+                        help="Map-reduce por shards de filas (q3, q4, q5, q8, q9, q10) en un pool de procesos")
+    parser.add_argument("--workers", type=int, metavar="N", help="Procesos para --shards (default: núcleos)")
+    parser.add_argument("--store", metavar="DIR",
+                        help="Tablas derivadas mapeadas en memoria (utils.store): se publican si no son de este "
+                             "dataset y después se adjuntan sin re-cleaning (también en los workers de --shards)")
+    args = parser.parse_args(argv)
+    if args.sql and (args.use_async or args.sample is not None or args.validate or args.dedup):
+        parser.error("--sql no se puede combinar con --async, --sample, --validate ni --dedup.")
+    if args.where and not args.sql and (args.use_async or args.sample is not None or args.watch
+                                        or args.shards is not None or args.find):
+        parser.error("--where sin --sql no se puede combinar con --async, --sample, --watch, --shards ni --find.")
+    try:
+        cl.set_string_engine(args.engine)
+    except ImportError as e:
+        parser.error(str(e))
+    if args.sample is not None and args.use_async:
+        parser.error("--sample no se puede combinar con --async.")
+    if args.validate and args.use_async:
+        parser.error("--validate no se puede combinar con --async.")
+    if args.dedup and args.use_async:
+        parser.error("--dedup no se puede combinar con --async.")
+    if args.watch and (args.use_async or args.sample is not None or args.sql or args.export):
+        parser.error("--watch no se puede combinar con --async, --sample, --sql ni --export.")
+    if args.watch_interval <= 0:
+        parser.error("--watch-interval debe ser positivo.")
+    if args.shards is not None and (args.use_async or args.sample is not None or args.sql or args.watch):
+        parser.error("--shards no se puede combinar con --async, --sample, --sql ni --watch.")
+    if args.shards is not None and args.shards < 1 or args.workers is not None and args.workers < 1:
+        parser.error("--shards y --workers deben ser al menos 1.")
+    if args.workers is not None and args.shards is None:
+        parser.error("--workers solo aplica con --shards.")
+    if args.find and (args.use_async or args.sample is not None or args.sql or args.watch or args.shards is not None):
+        parser.error("--find no se puede combinar con --async, --sample, --sql, --watch ni --shards.")
+    if args.postings and not args.find:
+        parser.error("--postings solo aplica con --find.")
+    if args.store and (args.use_async or args.sample is not None or args.sql or args.watch or args.find or args.where):
+        parser.error("--store no se puede combinar con --async, --sample, --sql, --watch, --find ni --where.")
+
+    try:
+        questions = select_questions(args.only, args.skip)
+    except ValueError as e:
+        parser.error(str(e))
+    if not questions:
+        parser.error("La selección --only/--skip no deja ninguna pregunta para correr.")
+
+    where = None
+    if args.where and not args.sql:
+        try:
+            where = bitmaps.parse_where(args.where)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.find:
+        try:
+            find_titles(args.find, args.postings)
+        except ValueError as e:
+            parser.error(str(e))
+        return
+
+    if args.sql:
+        import sql_backend
+        try:
+            where = sql_backend.parse_where(args.where)
+        except ValueError as e:
+            parser.error(str(e))
+        keys = [k for k, _, _ in questions if k in sql_backend.PIVOTS]
+        skipped = [k for k, _, _ in questions if k not in sql_backend.PIVOTS]
+        if skipped:
+            print(f"[sql] Sin versión SQL (se omiten): {', '.join(skipped)}")
+        con = sql_backend.open_store(DATA_PATH, args.sql, rebuild=args.sql_rebuild)
+        try:
+            sql_backend.report_pivots(sql_backend.run_pivots(con, keys, where), where)
+        finally:
+            con.close()
+        return
+
+    columns = required_columns(questions)
+    if args.sample is not None:
+        # columnas de estratificación
+        columns = columns + [c for c in ("type", "date_added") if c not in columns]
+    if args.dedup:
+        columns = columns + [c for c in ("show_id", "type", "title", "description") if c not in columns]
+    if where:
+        columns = columns + [c for c in bitmaps.required_columns(key for key, _ in where) if c not in columns]
+    if len(questions) < len(QUESTIONS):
+        print()
+        print(f"Preguntas seleccionadas: {', '.join(k for k, _, _ in questions)}")
+        print(f"Columnas a cargar: {', '.join(columns)}")
+        print(f"Etapas de cleaning podadas: {', '.join(pruned_stages(questions)) or '-'}")
+    else:
+        columns = None  # corrida completa: se carga el CSV entero, como siempre
+
+    if args.use_async:
+        import async_runner
+        async_runner.main(DATA_PATH, OUTDIR, questions=questions, columns=columns)
+        return
+
+    def prepare(df: pd.DataFrame) -> pd.DataFrame:
+        if args.validate:
+            df = validate_dataset(df, args.quarantine)
+        if args.dedup:
+            df = dedup_dataset(df, args.dedup, args.dedup_threshold)
+        return df
+
+    if args.watch:
+        import watch
+        watch.watch(DATA_PATH, OUTDIR, questions, columns=columns, prepare=prepare, interval=args.watch_interval)
+        return
+
     print()
-    print("Palabras en Descripciones:")
-    print(res_q10["top_words_descriptions"].tail())
+    print("Cargando dataset...")
+    df = load_dataset(DATA_PATH, columns=columns)
+    print(f"Dataset cargado desde '{DATA_PATH}' con {len(df)} filas y {len(df.columns)} columnas.")
     print()
+    df = prepare(df)
+
+    if args.sample is not None:
+        import sampling
+        try:
+            sample, weights = sampling.stratified_sample(df, args.sample, seed=args.sample_seed)
+        except ValueError as e:
+            parser.error(str(e))
+        # solo las preguntas con estimación escalada: los conteos crudos de la muestra no se reportan
+        skipped = [k for k, _, _ in questions if k not in sampling.ESTIMATED]
+        questions = [q for q in questions if q[0] in sampling.ESTIMATED]
+        if not questions:
+            parser.error(f"--sample solo estima {', '.join(sampling.ESTIMATED)}; la selección no incluye ninguna.")
+        if skipped:
+            print(f"[preview] Sin estimación escalada (no se corren): {', '.join(skipped)}")
+        keys = [k for k, _, _ in questions]
+        results = {"preview": sampling.preview_estimates(sample, weights, keys, seed=args.sample_seed)}
+        stages = pd.DataFrame()
+        sampling.report_preview(results["preview"], args.sample, len(sample), len(df))
+        if args.sample == 1.0:
+            with ps.no_figures():
+                exact, stages = run_all_with_stages(sample, outdir=os.path.join(OUTDIR, "preview"), questions=questions)
+            bad = sampling.check_exact(exact, results["preview"])
+            if bad:
+                raise RuntimeError(f"Con --sample 1.0 la estimación no reproduce los valores exactos: {', '.join(bad)}")
+            print("[preview] --sample 1.0: las estimaciones coinciden con los valores exactos.")
+    elif where:
+        cache = {}
+        mask = where_mask(df, where, cache)
+        masked = [(key, mod, dict(kwargs, mask=mask)) for key, mod, kwargs in questions]
+        results, stages = run_all_with_stages(df, outdir=os.path.join(OUTDIR, "where"), questions=masked, cache=cache)
+        report(results)
+    elif args.shards is not None:
+        import mapreduce
+        results, stages = mapreduce.run_sharded(df, OUTDIR, questions, args.shards, args.workers,
+                                                store_root=args.store)
+        report(results)
+    else:
+        mapped = store.open_derived_tables(df, args.store, store.required_tables(questions)) if args.store else None
+        results, stages = run_all_with_stages(df, outdir=OUTDIR, questions=questions, store=mapped)
+        report(results)
+    if args.mem_report:
+        scheduler.report_stages(stages)
+    if args.export:
+        import export
+        # con --sample solo hay estimaciones escaladas; el manifest lo indica
+        estimate = None if args.sample is None else {"sample_fraction": args.sample, "sample_seed": args.sample_seed}
+        path = export.export_results(results, OUTDIR, fmt=args.export_format, estimate=estimate)
+        print(f"Tablas exportadas en '{path}'")
 
 
 if __name__ == "__main__":
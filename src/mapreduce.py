@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+# Paralelismo de datos: map-reduce por shards de filas en un pool de procesos.
+#
+# Paralelizar por pregunta tiene techo (una pregunta lenta ocupa un solo núcleo). Acá:
+# 1. El catálogo se corta en 'shards' bloques contiguos de filas (utils.partials.shard_bounds)
+# 2. Cada worker arma las tablas derivadas de su shard y los agregados parciales de cada pregunta
+#    que lo admite (qN.map_partials): conteos, Counters de palabras, conteos grupo × término,
+#    histogramas enteros de duración
+# 3. El proceso principal suma los parciales en orden de shard (qN.merge_partials): son conteos,
+#    así que el resultado es exactamente el mismo que contar el catálogo de una vez
+# 4. Esas preguntas grafican desde la suma (run(partials=...)), sin tablas derivadas propias;
+#    el resto corre como siempre con el scheduler
+#
+# Los memos de canonicalización (países, ratings) se calientan una vez en el proceso principal y
+# se siembran en cada worker, igual que en batch.py.
+#
+# Con un almacén (utils.store, --store DIR) las tablas derivadas del catálogo se publican una vez
+# (o se reutilizan si ya son de este df): cada worker las adjunta por mmap y reconstruye solo el
+# bloque de filas de su shard, sin cleaning; las preguntas no shardables también las adjuntan.
+#
+# Uso:
+#   python main.py --shards 8
+#   python main.py --shards 8 --workers 4 --only q8,q10
+#   python main.py --shards 8 --store outputs/store
+
+from __future__ import annotations
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import pandas as pd
+
+import main as pipeline
+import scheduler
+from utils import cleaning as cl
+from utils import derived as dv
+from utils import partials as pu
+from utils import store as st
+
+# tablas adjuntadas en este proceso (worker): {tabla: MappedTable}
+_ATTACHED = {}
+
+
+# Preguntas (de QUESTIONS) con map_partials / merge_partials
+def shardable(questions: list) -> list:
+    return [q for q in questions if hasattr(q[1], "map_partials") and hasattr(q[1], "merge_partials")]
+
+
+def _tokens(df: pd.DataFrame, col: str):
+    if col not in df.columns:
+        return ()
+    return df[col].dropna().astype(str).str.split(",").explode().unique()
+
+
+def _init_worker(caches: dict, engine: str, store_root: str | None = None,
+                 version: int | None = None, names=None) -> None:
+    import matplotlib
+    matplotlib.use("Agg")
+    cl.seed_canon_caches(caches)
+    cl.set_string_engine(engine)
+    _ATTACHED.clear()
+    if store_root is not None:
+        _ATTACHED.update(st.attach_derived_tables(store_root, names, version))
+
+
+# Parciales de todas las preguntas sobre un shard (filas [lo, lo + len(shard)) del catálogo); las
+# tablas derivadas se comparten entre ellas y, si hay almacén, se reconstruyen de él
+def _map_shard(shard: pd.DataFrame, keys: list, lo: int = 0) -> dict:
+    mods = {key: mod for key, mod, _ in pipeline.QUESTIONS}
+    needed = dv.closure(t for key in keys for t in mods[key].TABLES)
+    tables = {t: _ATTACHED[t].to_frame(shard, lo) for t in needed if t in _ATTACHED}
+    return {key: mods[key].map_partials(shard, tables) for key in keys}
+
+
+# {clave: parciales sumados} de las preguntas shardables, y los segundos de map y de merge.
+# 'mapped': tablas de utils.store ya publicadas para df (los workers adjuntan esa misma versión)
+def map_reduce(df: pd.DataFrame, questions: list, shards: int, workers: int | None = None,
+               store_root: str | None = None, mapped: dict | None = None) -> tuple:
+    targets = shardable(questions)
+    keys = [key for key, _, _ in targets]
+    if not keys:
+        return {}, 0.0, 0.0
+    bounds = pu.shard_bounds(len(df), shards)
+    blocks = [df.iloc[lo:hi].reset_index(drop=True) for lo, hi in bounds]
+    starts = [lo for lo, _ in bounds]
+    workers = min(len(blocks), workers or os.cpu_count() or 1)
+    mapped = mapped or {}
+    version = next(iter(mapped.values())).version if mapped else None
+
+    t0 = time.perf_counter()
+    caches = cl.warm_canon_caches(_tokens(df, "country"), _tokens(df, "rating"))
+    if workers <= 1:
+        _ATTACHED.clear()
+        _ATTACHED.update(mapped)
+        parts = [_map_shard(block, keys, lo) for block, lo in zip(blocks, starts)]
+        _ATTACHED.clear()
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(caches, cl.get_string_engine(), store_root if mapped else None,
+                                           version, list(mapped) or None)) as pool:
+            parts = list(pool.map(_map_shard, blocks, [keys] * len(blocks), starts))
+    t_map = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    merged = {key: mod.merge_partials([p[key] for p in parts]) for key, mod, _ in targets}
+    return merged, t_map, time.perf_counter() - t0
+
+
+# Igual que main.run_all_with_stages, pero las preguntas shardables usan los parciales sumados
+def run_sharded(df: pd.DataFrame, outdir: str, questions: list, shards: int, workers: int | None = None,
+                store_root: str | None = None) -> tuple:
+    mapped = st.open_derived_tables(df, store_root, st.required_tables(questions)) if store_root else None
+    merged, t_map, t_merge = map_reduce(df, questions, shards, workers, store_root, mapped)
+    if merged:
+        print(f"[shards] {', '.join(merged)}: map en {min(shards, max(len(df), 1))} shards {t_map:.2f}s, "
+              f"merge {t_merge:.2f}s.")
+        print()
+    scheduled = []
+    for key, mod, kwargs in questions:
+        if key in merged:
+            run_kwargs = dict(kwargs, partials=merged[key])
+            scheduled.append((key, partial(pipeline._run_question, mod, run_kwargs), ()))
+        else:
+            scheduled.append((key, partial(pipeline._run_question, mod, kwargs), mod.TABLES))
+    return scheduler.run_scheduled(df, scheduled, outdir, store=mapped)
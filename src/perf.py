@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+# Presupuestos de performance: corre cada qN.run y cada función de cleaning sobre un dataset
+# sintético fijo (utils.fixtures), mide tiempo y pico de memoria, y compara contra un
+# baseline JSON guardado. Falla (exit 1) si algún caso supera su presupuesto o si un caso del
+# baseline (de los elegidos con --only) ya no se midió.
+#
+# Uso:
+#   python perf.py --update                 (genera / reemplaza el baseline)
+#   python perf.py                          (compara contra el baseline, margen 25%)
+#   python perf.py --margin 0.5 --only "cleaning.*"
+#   python perf.py --rows 30000 --update --baseline big.json   (fixture grande; "[arrow]" = motor Arrow)
+#
+# Medición:
+# - tiempo: mínimo de --repeat corridas (los memos de canonicalización se vacían antes de cada
+#   una, así se mide en frío)
+# - memoria: pico de tracemalloc en una corrida aparte (no distorsiona el tiempo)
+# Un caso falla si supera baseline * (1 + margen) y además la diferencia absoluta pasa el piso
+# (--min-delta-s / --min-delta-mb), para no fallar por ruido en casos de milisegundos.
+
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import fnmatch
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+import main as pipeline
+from utils import cleaning as cl
+from utils import fixtures
+from utils import readers
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perf_baseline.json")
+
+# nombre -> función(df) de cleaning a medir (mismo uso que en utils.derived)
+CLEANING_CASES = {
+    "cleaning.expand_and_normalize_countries": cl.expand_and_normalize_countries,
+    "cleaning.normalize_and_explode_ratings": lambda df: cl.normalize_and_explode_ratings(df.dropna(subset=["rating"])),
+    "cleaning.expand_and_normalize_directors": cl.expand_and_normalize_directors,
+    "cleaning.expand_and_normalize_cast": cl.expand_and_normalize_cast,
+    "cleaning.explode_listed_in": cl.explode_listed_in,
+    "cleaning.add_genre_from_listed_in": lambda df: cl.add_genre_from_listed_in(cl.explode_listed_in(df)),
+    "cleaning.add_year_and_month": cl.add_year_and_month,
+    "cleaning.normalize_duration": cl.normalize_duration,
+    "cleaning.count_words": lambda df: cl.count_words(df["description"]),
+}
+
+# Funciones de split / explode / strip que tienen ruta Arrow: se miden también con engine="arrow"
+ARROW_CASES = (
+    "cleaning.expand_and_normalize_countries",
+    "cleaning.normalize_and_explode_ratings",
+    "cleaning.expand_and_normalize_directors",
+    "cleaning.expand_and_normalize_cast",
+    "cleaning.explode_listed_in",
+    "cleaning.add_genre_from_listed_in",
+)
+
+
+def _with_engine(fn, engine: str):
+    def run(df):
+        with cl.string_engine(engine):
+            return fn(df)
+    return run
+
+
+# Casos (nombre, función sin argumentos) sobre el CSV sintético ya escrito en 'csv_path'
+def _cases(csv_path: str, outdir: str) -> list:
+    df = pipeline.load_dataset(csv_path)
+    cases = [("load_dataset", lambda: pipeline.load_dataset(csv_path))]
+    cases += [(name, lambda fn=fn: fn(df)) for name, fn in CLEANING_CASES.items()]
+    arrow_df = readers.to_arrow_strings(df)
+    cases += [(f"{name}[arrow]", lambda fn=_with_engine(CLEANING_CASES[name], "arrow"): fn(arrow_df))
+              for name in ARROW_CASES]
+    cases += [
+        (f"{key}.run", lambda mod=mod, kw=kw: mod.run(df, outdir=outdir, **kw))
+        for key, mod, kw in pipeline.QUESTIONS
+    ]
+    return cases
+
+
+def _measure(fn, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        cl.clear_canon_caches()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+        plt.close("all")
+
+    cl.clear_canon_caches()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        plt.close("all")
+    return {"seconds": min(times), "peak_mb": peak / 2**20}
+
+
+def _selected(name: str, only) -> bool:
+    return not only or any(fnmatch.fnmatch(name, pat) for pat in only)
+
+
+def measure_all(rows: int, seed: int, repeat: int, only=None) -> dict:
+    with tempfile.TemporaryDirectory(prefix="perf-") as tmp:
+        csv_path = os.path.join(tmp, "fixture.csv")
+        fixtures.make_netflix_like(rows, seed).to_csv(csv_path, index=False)
+        results = {}
+        for name, fn in _cases(csv_path, os.path.join(tmp, "outputs")):
+            if not _selected(name, only):
+                continue
+            results[name] = _measure(fn, repeat)
+    return results
+
+
+def _pct(cur: float, base: float) -> float:
+    return (cur / base - 1.0) * 100.0 if base > 0 else float("nan")
+
+
+# Tabla de diferencias contra el baseline, con estado ok / LENTO / MEMORIA / nuevo por caso, y
+# FALTA para los casos del baseline (que entran en 'only') que no están en la medición actual
+def compare(current: dict, baseline: dict, margin: float, min_delta_s: float, min_delta_mb: float,
+            only=None) -> pd.DataFrame:
+    rows = []
+    for name, cur in current.items():
+        base = baseline.get(name)
+        row = {"caso": name, "s_base": None, "s_actual": cur["seconds"], "s_%": None,
+               "mb_base": None, "mb_actual": cur["peak_mb"], "mb_%": None, "estado": "nuevo"}
+        if base is not None:
+            slow = (cur["seconds"] > base["seconds"] * (1 + margin)
+                    and cur["seconds"] - base["seconds"] > min_delta_s)
+            heavy = (cur["peak_mb"] > base["peak_mb"] * (1 + margin)
+                     and cur["peak_mb"] - base["peak_mb"] > min_delta_mb)
+            row.update({
+                "s_base": base["seconds"], "s_%": _pct(cur["seconds"], base["seconds"]),
+                "mb_base": base["peak_mb"], "mb_%": _pct(cur["peak_mb"], base["peak_mb"]),
+                "estado": "LENTO" if slow else ("MEMORIA" if heavy else "ok"),
+            })
+            if slow and heavy:
+                row["estado"] = "LENTO+MEMORIA"
+        rows.append(row)
+    for name, base in baseline.items():
+        if name not in current and _selected(name, only):
+            rows.append({"caso": name, "s_base": base["seconds"], "s_actual": None, "s_%": None,
+                         "mb_base": base["peak_mb"], "mb_actual": None, "mb_%": None, "estado": "FALTA"})
+    return pd.DataFrame(rows)
+
+
+def load_baseline(path: str) -> dict:
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def save_baseline(path: str, results: dict, rows: int, seed: int, repeat: int) -> None:
+    payload = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "fixture": {"rows": rows, "seed": seed},
+        "repeat": repeat,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cases": results,
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(payload, fh, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Presupuestos de tiempo y memoria contra un baseline.")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update", action="store_true", help="Reescribe el baseline con la medición actual")
+    parser.add_argument("--rows", type=int, default=None, help="Filas del dataset sintético (default: las del baseline o 3000)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--margin", type=float, default=0.25, help="Tolerancia relativa (0.25 = +25%%)")
+    parser.add_argument("--min-delta-s", type=float, default=0.05)
+    parser.add_argument("--min-delta-mb", type=float, default=2.0)
+    parser.add_argument("--only", help="Patrones de casos separados por coma (p. ej. 'cleaning.*,q7.run')")
+    args = parser.parse_args(argv)
+
+    only = [p.strip() for p in args.only.split(",")] if args.only else None
+    baseline = None
+    if not args.update:
+        if not os.path.exists(args.baseline):
+            parser.error(f"No existe el baseline '{args.baseline}': generarlo con --update.")
+        baseline = load_baseline(args.baseline)
+
+    fixture = (baseline or {}).get("fixture", {})
+    rows = args.rows if args.rows is not None else fixture.get("rows", 3000)
+    seed = args.seed if args.seed is not None else fixture.get("seed", 0)
+    if baseline is not None and (rows, seed) != (fixture.get("rows"), fixture.get("seed")):
+        parser.error(f"El baseline se midió con rows={fixture.get('rows')} seed={fixture.get('seed')}; "
+                     f"no es comparable con rows={rows} seed={seed}.")
+
+    print(f"[perf] Dataset sintético: {rows} filas (seed={seed}), {args.repeat} repeticiones")
+    current = measure_all(rows, seed, args.repeat, only)
+
+    if args.update:
+        save_baseline(args.baseline, current, rows, seed, args.repeat)
+        print(f"[perf] Baseline guardado en '{args.baseline}' ({len(current)} casos).")
+        return 0
+
+    table = compare(current, baseline["cases"], args.margin, args.min_delta_s, args.min_delta_mb, only)
+    with pd.option_context("display.max_rows", None, "display.width", 160):
+        print(table.to_string(index=False, float_format=lambda v: f"{v:.2f}", na_rep="-"))
+
+    failed = table[~table["estado"].isin(["ok", "nuevo"])]
+    if not failed.empty:
+        print(f"\n[perf] {len(failed)} caso(s) fuera de presupuesto o sin medir (margen {args.margin:.0%}): "
+              + ", ".join(failed["caso"]))
+        return 1
+    print(f"\n[perf] Todo dentro del presupuesto (margen {args.margin:.0%}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -2,25 +2,49 @@
 # ¿Hay palabras que se utilicen más que otras en títulos y descripciones?
 #
 # Pipeline:
-# 1. Limpiar y tokenizar textos con count_top_words
+# 1. Limpiar y tokenizar títulos con count_words; las descripciones se tokenizan una sola vez para
+#    la matriz título × término y su Counter sale de las sumas por columna
 # 2. Calcular las palabras más frecuentes en títulos y descripciones
 # 3. Graficar los Top-N en dos gráficos de barras horizontales
-# 4. Devolver un diccionario con las Series de frecuencias
+# 4. Palabras distintivas por género canónico y por país (TF-IDF):
+#    matriz dispersa título × término de las descripciones (una sola vez), agregada a
+#    grupo × término con el producto contra la matriz indicadora grupo × título; el Top-k de
+#    todos los grupos sale de una única pasada (ranking.group_top_k), sin loops por grupo
+# 5. Devolver un diccionario con las Series de frecuencias y las tablas TF-IDF
+#
+# Map-reduce por shards (mapreduce.py): map_partials arma los agregados de un bloque de filas
+# (Counters de palabras, conteos grupo × término, frecuencia documental, títulos por grupo) y
+# merge_partials los suma; run(partials=...) grafica a partir de la suma sin volver a tokenizar.
 #
 # Outputs:
 # - outputs/q10/q10_top_words_titles.png
 # - outputs/q10/q10_top_words_descriptions.png
+# - outputs/q10/q10_tfidf_generos.png / q10_tfidf_generos.csv
+# - outputs/q10/q10_tfidf_paises.png / q10_tfidf_paises.csv
 #
 # Cleaning:
-# - cl.count_top_words(series): Tokeniza y cuenta las palabras más frecuentes en una serie de textos en inglés, filtrando palabras cortas y stopwords.
+# - cl.count_words(series) + cl.top_words(counter): Tokeniza y cuenta las palabras de los títulos en inglés (filtrando palabras cortas y stopwords) y se queda con las más frecuentes.
+# - cl.normalize_to_words_en(text): mismo tokenizador, por descripción, para la matriz título × término.
+# - utils.derived "genres" / "countries": género canónico (LISTED_IN_TO_CANON_GENRE) y país por título.
 
 from __future__ import annotations
+import collections
 import os
+import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
 from utils import plot_style as ps
 from utils import cleaning as cl
+from utils import derived as dv
+from utils import ranking as rk
+from utils import partials as pu
+
+# Tablas derivadas que consume (ver utils.derived)
+TABLES = ("genres", "countries")
+# Columnas del CSV que necesita (incluye las de sus tablas derivadas)
+COLUMNS = ("title", "description", "listed_in", "country")
 
 # Gráfico de barras horizontales para frecuencias de palabras
 def _plot_top_words_barh(freqs: pd.Series, title: str, color: str, outpath: str):
@@ -40,19 +64,174 @@ def _plot_top_words_barh(freqs: pd.Series, title: str, color: str, outpath: str)
 
     ps.add_source_note()  
     plt.tight_layout()
-    plt.savefig(outpath, dpi=220, facecolor=ps.COLOR_BG, bbox_inches="tight")
+    ps.save_figure(outpath, dpi=220, facecolor=ps.COLOR_BG, bbox_inches="tight")
+    plt.close()
+
+# Matriz dispersa título × término (conteos) de las descripciones, el vocabulario ordenado y las
+# columnas en orden de primera aparición (el orden de inserción de un Counter sobre los mismos textos)
+def _doc_term_matrix(texts: pd.Series, min_len: int = 3) -> tuple:
+    tokens = [cl.normalize_to_words_en(t, min_len=min_len) for t in texts]
+    lens = np.fromiter((len(t) for t in tokens), dtype=np.int64, count=len(tokens))
+    seen_codes, seen = pd.factorize(pd.Series([w for t in tokens for w in t], dtype=object))
+    seen = np.asarray(seen, dtype=object)
+    order = np.argsort(seen, kind="stable")
+    first_seen = np.empty(len(seen), dtype=np.int64)
+    first_seen[order] = np.arange(len(seen))
+    rows = np.repeat(np.arange(len(tokens)), lens)
+    m = sp.csr_matrix((np.ones(len(seen_codes)), (rows, first_seen[seen_codes])), shape=(len(tokens), len(seen)))
+    m.sum_duplicates()
+    return m, seen[order], first_seen
+
+
+# Counter de palabras desde las sumas por columna de la matriz título × término, con el mismo
+# orden de inserción que cl.count_words (los desempates de most_common no cambian)
+def _word_counter(dtm: sp.csr_matrix, vocab: np.ndarray, first_seen: np.ndarray) -> collections.Counter:
+    counts = np.asarray(dtm.sum(axis=0)).ravel().astype(np.int64)
+    return collections.Counter(dict(zip(vocab[first_seen].tolist(), counts[first_seen].tolist())))
+
+
+# Conteos grupo × término (todas las columnas de dtm): un título cuenta una vez por grupo
+def _group_term_counts(dtm: sp.csr_matrix, title_ids, groups: pd.Series) -> tuple:
+    g_codes, g_names = pd.factorize(groups, sort=True)
+    ok = g_codes >= 0
+    indicator = sp.csr_matrix((np.ones(ok.sum()), (g_codes[ok], np.asarray(title_ids)[ok])),
+                              shape=(len(g_names), dtm.shape[0]))
+    indicator.data[:] = 1.0
+    return np.asarray(g_names, dtype=object), (indicator @ dtm).tocsr()
+
+
+# Suma de conteos grupo × término de varios shards, re-indexados a los grupos/términos comunes
+def _merge_group_terms(items, n_terms: int) -> tuple:
+    names = np.unique(np.concatenate([g for (g, _), _ in items]))
+    rows, cols, vals = [], [], []
+    for (g, counts), col_map in items:
+        coo = counts.tocoo()
+        rows.append(np.searchsorted(names, g)[coo.row])
+        cols.append(col_map[coo.col])
+        vals.append(coo.data)
+    counts = sp.csr_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+                           shape=(len(names), n_terms))
+    return names, counts
+
+
+# TF-IDF con cada grupo como documento: tf relativo dentro del grupo × idf suavizado entre grupos.
+# Solo entran términos presentes en al menos 'min_df' títulos (descarta ruido de palabras raras).
+def _tfidf_top_terms(group_terms: tuple, vocab: np.ndarray, doc_freq: np.ndarray,
+                     k: int = 10, min_df: int = 3, group_name: str = "grupo") -> pd.DataFrame:
+    g_names, counts = group_terms
+    keep = np.flatnonzero(doc_freq >= min_df)
+    counts = counts[:, keep].tocsr()
+    counts.eliminate_zeros()
+    if counts.nnz == 0:
+        return pd.DataFrame(columns=[group_name, "rank", "term", "tfidf", "count"])
+
+    n_groups = counts.shape[0]
+    df_groups = np.bincount(counts.indices, minlength=counts.shape[1])
+    idf = np.log((1 + n_groups) / (1 + df_groups)) + 1.0
+    row_tot = np.asarray(counts.sum(axis=1)).ravel()
+
+    coo = counts.tocoo()
+    scores = coo.data / row_tot[coo.row] * idf[coo.col]
+    g, it, vals, rank = rk.group_top_k(coo.row, coo.col, k, weights=scores)
+    cnt = np.asarray(counts[g, it]).ravel() if len(g) else np.empty(0)
+    return pd.DataFrame({
+        group_name: g_names[g],
+        "rank": rank,
+        "term": vocab[keep][it],
+        "tfidf": vals,
+        "count": cnt.astype(np.int64),
+    })
+
+
+# Grilla de barras horizontales (estilo q10): Top términos de los grupos más grandes
+def _plot_tfidf_grid(top: pd.DataFrame, group_col: str, groups_order: list, title: str, outpath: str,
+                     ncols: int = 4, color: str = "red"):
+    groups_order = [g for g in groups_order if g in set(top[group_col])]
+    if not groups_order:
+        return
+    nrows = int(np.ceil(len(groups_order) / ncols))
+    fig, axes = plt.subplots(nrows, ncols, figsize=(4.2 * ncols, 3.4 * nrows), facecolor=ps.COLOR_BG, squeeze=False)
+
+    for ax, group in zip(axes.ravel(), groups_order):
+        sub = top[top[group_col] == group].sort_values("rank", ascending=False)
+        ps.apply_netflix_style(ax)
+        ax.barh(sub["term"].tolist(), sub["tfidf"].tolist(), color=color, edgecolor=ps.COLOR_TV, linewidth=0.6)
+        ax.set_title(str(group), fontsize=10, color=ps.COLOR_TV)
+        ax.tick_params(axis="both", labelsize=8)
+    for ax in axes.ravel()[len(groups_order):]:
+        ax.set_visible(False)
+
+    fig.suptitle(title, fontsize=13, color=ps.COLOR_TV)
+    ps.add_source_note()
+    plt.tight_layout()
+    ps.save_figure(outpath, dpi=220, facecolor=ps.COLOR_BG, bbox_inches="tight")
     plt.close()
 
-def run(df: pd.DataFrame, outdir: str = "outputs", topn: int = 20) -> dict:
+
+# Agregados de q10 sobre un bloque de filas, con una única matriz título × término
+def map_partials(df: pd.DataFrame, tables: dict | None = None) -> dict:
+    tables = {} if tables is None else tables
+    dtm, vocab, first_seen = _doc_term_matrix(df["description"])
+    genres = dv.get("genres", df, tables)
+    countries = dv.get("countries", df, tables)[["title_id", "country_final"]].drop_duplicates()
+    return {
+        "titles": cl.count_words(df["title"]),
+        "descriptions": _word_counter(dtm, vocab, first_seen),
+        "vocab": vocab,
+        "doc_freq": np.asarray((dtm > 0).sum(axis=0)).ravel(),
+        "genero": _group_term_counts(dtm, genres["title_id"], genres["genre_main"]),
+        "pais": _group_term_counts(dtm, countries["title_id"], countries["country_final"]),
+        "titulos_genero": pu.tally(genres, "genre_main"),
+        "titulos_pais": pu.tally(countries, "country_final"),
+    }
+
+
+# Suma de los agregados de varios shards (en orden de shard)
+def merge_partials(parts: list) -> dict:
+    vocab = np.unique(np.concatenate([p["vocab"] for p in parts]))
+    col_maps = [np.searchsorted(vocab, p["vocab"]) for p in parts]
+    doc_freq = np.zeros(len(vocab), dtype=np.int64)
+    for p, col_map in zip(parts, col_maps):
+        doc_freq[col_map] += p["doc_freq"]
+    return {
+        "titles": pu.merge_counters(p["titles"] for p in parts),
+        "descriptions": pu.merge_counters(p["descriptions"] for p in parts),
+        "vocab": vocab,
+        "doc_freq": doc_freq,
+        "genero": _merge_group_terms([(p["genero"], m) for p, m in zip(parts, col_maps)], len(vocab)),
+        "pais": _merge_group_terms([(p["pais"], m) for p, m in zip(parts, col_maps)], len(vocab)),
+        "titulos_genero": pu.merge_tallies(p["titulos_genero"] for p in parts),
+        "titulos_pais": pu.merge_tallies(p["titulos_pais"] for p in parts),
+    }
+
+
+# Palabras distintivas por género canónico y por país
+def _distinctive_words(agg: dict, k: int = 10) -> dict:
+    return {
+        "genero": _tfidf_top_terms(agg["genero"], agg["vocab"], agg["doc_freq"], k, group_name="genre"),
+        "pais": _tfidf_top_terms(agg["pais"], agg["vocab"], agg["doc_freq"], k, group_name="country"),
+        "titulos_genero": pu.tally_to_value_counts(agg["titulos_genero"]),
+        "titulos_pais": pu.tally_to_value_counts(agg["titulos_pais"]),
+    }
+
+
+# 'partials': agregados ya sumados (merge_partials); si no vienen se calculan sobre df
+def run(df: pd.DataFrame, outdir: str = "outputs", topn: int = 20, tables: dict | None = None,
+        partials: dict | None = None, mask=None) -> dict:
 
     outdir_q10 = os.path.join(outdir, "q10")
     os.makedirs(outdir_q10, exist_ok=True)
+    if partials is not None and mask is not None:
+        raise ValueError("'partials' y 'mask' no se pueden combinar (los parciales son del catálogo entero).")
+    df, tables = dv.restrict(df, tables, mask, COLUMNS)
 
-    if "title" not in df.columns or "description" not in df.columns:
-        raise ValueError("El DataFrame debe contener 'title' y 'description'.")
+    if partials is None:
+        if "title" not in df.columns or "description" not in df.columns:
+            raise ValueError("El DataFrame debe contener 'title' y 'description'.")
+        partials = map_partials(df, tables)
 
-    top_titles = cl.count_top_words(df["title"],   topn=topn, min_len=3)
-    top_desc   = cl.count_top_words(df["description"], topn=topn, min_len=3)
+    top_titles = cl.top_words(partials["titles"], topn=topn)
+    top_desc   = cl.top_words(partials["descriptions"], topn=topn)
 
     color_rojo = "red"
     _plot_top_words_barh(top_titles, "Top palabras en títulos", color_rojo,
@@ -60,7 +239,17 @@ def run(df: pd.DataFrame, outdir: str = "outputs", topn: int = 20) -> dict:
     _plot_top_words_barh(top_desc,   "Top palabras en descripciones", color_rojo,
                          os.path.join(outdir_q10, "q10_top_words_descriptions.png"))
 
+    distintivas = _distinctive_words(partials, k=8)
+    distintivas["genero"].to_csv(os.path.join(outdir_q10, "q10_tfidf_generos.csv"), index=False)
+    distintivas["pais"].to_csv(os.path.join(outdir_q10, "q10_tfidf_paises.csv"), index=False)
+    _plot_tfidf_grid(distintivas["genero"], "genre", distintivas["titulos_genero"].index[:12].tolist(),
+                     "Palabras distintivas por género (TF-IDF)", os.path.join(outdir_q10, "q10_tfidf_generos.png"))
+    _plot_tfidf_grid(distintivas["pais"], "country", distintivas["titulos_pais"].index[:12].tolist(),
+                     "Palabras distintivas por país (TF-IDF)", os.path.join(outdir_q10, "q10_tfidf_paises.png"))
+
     return {
         "top_words_titles": top_titles,       
         "top_words_descriptions": top_desc,
+        "tfidf_generos": distintivas["genero"],
+        "tfidf_paises": distintivas["pais"],
     }
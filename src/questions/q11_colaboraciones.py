@@ -0,0 +1,233 @@
+# Pregunta 11:
+# ¿Qué actores y directores colaboran más entre sí? ¿Quiénes son los más centrales en la red de colaboraciones?
+
+# Pipeline:
+# 1. Expandir 'cast' y 'director' con expand_and_normalize_cast / expand_and_normalize_directors
+# 2. Armar matrices de incidencia dispersas (título × persona)
+# 3. Derivar co-ocurrencias con productos de matrices dispersas (actor×actor, actor×director)
+# 4. Calcular centralidad de grado y PageRank con iteración de potencias vectorizada
+# 5. Exportar tablas (CSV) y graficar Top parejas y Top personas
+
+# Outputs:
+# - outputs/q11/q11_top_parejas_coprotagonistas_barh.png
+# - outputs/q11/q11_top_actor_director_barh.png
+# - outputs/q11/q11_top_personas_pagerank_barh.png
+# - outputs/q11/q11_top_parejas_coprotagonistas.csv
+# - outputs/q11/q11_top_actor_director.csv
+# - outputs/q11/q11_ranking_personas.csv
+
+# Cleaning (vía utils.derived, tablas "cast" y "directors"):
+# - cl.expand_and_normalize_cast(df): Limpia y expande la columna 'cast' (un actor por fila).
+# - cl.expand_and_normalize_directors(df): Limpia y expande la columna 'director' (un director por fila).
+
+from __future__ import annotations
+import os
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import matplotlib.pyplot as plt
+from matplotlib.ticker import MaxNLocator
+from utils import plot_style as ps
+from utils import derived as dv
+
+# Tablas derivadas que consume (ver utils.derived)
+TABLES = ("cast", "directors")
+# Columnas del CSV que necesita (incluye las de sus tablas derivadas)
+COLUMNS = ("cast", "director", "type")
+
+
+# Elenco y directores expandidos, con 'title_id' = fila del título original
+def _prepare_people(df: pd.DataFrame, tables: dict | None = None):
+    required = {"cast", "director", "type"}
+    missing = required.difference(df.columns)
+    if missing:
+        raise ValueError(f"Faltan columnas requeridas: {sorted(missing)}")
+
+    cast = dv.get("cast", df, tables)
+    directors = dv.get("directors", df, tables)
+    return cast[["title_id", "cast_final"]], directors[["title_id", "director_final"]], len(df)
+
+
+# Matriz de incidencia binaria (título × persona) y su transpuesta, ambas en CSR
+def _incidence_matrix(title_ids: np.ndarray, person_codes: np.ndarray, n_titles: int, n_people: int):
+    data = np.ones(len(title_ids), dtype=np.float64)
+    m = sp.csr_matrix((data, (title_ids, person_codes)), shape=(n_titles, n_people))
+    m.sum_duplicates()
+    m.data[:] = 1.0  # una persona repetida en el mismo título cuenta una vez
+    return m, m.T.tocsr()
+
+
+# Top-N celdas de una matriz dispersa (par de índices + valor), desempate por nombre
+def _top_pairs(mat: sp.spmatrix, row_names: np.ndarray, col_names: np.ndarray,
+               topn: int, row_label: str, col_label: str) -> pd.DataFrame:
+    coo = mat.tocoo()
+    empty = pd.DataFrame(columns=[row_label, col_label, "Total"])
+    if coo.nnz == 0:
+        return empty
+
+    vals = coo.data
+    k = min(topn, len(vals))
+    # Umbral = k-ésimo mayor valor; todo lo que lo iguala entra como candidato (empates deterministas)
+    kth = np.partition(vals, len(vals) - k)[len(vals) - k]
+    cand = np.flatnonzero(vals >= kth)
+
+    out = pd.DataFrame({
+        row_label: row_names[coo.row[cand]],
+        col_label: col_names[coo.col[cand]],
+        "Total": vals[cand].astype(int),
+    })
+    out = out.sort_values(["Total", row_label, col_label], ascending=[False, True, True])
+    return out.head(topn).reset_index(drop=True)
+
+
+# PageRank por iteración de potencias sobre la matriz de adyacencia ponderada (simétrica)
+def _pagerank(adj: sp.csr_matrix, damping: float = 0.85, tol: float = 1e-10, max_iter: int = 100) -> np.ndarray:
+    n = adj.shape[0]
+    if n == 0:
+        return np.zeros(0)
+
+    out_w = np.asarray(adj.sum(axis=1)).ravel()
+    dangling = out_w == 0
+    inv = np.zeros(n)
+    inv[~dangling] = 1.0 / out_w[~dangling]
+
+    # Grafo no dirigido: A^T = A, así que r_new = d * A (r / w) + teleport
+    r = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        leak = r[dangling].sum()
+        r_new = damping * (adj @ (r * inv)) + (damping * leak + (1.0 - damping)) / n
+        if np.abs(r_new - r).sum() < tol:
+            r = r_new
+            break
+        r = r_new
+    return r / r.sum()
+
+
+# Construye la red de colaboración y devuelve pares y ranking de personas
+def _collaboration_graph(cast: pd.DataFrame, directors: pd.DataFrame, n_titles: int, topn: int = 20) -> dict:
+    actor_codes, actor_names = pd.factorize(cast["cast_final"], sort=True)
+    dir_codes, dir_names = pd.factorize(directors["director_final"], sort=True)
+    actor_names = np.asarray(actor_names, dtype=object)
+    dir_names = np.asarray(dir_names, dtype=object)
+
+    A, At = _incidence_matrix(cast["title_id"].to_numpy(), actor_codes, n_titles, len(actor_names))
+    D, _ = _incidence_matrix(directors["title_id"].to_numpy(), dir_codes, n_titles, len(dir_names))
+
+    # Co-protagonistas: A^T A (solo triángulo superior, sin diagonal)
+    costar = At @ A
+    costar_pairs = _top_pairs(sp.triu(costar, k=1), actor_names, actor_names, topn, "Actor A", "Actor B")
+
+    # Actor–director: A^T D
+    actor_dir = At @ D
+    actor_dir_pairs = _top_pairs(actor_dir, actor_names, dir_names, topn, "Actor", "Director")
+
+    # Red conjunta de personas (un nodo por nombre, sin importar el rol); se une el vocabulario,
+    # no los tokens, para no volver a factorizar millones de strings
+    people_names = np.asarray(sorted(set(actor_names).union(dir_names)), dtype=object)
+    people_idx = pd.Index(people_names)
+    actor_to_people = people_idx.get_indexer(actor_names)
+    dir_to_people = people_idx.get_indexer(dir_names)
+
+    people_codes = np.concatenate([actor_to_people[actor_codes], dir_to_people[dir_codes]])
+    title_ids = np.concatenate([cast["title_id"].to_numpy(), directors["title_id"].to_numpy()])
+    P, Pt = _incidence_matrix(title_ids, people_codes, n_titles, len(people_names))
+
+    adj = Pt @ P
+    adj.setdiag(0)
+    adj.eliminate_zeros()
+
+    degree = np.diff(adj.indptr)
+    weighted = np.asarray(adj.sum(axis=1)).ravel()
+    pr = _pagerank(adj)
+
+    # Títulos por rol, alineados al vocabulario conjunto
+    as_actor = np.zeros(len(people_names), dtype=np.int64)
+    as_actor[actor_to_people] = A.getnnz(axis=0)
+    as_director = np.zeros(len(people_names), dtype=np.int64)
+    as_director[dir_to_people] = D.getnnz(axis=0)
+
+    ranking = pd.DataFrame({
+        "titulos_actor": as_actor,
+        "titulos_director": as_director,
+        "grado": degree,
+        "grado_ponderado": weighted.astype(int),
+        "pagerank": pr,
+    }, index=pd.Index(people_names, name="persona"))
+    ranking = ranking.sort_values(["pagerank", "grado"], ascending=False, kind="mergesort")
+
+    return {
+        "costar_pairs": costar_pairs,
+        "actor_director_pairs": actor_dir_pairs,
+        "ranking": ranking,
+    }
+
+
+def _plot_barh_pairs(pairs: pd.DataFrame, left_col: str, right_col: str, title: str, outpath: str):
+    if pairs is None or pairs.empty:
+        return
+
+    df_plot = pairs.iloc[::-1]  # asc para barh
+    labels = (df_plot[left_col] + " — " + df_plot[right_col]).tolist()
+
+    plt.figure(figsize=(12, max(5, 0.5 * len(df_plot))), facecolor=ps.COLOR_BG)
+    ax = plt.gca()
+    ps.apply_netflix_style(ax)
+
+    ax.barh(labels, df_plot["Total"].values, color=ps.COLOR_MOVIE, edgecolor=ps.COLOR_TV, linewidth=0.6)
+
+    ax.set_xlabel("Títulos en común", color=ps.COLOR_TV)
+    ax.set_title(title, fontsize=13, color=ps.COLOR_TV)
+    ax.xaxis.set_major_locator(MaxNLocator(integer=True, min_n_ticks=6))
+
+    ps.add_source_note()
+    plt.tight_layout()
+    ps.save_figure(outpath, dpi=220, facecolor=ps.COLOR_BG)
+    plt.close()
+
+def _plot_barh_pagerank(ranking: pd.DataFrame, topn: int, outpath: str):
+    if ranking is None or ranking.empty:
+        return
+
+    df_plot = ranking.head(topn).iloc[::-1]
+    colors = [ps.COLOR_TV if d > a else ps.COLOR_MOVIE
+              for a, d in zip(df_plot["titulos_actor"], df_plot["titulos_director"])]
+
+    plt.figure(figsize=(12, max(5, 0.5 * len(df_plot))), facecolor=ps.COLOR_BG)
+    ax = plt.gca()
+    ps.apply_netflix_style(ax)
+
+    ax.barh(df_plot.index.tolist(), df_plot["pagerank"].values, color=colors, edgecolor=ps.COLOR_TV, linewidth=0.6)
+
+    ax.set_xlabel("PageRank", color=ps.COLOR_TV)
+    ax.set_title("Top personas por centralidad (PageRank en la red de colaboración)", fontsize=13, color=ps.COLOR_TV)
+    handles = [plt.Rectangle((0, 0), 1, 1, color=ps.COLOR_MOVIE), plt.Rectangle((0, 0), 1, 1, color=ps.COLOR_TV)]
+    ax.legend(handles, ["Mayormente actor", "Mayormente director"], loc="lower right")
+
+    ps.add_source_note()
+    plt.tight_layout()
+    ps.save_figure(outpath, dpi=220, facecolor=ps.COLOR_BG)
+    plt.close()
+
+
+def run(df: pd.DataFrame, outdir: str = "outputs", topn: int = 20, tables: dict | None = None, mask=None) -> dict:
+    outdir_q11 = os.path.join(outdir, "q11")
+    os.makedirs(outdir_q11, exist_ok=True)
+    df, tables = dv.restrict(df, tables, mask, COLUMNS)
+
+    cast, directors, n_titles = _prepare_people(df, tables)
+    res = _collaboration_graph(cast, directors, n_titles, topn=topn)
+
+    res["costar_pairs"].to_csv(os.path.join(outdir_q11, "q11_top_parejas_coprotagonistas.csv"), index=False)
+    res["actor_director_pairs"].to_csv(os.path.join(outdir_q11, "q11_top_actor_director.csv"), index=False)
+    res["ranking"].to_csv(os.path.join(outdir_q11, "q11_ranking_personas.csv"))
+
+    _plot_barh_pairs(res["costar_pairs"], "Actor A", "Actor B",
+                     f"Top {topn} parejas de co-protagonistas",
+                     os.path.join(outdir_q11, "q11_top_parejas_coprotagonistas_barh.png"))
+    _plot_barh_pairs(res["actor_director_pairs"], "Actor", "Director",
+                     f"Top {topn} parejas actor–director",
+                     os.path.join(outdir_q11, "q11_top_actor_director_barh.png"))
+    _plot_barh_pagerank(res["ranking"], topn,
+                        os.path.join(outdir_q11, "q11_top_personas_pagerank_barh.png"))
+
+    return res
@@ -0,0 +1,214 @@
+# Pregunta 12:
+# ¿Cuánto tarda un título en llegar al catálogo desde su estreno? ¿Cambia según el tipo, el país o el género?
+
+# Pipeline:
+# 1. Extraer year_added con add_year_and_month y tomar release_year del CSV
+# 2. Codificar cada título como una celda (tipo, release_year, year_added) sobre rangos densos de años
+# 3. Matriz de cohortes release_year × year_added por tipo con un solo np.bincount
+# 4. Opcional (by="country" / "genre"): cruzar la explosión (title_id, grupo) con la celda de cada
+#    título por índice de arrays, sin armar el frame producto país/género × cohorte
+# 5. Percentiles del lag (year_added - release_year) a partir de histogramas de enteros
+# 6. Graficar heatmap por tipo y exportar tablas
+
+# Outputs:
+# - outputs/q12/q12_matriz_lanzamiento_catalogo.png
+# - outputs/q12/q12_lag_percentiles.csv
+# - outputs/q12/q12_lag_percentiles_<by>.csv (con by="country" o "genre")
+
+# Cleaning:
+# - cl.add_year_and_month(df): Extrae 'year_added' a partir de 'date_added'.
+# - cl.expand_and_normalize_countries(df): País normalizado (by="country", tabla "countries").
+# - cl.explode_listed_in(df) / cl.add_genre_from_listed_in(df): Género canónico (by="genre", tabla "genres").
+
+from __future__ import annotations
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from utils import plot_style as ps
+from utils import derived as dv
+from utils import sketches as sk
+
+# Tablas derivadas que consume (ver utils.derived); "countries" para by="country" (default en
+# main.py), "genres" se construye aparte si se pide by="genre"
+TABLES = ("dates", "countries")
+# Columnas del CSV que necesita (incluye las de sus tablas derivadas)
+COLUMNS = ("release_year", "date_added", "type", "country")
+
+TYPES = ("Movie", "TV Show")
+PERCENTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+# by -> (tabla derivada con title_id, columna de grupo)
+_GROUP_TABLES = {"country": ("countries", "country_final"), "genre": ("genres", "genre_main")}
+
+
+# Celda de cada título (fila de df) en el cubo tipo × release × added; -1 si falta algún dato.
+# Devuelve (celdas, años de release, años de agregado).
+def _encode_titles(df: pd.DataFrame, tables: dict | None = None) -> tuple:
+    required = {"release_year", "date_added", "type"}
+    missing = required.difference(df.columns)
+    if missing:
+        raise ValueError(f"Faltan columnas requeridas: {sorted(missing)}")
+
+    dates = dv.with_source(dv.get("dates", df, tables), df, ["type", "release_year"])
+    type_code = pd.Index(TYPES).get_indexer(dates["type"].astype(str).str.strip())
+    rel = pd.to_numeric(dates["release_year"], errors="coerce").to_numpy(dtype=float)
+    add = dates["year_added"].to_numpy(dtype=float)
+    valid = (type_code >= 0) & ~np.isnan(rel) & ~np.isnan(add)
+
+    cells = np.full(len(dates), -1, dtype=np.int64)
+    if not valid.any():
+        return cells, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    rel_i, add_i = rel[valid].astype(np.int64), add[valid].astype(np.int64)
+    rel_years = np.arange(rel_i.min(), rel_i.max() + 1)
+    add_years = np.arange(add_i.min(), add_i.max() + 1)
+    cells[valid] = (type_code[valid] * len(rel_years) + (rel_i - rel_years[0])) * len(add_years) + (add_i - add_years[0])
+    return cells, rel_years, add_years
+
+
+# Cubo de conteos (tipo, release, added) con un solo bincount
+def _cohort_cube(cells: np.ndarray, rel_years: np.ndarray, add_years: np.ndarray) -> np.ndarray:
+    shape = (len(TYPES), len(rel_years), len(add_years))
+    return np.bincount(cells[cells >= 0], minlength=int(np.prod(shape))).reshape(shape)
+
+
+# Índice de lag de cada celda: lag = year_added - release_year, desplazado para arrancar en 0
+def _cell_lag_index(rel_years: np.ndarray, add_years: np.ndarray) -> tuple:
+    lag_min = int(add_years[0] - rel_years[-1])
+    lag = add_years[None, :] - rel_years[:, None]
+    return np.tile((lag - lag_min).ravel(), len(TYPES)), lag_min
+
+
+def _lag_stats(counts: np.ndarray, lag_min: int) -> dict:
+    h = sk.IntHistogram(counts)
+    if h.count == 0:
+        return {}
+    out = {"count": h.count, "mean": h.mean() + lag_min}
+    for p in PERCENTILES:
+        out[f"p{int(round(p * 100))}"] = h.quantile(p) + lag_min
+    return out
+
+
+# Percentiles del lag por tipo, sumando el cubo por diagonales (bincount con pesos)
+def _lag_percentiles(cube: np.ndarray, rel_years: np.ndarray, add_years: np.ndarray) -> pd.DataFrame:
+    if cube.sum() == 0:
+        return pd.DataFrame(columns=["count", "mean"]).rename_axis("type")
+    lag_idx, lag_min = _cell_lag_index(rel_years, add_years)
+    n_lags = int(lag_idx.max()) + 1
+    type_of_cell = np.repeat(np.arange(len(TYPES)), len(rel_years) * len(add_years))
+    hist = np.bincount(type_of_cell * n_lags + lag_idx, weights=cube.ravel(),
+                       minlength=len(TYPES) * n_lags).astype(np.int64).reshape(len(TYPES), n_lags)
+    rows = {t: _lag_stats(hist[i], lag_min) for i, t in enumerate(TYPES)}
+    out = pd.DataFrame.from_dict({t: r for t, r in rows.items() if r}, orient="index")
+    out.index.name = "type"
+    return out
+
+
+# Cohortes y percentiles por grupo (país / género). Cada fila de la explosión aporta la celda
+# de su título (cells[title_id]); nunca se arma el frame grupo × cohorte.
+def _split_by_group(df: pd.DataFrame, cells: np.ndarray, rel_years: np.ndarray, add_years: np.ndarray,
+                    by: str, tables: dict | None = None) -> tuple:
+    if by not in _GROUP_TABLES:
+        raise ValueError(f"Agrupación no soportada: {by} (opciones: {sorted(_GROUP_TABLES)})")
+    table, col = _GROUP_TABLES[by]
+    exploded = dv.get(table, df, tables)[["title_id", col]].drop_duplicates()
+
+    g_codes, g_names = pd.factorize(exploded[col], sort=True)
+    row_cells = cells[exploded["title_id"].to_numpy()]
+    ok = (g_codes >= 0) & (row_cells >= 0)
+    g_codes, row_cells = g_codes[ok].astype(np.int64), row_cells[ok]
+    if row_cells.size == 0:
+        return (pd.DataFrame(columns=[by, "type", "release_year", "year_added", "count"]),
+                pd.DataFrame(columns=[by, "type", "count", "mean"]))
+
+    n_rel, n_add = len(rel_years), len(add_years)
+    n_cells = len(TYPES) * n_rel * n_add
+
+    # Cohortes no vacías en formato largo (grupo, tipo, release_year, year_added, count)
+    keys, counts = np.unique(g_codes * n_cells + row_cells, return_counts=True)
+    g, cell = np.divmod(keys, n_cells)
+    t, rest = np.divmod(cell, n_rel * n_add)
+    r, a = np.divmod(rest, n_add)
+    cohortes = pd.DataFrame({
+        by: np.asarray(g_names)[g],
+        "type": np.asarray(TYPES)[t],
+        "release_year": rel_years[r],
+        "year_added": add_years[a],
+        "count": counts,
+    })
+
+    # Histograma de lag por (grupo, tipo) con un bincount sobre la clave combinada
+    lag_idx, lag_min = _cell_lag_index(rel_years, add_years)
+    n_lags = int(lag_idx.max()) + 1
+    type_of_cell = row_cells // (n_rel * n_add)
+    key = (g_codes * len(TYPES) + type_of_cell) * n_lags + lag_idx[row_cells]
+    hist = np.bincount(key, minlength=len(g_names) * len(TYPES) * n_lags).reshape(len(g_names), len(TYPES), n_lags)
+
+    rows = []
+    for gi, name in enumerate(g_names):
+        for ti, tipo in enumerate(TYPES):
+            st = _lag_stats(hist[gi, ti], lag_min)
+            if st:
+                rows.append({by: name, "type": tipo, **st})
+    return cohortes, pd.DataFrame(rows)
+
+
+def _plot_cohort_heatmaps(matrices: dict, outpath: str) -> None:
+    present = {t: m for t, m in matrices.items() if m.values.sum() > 0}
+    if not present:
+        return
+
+    n_rows = max(len(m) for m in present.values())
+    fig, axes = plt.subplots(1, len(present), figsize=(7 * len(present), max(6, 0.12 * n_rows)),
+                             facecolor=ps.COLOR_BG, squeeze=False)
+
+    for ax, (tipo, m) in zip(axes[0], present.items()):
+        ps.apply_netflix_style(ax)
+        im = ax.imshow(m.values, aspect="auto", origin="lower")
+
+        step = max(1, len(m.index) // 20)
+        ax.set_yticks(range(0, len(m.index), step))
+        ax.set_yticklabels(m.index[::step].tolist(), fontsize=8)
+        ax.set_xticks(range(len(m.columns)))
+        ax.set_xticklabels(m.columns.tolist(), rotation=45, ha="right", fontsize=8)
+        ax.set_xlabel("Año de agregado", color=ps.COLOR_TV)
+        ax.set_ylabel("Año de estreno", color=ps.COLOR_TV)
+        ax.set_title(f"{tipo}: estreno × agregado al catálogo", fontsize=12, color=ps.COLOR_TV)
+
+        cbar = fig.colorbar(im, ax=ax, fraction=0.04, pad=0.03)
+        cbar.set_label("# títulos")
+
+    ps.add_source_note()
+    plt.tight_layout()
+    ps.save_figure(outpath, dpi=220, facecolor=ps.COLOR_BG, bbox_inches="tight")
+    plt.close(fig)
+
+
+def run(df: pd.DataFrame, outdir: str = "outputs", by: str | None = None, tables: dict | None = None, mask=None) -> dict:
+    outdir_q12 = os.path.join(outdir, "q12")
+    os.makedirs(outdir_q12, exist_ok=True)
+    df, tables = dv.restrict(df, tables, mask, COLUMNS)
+
+    cells, rel_years, add_years = _encode_titles(df, tables)
+    cube = _cohort_cube(cells, rel_years, add_years)
+    matrices = {
+        tipo: pd.DataFrame(cube[i],
+                           index=pd.Index(rel_years, name="release_year"),
+                           columns=pd.Index(add_years, name="year_added"))
+        for i, tipo in enumerate(TYPES)
+    }
+    percentiles = _lag_percentiles(cube, rel_years, add_years)
+
+    _plot_cohort_heatmaps(matrices, os.path.join(outdir_q12, "q12_matriz_lanzamiento_catalogo.png"))
+    percentiles.to_csv(os.path.join(outdir_q12, "q12_lag_percentiles.csv"))
+
+    out = {
+        "matrices": matrices,
+        "lag_percentiles": percentiles,
+    }
+    if by is not None:
+        cohortes, pct_grupo = _split_by_group(df, cells, rel_years, add_years, by, tables)
+        pct_grupo.to_csv(os.path.join(outdir_q12, f"q12_lag_percentiles_{by}.csv"), index=False)
+        out["cohortes_por_grupo"] = cohortes
+        out["lag_percentiles_por_grupo"] = pct_grupo
+    return out
@@ -11,11 +11,17 @@
 
 from __future__ import annotations
 import os
+from functools import partial
 import pandas as pd
-import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator, MultipleLocator, PercentFormatter
+from utils import derived as dv
 from utils import plot_style as ps
 
+# Tablas derivadas que consume (ver utils.derived)
+TABLES = ()
+# Columnas del CSV que necesita (incluye las de sus tablas derivadas)
+COLUMNS = ("release_year", "type")
+
 
 # Calcula la proporción de películas/series por release_year, devuelve DataFrame con columnas: Movie, TV Show, total, prop_movies, prop_series
 def calculate_proportion(df):
@@ -44,14 +50,7 @@ def calculate_proportion(df):
     return counts[["Movie", "TV Show", "total", "prop_movies", "prop_series"]]
 
 
-def plot_proportion(counts, outpath):
-    if counts.empty:
-        return
-
-    plt.figure(figsize=(10, 6), facecolor=ps.COLOR_BG)
-    ax = plt.gca()
-    ps.apply_netflix_style(ax)
-
+def _draw_proportion(counts, fig, ax):
     ax.plot(counts.index, counts["prop_movies"], label="Movies", linewidth=2, color=ps.COLOR_MOVIE)
     ax.plot(counts.index, counts["prop_series"], label="Series", linewidth=2, color=ps.COLOR_TV)
 
@@ -67,15 +66,17 @@ def plot_proportion(counts, outpath):
     ax.grid(True, axis="y", alpha=0.2, linestyle="--")
     ax.legend(title="Content type")
 
-    ps.add_source_note()
-    plt.tight_layout()
-    plt.savefig(outpath, dpi=220, facecolor=ps.COLOR_BG)
-    plt.close()
+
+def plot_proportion(counts, outpath):
+    if counts.empty:
+        return
+    ps.STANDARD.render(partial(_draw_proportion, counts), outpath)
 
 
-def run(df, outdir="outputs"):
+def run(df, outdir="outputs", tables=None, mask=None):
     outdir_q1 = os.path.join(outdir, "q1")
     os.makedirs(outdir_q1, exist_ok=True)
+    df, _ = dv.restrict(df, tables, mask, COLUMNS)
 
     counts = calculate_proportion(df)
     plot_proportion(counts, os.path.join(outdir_q1, "q1_proportion_movies_series.png"))
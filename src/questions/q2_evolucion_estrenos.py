@@ -16,15 +16,21 @@
 
 from __future__ import annotations
 import os
+from functools import partial
 import pandas as pd
-import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
 from utils import plot_style as ps
 from utils import cleaning as cl
+from utils import derived as dv
+
+# Tablas derivadas que consume (ver utils.derived)
+TABLES = ("dates",)
+# Columnas del CSV que necesita (incluye las de sus tablas derivadas)
+COLUMNS = ("date_added", "type")
 
 # Genera una tabla por año con conteos de Movie y TV Show a partir de 'date_added'.
-def _aggregate_releases_by_year_and_type(df: pd.DataFrame) -> pd.DataFrame:
-    df2 = cl.add_year_and_month(df)  
+def _aggregate_releases_by_year_and_type(df: pd.DataFrame, tables: dict | None = None) -> pd.DataFrame:
+    df2 = dv.with_source(dv.get("dates", df, tables), df, "type")
     grp = (
         df2.dropna(subset=["year_added", "type"])
            .groupby(["year_added", "type"], as_index=False)
@@ -37,11 +43,7 @@ def _aggregate_releases_by_year_and_type(df: pd.DataFrame) -> pd.DataFrame:
             pivot[col] = 0
     return pivot[["Movie", "TV Show"]]
 
-def _plot_lines(pivot: pd.DataFrame, outpath: str) -> None:
-    plt.figure(figsize=(10, 5), facecolor=ps.COLOR_BG)
-    ax = plt.gca()
-    ps.apply_netflix_style(ax)
-
+def _draw_lines(pivot: pd.DataFrame, fig, ax) -> None:
     ax.plot(pivot.index, pivot["Movie"],   label="Movies",   color=ps.COLOR_MOVIE, linewidth=2)
     ax.plot(pivot.index, pivot["TV Show"], label="TV Shows", color=ps.COLOR_TV,    linewidth=2)
 
@@ -53,16 +55,7 @@ def _plot_lines(pivot: pd.DataFrame, outpath: str) -> None:
     ax.grid(True, alpha=0.3)
     ax.legend()
 
-    ps.add_source_note()  
-    plt.tight_layout()
-    plt.savefig(outpath, dpi=220, facecolor=ps.COLOR_BG)
-    plt.close()
-
-def _plot_area_stacked(pivot: pd.DataFrame, outpath: str) -> None:
-    plt.figure(figsize=(10, 5), facecolor=ps.COLOR_BG)
-    ax = plt.gca()
-    ps.apply_netflix_style(ax)
-
+def _draw_area_stacked(pivot: pd.DataFrame, fig, ax) -> None:
     ax.stackplot(
         pivot.index,
         pivot["Movie"],
@@ -77,18 +70,20 @@ def _plot_area_stacked(pivot: pd.DataFrame, outpath: str) -> None:
     ax.set_ylabel("Cantidad de estrenos", color=ps.COLOR_TV)
     ax.legend(loc="upper left")
 
-    ps.add_source_note()
-    plt.tight_layout()
-    plt.savefig(outpath, dpi=220, facecolor=ps.COLOR_BG)
-    plt.close()
+# Los dos gráficos se dibujan en paralelo con la capa OO de plot_style (sin pyplot)
+def _plot_all(pivot: pd.DataFrame, outdir_q2: str) -> None:
+    ps.render_many([
+        (ps.WIDE, partial(_draw_lines, pivot), os.path.join(outdir_q2, "q2_lineas_estrenos.png")),
+        (ps.WIDE, partial(_draw_area_stacked, pivot), os.path.join(outdir_q2, "q2_area_apilada.png")),
+    ])
 
-def run(df: pd.DataFrame, outdir: str = "outputs") -> pd.DataFrame:
+def run(df: pd.DataFrame, outdir: str = "outputs", tables: dict | None = None, mask=None) -> pd.DataFrame:
     outdir_q2 = os.path.join(outdir, "q2")
     os.makedirs(outdir_q2, exist_ok=True)
+    df, tables = dv.restrict(df, tables, mask, COLUMNS)
 
-    pivot = _aggregate_releases_by_year_and_type(df)
+    pivot = _aggregate_releases_by_year_and_type(df, tables)
 
-    _plot_lines(pivot, os.path.join(outdir_q2, "q2_lineas_estrenos.png"))
-    _plot_area_stacked(pivot, os.path.join(outdir_q2, "q2_area_apilada.png"))
+    _plot_all(pivot, outdir_q2)
 
     return pivot
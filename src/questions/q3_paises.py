@@ -4,8 +4,12 @@
 # Pipeline:
 # 1) Limpia/expande países con utils.cleaning.expand_and_normalize_countries
 # 2) Agrega por país y tipo
-# 3) Ordena por Total y arma segmentos Top 1–10 / 11–20 / 21–30
+# 3) Selecciona el Top 30 por Total (selección parcial) y arma segmentos Top 1–10 / 11–20 / 21–30;
+#    el ranking completo (pivot_total, para export y los diffs de batch.py) es un sort_values aparte
 # 4) Grafica barras horizontales agrupadas
+#
+# Map-reduce por shards (mapreduce.py): map_partials cuenta país × tipo en un bloque de filas,
+# merge_partials suma los conteos y run(partials=...) arma el pivote desde la suma.
 
 # Salidas:
 # - outputs/q3/q3_top01_10_grouped_barh.png
@@ -20,24 +24,44 @@ import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
 from utils import plot_style as ps
 from utils import cleaning as cl
+from utils import derived as dv
+from utils import partials as pu
+from utils import ranking as rk
 
+# Países de los segmentos graficados (Top 1–30)
+TOP_K = 30
+# Tablas derivadas que consume (ver utils.derived)
+TABLES = ("countries",)
+# Columnas del CSV que necesita (incluye las de sus tablas derivadas)
+COLUMNS = ("country", "type")
 
-# Agrupa por país y tipo, calcula totales y ordena por Total desc
-def _pivot_country_type(df_expanded: pd.DataFrame) -> pd.DataFrame:
-    grp = df_expanded.groupby(["country_final", "type"], as_index=False).size()
+
+# Conteos país × tipo de un bloque de filas
+def map_partials(df: pd.DataFrame, tables: dict | None = None) -> dict:
+    if "country" not in df.columns or "type" not in df.columns:
+        raise ValueError("El DataFrame debe contener 'country' y 'type'.")
+    countries = dv.with_source(dv.get("countries", df, tables), df, "type")
+    return {"country_type": pu.tally(countries, ["country_final", "type"])}
+
+def merge_partials(parts: list) -> dict:
+    return {"country_type": pu.merge_tallies(p["country_type"] for p in parts)}
+
+# Pivotea los conteos por país y tipo y calcula totales (índice en orden alfabético de país)
+def _pivot_country_type(country_type: pd.Series) -> pd.DataFrame:
+    grp = country_type.rename("size").reset_index()
     pivot = grp.pivot(index="country_final", columns="type", values="size").fillna(0).astype(int)
     for col in ("Movie", "TV Show"):
         if col not in pivot.columns:
             pivot[col] = 0
     pivot["Total"] = pivot["Movie"] + pivot["TV Show"]
-    pivot = pivot.sort_values("Total", ascending=False)
     return pivot[["Movie", "TV Show", "Total"]]
 
-# Devuelve tres cortes ordenados asc por Total para graficar 
-def _slice_ranks(pivot_total: pd.DataFrame):
-    top_1_10  = pivot_total.iloc[:10].copy().sort_values("Total", ascending=True)
-    top_11_20 = pivot_total.iloc[10:20].copy().sort_values("Total", ascending=True)
-    top_21_30 = pivot_total.iloc[20:30].copy().sort_values("Total", ascending=True)
+# Top 30 por Total (empates por nombre de país) en tres cortes ordenados asc por Total para graficar
+def _slice_ranks(pivot: pd.DataFrame):
+    top = rk.top_k_frame(pivot, "Total", TOP_K)
+    top_1_10  = top.iloc[:10].copy().sort_values("Total", ascending=True)
+    top_11_20 = top.iloc[10:20].copy().sort_values("Total", ascending=True)
+    top_21_30 = top.iloc[20:30].copy().sort_values("Total", ascending=True)
     return top_1_10, top_11_20, top_21_30
 
 
@@ -83,19 +107,26 @@ def _plot_grouped_barh(df_slice: pd.DataFrame, title: str, outpath: str) -> None
     ax.legend()
     ps.add_source_note("Fuente: Netflix dataset. Elaboración propia")
     plt.tight_layout()
-    plt.savefig(outpath, dpi=220, facecolor=ps.COLOR_BG)
+    ps.save_figure(outpath, dpi=220, facecolor=ps.COLOR_BG)
     plt.close()
 
 
-def run(df: pd.DataFrame, outdir: str = "outputs") -> dict:
+# 'partials': conteos ya sumados (merge_partials); si no vienen se calculan sobre df
+def run(df: pd.DataFrame, outdir: str = "outputs", tables: dict | None = None,
+        partials: dict | None = None, mask=None) -> dict:
     outdir_q3 = os.path.join(outdir, "q3")
     os.makedirs(outdir_q3, exist_ok=True)
-
-    if "country" not in df.columns or "type" not in df.columns:
-        raise ValueError("El DataFrame debe contener 'country' y 'type'.")
-    df_expanded = cl.expand_and_normalize_countries(df)
-    pivot_total = _pivot_country_type(df_expanded)
-    top_1_10, top_11_20, top_21_30 = _slice_ranks(pivot_total)
+    if partials is not None and mask is not None:
+        raise ValueError("'partials' y 'mask' no se pueden combinar (los parciales son del catálogo entero).")
+    df, tables = dv.restrict(df, tables, mask, COLUMNS)
+
+    if partials is None:
+        partials = map_partials(df, tables)
+    pivot = _pivot_country_type(partials["country_type"])
+    top_1_10, top_11_20, top_21_30 = _slice_ranks(pivot)
+    # ranking completo (Total desc, empates por país: el índice ya es alfabético) para export,
+    # la verificación de --sample y los diffs de batch.py, que usan todos los países
+    pivot_total = pivot.sort_values("Total", ascending=False, kind="stable")
 
     _plot_grouped_barh(top_1_10,  "Top 1–10 países (Movies vs TV Shows)",
                        os.path.join(outdir_q3, "q3_top01_10_grouped_barh.png"))
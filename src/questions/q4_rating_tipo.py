@@ -6,6 +6,9 @@
 # 2. Calcular pivote de conteos y proporciones por tipo y rating
 # 3. Graficar barras agrupadas y apiladas 100%
 # 4. Devolver los DataFrames de conteos y proporciones
+#
+# Map-reduce por shards (mapreduce.py): map_partials cuenta rating_norm × tipo en un bloque de
+# filas, merge_partials suma los conteos y run(partials=...) arma el pivote desde la suma.
 
 # Outputs:
 # - outputs/q4/q4_rating_tipo_grouped_barh.png
@@ -21,20 +24,32 @@ import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
 from utils import plot_style as ps
 from utils import cleaning as cl
+from utils import derived as dv
+from utils import partials as pu
+
+# Tablas derivadas que consume (ver utils.derived)
+TABLES = ("ratings",)
+# Columnas del CSV que necesita (incluye las de sus tablas derivadas)
+COLUMNS = ("rating", "type")
 
-def _prepare_ratings(df: pd.DataFrame) -> pd.DataFrame:
+def _prepare_ratings(df: pd.DataFrame, tables: dict | None = None) -> pd.DataFrame:
 
     if "rating" not in df.columns or "type" not in df.columns:
         raise ValueError("El DataFrame debe contener 'rating' y 'type'.")
 
-    dfx = df.dropna(subset=["rating", "type"]).copy()
-    dfx["type"] = dfx["type"].astype(str).str.strip()
-    dfx = cl.normalize_and_explode_ratings(dfx)  
-    return dfx
+    # dropna(rating, type) + strip de 'type' + normalize_and_explode_ratings
+    return dv.get("ratings", df, tables)
+
+# Conteos rating_norm × tipo de un bloque de filas
+def map_partials(df: pd.DataFrame, tables: dict | None = None) -> dict:
+    return {"rating_type": pu.tally(_prepare_ratings(df, tables), ["rating_norm", "type"])}
+
+def merge_partials(parts: list) -> dict:
+    return {"rating_type": pu.merge_tallies(p["rating_type"] for p in parts)}
 
-# Agrupa por rating_norm y tipo, calcula totales y ordena por Total desc
-def _pivot_counts(dfx: pd.DataFrame) -> pd.DataFrame:
-    grp = dfx.groupby(["rating_norm", "type"], as_index=False).size()
+# Pivotea los conteos por rating_norm y tipo, calcula totales y ordena por Total desc
+def _pivot_counts(rating_type: pd.Series) -> pd.DataFrame:
+    grp = rating_type.rename("size").reset_index()
     pivot = grp.pivot(index="rating_norm", columns="type", values="size").fillna(0).astype(int)
 
     for col in ("Movie", "TV Show"):
@@ -81,7 +96,7 @@ def _plot_grouped_barh_counts(pivot_counts: pd.DataFrame, outpath: str) -> None:
 
     ps.add_source_note()  
     plt.tight_layout()
-    plt.savefig(outpath, dpi=220, facecolor=ps.COLOR_BG)
+    ps.save_figure(outpath, dpi=220, facecolor=ps.COLOR_BG)
     plt.close()
 
 def _plot_stacked_100_props(pivot_props: pd.DataFrame, outpath: str) -> None:
@@ -119,16 +134,22 @@ def _plot_stacked_100_props(pivot_props: pd.DataFrame, outpath: str) -> None:
 
     ps.add_source_note()
     plt.tight_layout()
-    plt.savefig(outpath, dpi=220, facecolor=ps.COLOR_BG)
+    ps.save_figure(outpath, dpi=220, facecolor=ps.COLOR_BG)
     plt.close()
 
 
-def run(df: pd.DataFrame, outdir: str = "outputs") -> dict:
+# 'partials': conteos ya sumados (merge_partials); si no vienen se calculan sobre df
+def run(df: pd.DataFrame, outdir: str = "outputs", tables: dict | None = None,
+        partials: dict | None = None, mask=None) -> dict:
     outdir_q4 = os.path.join(outdir, "q4")
     os.makedirs(outdir_q4, exist_ok=True)
+    if partials is not None and mask is not None:
+        raise ValueError("'partials' y 'mask' no se pueden combinar (los parciales son del catálogo entero).")
+    df, tables = dv.restrict(df, tables, mask, COLUMNS)
 
-    base = _prepare_ratings(df)
-    pivot_counts = _pivot_counts(base)
+    if partials is None:
+        partials = map_partials(df, tables)
+    pivot_counts = _pivot_counts(partials["rating_type"])
     pivot_props  = _pivot_props(pivot_counts)
 
     _plot_grouped_barh_counts(pivot_counts, os.path.join(outdir_q4, "q4_rating_tipo_grouped_barh.png"))
@@ -4,8 +4,11 @@
 # Pipeline:
 # 1. Limpiar y normalizar países y ratings
 # 2. Mapear ratings a audiencias (Adulto/Infantil, Familiar/No Familiar)
-# 3. Calcular ranking de países por audiencia
+# 3. Seleccionar el Top 30 de países por audiencia (selección parcial por Total)
 # 4. Graficar los segmentos de países por audiencia
+#
+# Map-reduce por shards (mapreduce.py): map_partials cuenta país × rating_norm en un bloque de
+# filas, merge_partials suma los conteos y run(partials=...) deriva las dos audiencias desde la suma.
 
 # Outputs:
 # - outputs/q5/q5_top01_10_audiencias_pais.png
@@ -23,6 +26,17 @@ import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
 from utils import plot_style as ps
 from utils import cleaning as cl
+from utils import derived as dv
+from utils import partials as pu
+from utils import ranking as rk
+from utils.results import Result
+
+# Países de los segmentos graficados (Top 1–30)
+TOP_K = 30
+# Tablas derivadas que consume (ver utils.derived)
+TABLES = ("countries_ratings",)
+# Columnas del CSV que necesita (incluye las de sus tablas derivadas)
+COLUMNS = ("country", "rating")
 
 FAMILIAR = {"TV-PG", "TV-G", "PG", "TV-Y", "TV-Y7"}
 NO_FAMILIAR = {"TV-MA", "R", "NC-17", "PG-13", "NR", "TV-Y7-FV"}
@@ -36,43 +50,51 @@ def map_rating_to_familiar(rating: str) -> str:
         return "No Familiar"
 
 
-# Normaliza países y ratings, mapea a audiencias 
-def _prepare_base(df: pd.DataFrame, mode: str = "adult_kids") -> pd.DataFrame:
+# Audiencia de cada rating normalizado según el modo
+def _audience(ratings: pd.Series, mode: str) -> pd.Series:
+    if mode == "adult_kids":
+        return ratings.map(lambda x: cl.map_rating_to_audience(x, mode="adult_kids"))
+    return ratings.map(map_rating_to_familiar)
 
+def _countries_ratings(df: pd.DataFrame, tables: dict | None = None) -> pd.DataFrame:
     if "country" not in df.columns or "rating" not in df.columns:
         raise ValueError("El DataFrame debe contener 'country' y 'rating'.")
+    # países expandidos + ratings normalizados (tabla compartida: no se modifica in place)
+    return dv.get("countries_ratings", df, tables)
 
-    
-    df_c = cl.expand_and_normalize_countries(df)
-
-    df_r = cl.normalize_and_explode_ratings(df_c)
-
-    if mode == "adult_kids":
-        df_r["audiencia"] = df_r["rating_norm"].map(
-            lambda x: cl.map_rating_to_audience(x, mode="adult_kids")
-        )
-    elif mode == "familiar":
-        df_r["audiencia"] = df_r["rating_norm"].map(map_rating_to_familiar)
-
-    return df_r
-
-# Agrupa por país y audiencia, calcula totales y ordena por Total desc
-def _pivot_country_audience(df_base: pd.DataFrame) -> pd.DataFrame:
-    grp = df_base.groupby(["country_final", "audiencia"], as_index=False).size()
+# Normaliza países y ratings, mapea a audiencias 
+def _prepare_base(df: pd.DataFrame, mode: str = "adult_kids", tables: dict | None = None) -> pd.DataFrame:
+    df_r = _countries_ratings(df, tables)
+    return df_r.assign(audiencia=_audience(df_r["rating_norm"], mode))
+
+# Conteos país × rating_norm de un bloque de filas; el rating faltante cuenta como "" (misma
+# audiencia que NaN) para que tally no lo descarte
+def map_partials(df: pd.DataFrame, tables: dict | None = None) -> dict:
+    df_r = _countries_ratings(df, tables)
+    df_r = df_r.assign(rating_norm=df_r["rating_norm"].fillna(""))
+    return {"country_rating": pu.tally(df_r, ["country_final", "rating_norm"])}
+
+def merge_partials(parts: list) -> dict:
+    return {"country_rating": pu.merge_tallies(p["country_rating"] for p in parts)}
+
+# Conteos país × audiencia desde los conteos país × rating_norm, pivoteados, con Total (índice en
+# orden alfabético de país)
+def _pivot_country_audience(country_rating: pd.Series, mode: str) -> pd.DataFrame:
+    keys = country_rating.index.to_frame(index=False)
+    grp = (country_rating.reset_index(drop=True)
+           .groupby([keys["country_final"], _audience(keys["rating_norm"], mode).rename("audiencia")])
+           .sum().rename("size").reset_index())
     pivot = grp.pivot(index="country_final", columns="audiencia", values="size").fillna(0).astype(int)
 
-    for c in df_base["audiencia"].unique():
-        if c not in pivot.columns:
-            pivot[c] = 0
-
     pivot["Total"] = pivot.sum(axis=1)
-    pivot = pivot.sort_values("Total", ascending=False)
     return pivot
 
-def _slice_top_segments(pivot_total: pd.DataFrame):
-    top_1_10  = pivot_total.iloc[:10].copy().sort_values("Total", ascending=True)
-    top_11_20 = pivot_total.iloc[10:20].copy().sort_values("Total", ascending=True)
-    top_21_30 = pivot_total.iloc[20:30].copy().sort_values("Total", ascending=True)
+# Top 30 por Total (empates por nombre de país) en tres cortes ordenados asc por Total para graficar
+def _slice_top_segments(pivot: pd.DataFrame):
+    top = rk.top_k_frame(pivot, "Total", TOP_K)
+    top_1_10  = top.iloc[:10].copy().sort_values("Total", ascending=True)
+    top_11_20 = top.iloc[10:20].copy().sort_values("Total", ascending=True)
+    top_21_30 = top.iloc[20:30].copy().sort_values("Total", ascending=True)
     return top_1_10, top_11_20, top_21_30
 
 def _plot_grouped_barh(df_slice: pd.DataFrame, title: str, outpath: str):
@@ -105,18 +127,24 @@ def _plot_grouped_barh(df_slice: pd.DataFrame, title: str, outpath: str):
 
     ps.add_source_note()
     plt.tight_layout()
-    plt.savefig(outpath, dpi=220, facecolor=ps.COLOR_BG)
+    ps.save_figure(outpath, dpi=220, facecolor=ps.COLOR_BG)
     plt.close()
 
-def run(df: pd.DataFrame, outdir: str = "outputs") -> dict:
+# 'partials': conteos ya sumados (merge_partials); si no vienen se calculan sobre df
+def run(df: pd.DataFrame, outdir: str = "outputs", tables: dict | None = None,
+        partials: dict | None = None, mask=None) -> dict:
     outdir_q5 = os.path.join(outdir, "q5")
     os.makedirs(outdir_q5, exist_ok=True)
+    if partials is not None and mask is not None:
+        raise ValueError("'partials' y 'mask' no se pueden combinar (los parciales son del catálogo entero).")
+    df_src = df
+    df, tables = dv.restrict(df, tables, mask, COLUMNS)
 
-    results = {}
+    if partials is None:
+        partials = map_partials(df, tables)
 
     # Adulto vs Infantil 
-    base_adultkids = _prepare_base(df, mode="adult_kids")
-    pivot_adultkids = _pivot_country_audience(base_adultkids)
+    pivot_adultkids = _pivot_country_audience(partials["country_rating"], "adult_kids")
     segs_adultkids = _slice_top_segments(pivot_adultkids)
 
     _plot_grouped_barh(segs_adultkids[0], "Top 1–10 países (Adulto vs Infantil)",
@@ -126,15 +154,8 @@ def run(df: pd.DataFrame, outdir: str = "outputs") -> dict:
     _plot_grouped_barh(segs_adultkids[2], "Top 21–30 países (Adulto vs Infantil)",
                        os.path.join(outdir_q5, "q5_top21_30_audiencias_adultkids.png"))
 
-    results["adultkids"] = {
-        "base": base_adultkids,
-        "pivot": pivot_adultkids,
-        "segments": segs_adultkids,
-    }
-
     # Familiar vs No Familiar 
-    base_familiar = _prepare_base(df, mode="familiar")
-    pivot_familiar = _pivot_country_audience(base_familiar)
+    pivot_familiar = _pivot_country_audience(partials["country_rating"], "familiar")
     segs_familiar = _slice_top_segments(pivot_familiar)
 
     _plot_grouped_barh(segs_familiar[0], "Top 1–10 países (Familiar vs No Familiar)",
@@ -144,18 +165,14 @@ def run(df: pd.DataFrame, outdir: str = "outputs") -> dict:
     _plot_grouped_barh(segs_familiar[2], "Top 21–30 países (Familiar vs No Familiar)",
                        os.path.join(outdir_q5, "q5_top21_30_audiencias_familiar.png"))
 
-    results["familiar"] = {
-        "base": base_familiar,
-        "pivot": pivot_familiar,
-        "segments": segs_familiar,
-    }
-
-    results.update({
-        "base":  base_adultkids,
+    # Las bases (explosión país × rating con la audiencia) se reconstruyen bajo demanda
+    lazy_adultkids = {"base": dv.deferred(_prepare_base, df_src, tables, mask, COLUMNS, mode="adult_kids")}
+    lazy_familiar = {"base": dv.deferred(_prepare_base, df_src, tables, mask, COLUMNS, mode="familiar")}
+    return Result({
+        "adultkids": Result({"pivot": pivot_adultkids, "segments": segs_adultkids}, lazy=lazy_adultkids),
+        "familiar": Result({"pivot": pivot_familiar, "segments": segs_familiar}, lazy=lazy_familiar),
         "pivot": pivot_adultkids,
         "top1_10":  segs_adultkids[0],
         "top11_20": segs_adultkids[1],
         "top21_30": segs_adultkids[2],
-    })
-
-    return results
+    }, lazy=lazy_adultkids)
@@ -4,12 +4,14 @@
 # Pipeline:
 # 1. Limpiar y asegurar fechas con ensure_datetime
 # 2. Preparar datos de estacionalidad por mes y categoría
-# 3. Graficar heatmap (mes × categoría) y barras por mes
-# 4. Devolver los DataFrames de resultados
+# 3. Contar en una pasada (ordinales de día + bincount) mes, día de semana, semana ISO y año×mes por categoría
+# 4. Graficar heatmaps (mes × categoría, día de semana × categoría) y barras por mes
+# 5. Devolver los DataFrames de resultados
 
 # Outputs:
 # - outputs/q6/q6_heatmap_categorias.png
 # - outputs/q6/q6_barras_meses.png
+# - outputs/q6/q6_heatmap_dia_semana.png
 
 # Cleaning:
 # - cl.ensure_datetime(df, "date_added"): Convierte la columna de fechas a formato datetime para agrupar correctamente por mes.
@@ -21,6 +23,14 @@ import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
 from utils import plot_style as ps
 from utils import cleaning as cl
+from utils import derived as dv
+from utils import seasonality as ss
+from utils.results import Result
+
+# Tablas derivadas que consume (ver utils.derived)
+TABLES = ("seasonality",)
+# Columnas del CSV que necesita (incluye las de sus tablas derivadas)
+COLUMNS = ("date_added", "listed_in", "title")
 
 # Helpers
 def _month_labels():
@@ -29,20 +39,23 @@ def _month_labels():
 def _ensure_month_order(obj):
     return obj.reindex(range(1, 13), fill_value=0)
 
-def _prepare_estacionalidad(df: pd.DataFrame) -> pd.DataFrame:
+def _prepare_estacionalidad(df: pd.DataFrame, tables: dict | None = None) -> pd.DataFrame:
+    # ensure_datetime + dropna(date_added, listed_in) + columna 'mes' + explode_listed_in
+    return dv.get("seasonality", df, tables)
+
+# Todas las granularidades (grano × categoría) en una pasada; solo cuenta filas con título
+def _seasonality_tables(base: pd.DataFrame) -> dict:
+    rows = base[base["title"].notna()]
+    return ss.seasonality_tables(rows["date_added"], rows["listed_in"])
 
-    dfx = cl.ensure_datetime(df, "date_added")
-    dfx = dfx.dropna(subset=["date_added", "listed_in"]).copy()
-    dfx["mes"] = dfx["date_added"].dt.month
-    dfx = cl.explode_listed_in(dfx)  
-    return dfx
+# Quita filas y columnas sin estrenos (mismo resultado que pivot_table sobre la base)
+def _trim_zeros(tabla: pd.DataFrame) -> pd.DataFrame:
+    return tabla.loc[tabla.sum(axis=1) > 0, tabla.sum(axis=0) > 0]
 
-def _plot_heatmap_estacionalidad(df: pd.DataFrame, out_png_path: str):
-    tabla = (
-        df.pivot_table(index="mes", columns="listed_in", values="title", aggfunc="count", fill_value=0)
-          .sort_index()
-    )
-    tabla = _ensure_month_order(tabla)
+# Heatmap grano × categoría a partir de una tabla ya calculada
+def _plot_heatmap_estacionalidad(tabla: pd.DataFrame, out_png_path: str, ylabels=None,
+                                 title: str = "Estacionalidad de estrenos por categoría (mes × categoría)"):
+    ylabels = _month_labels() if ylabels is None else ylabels
 
     plt.figure(figsize=(max(10, len(tabla.columns) * 0.35), 6), facecolor=ps.COLOR_BG)
     ax = plt.gca()
@@ -50,12 +63,12 @@ def _plot_heatmap_estacionalidad(df: pd.DataFrame, out_png_path: str):
 
     im = ax.imshow(tabla.values, aspect="auto")
 
-    ax.set_yticks(range(12))
-    ax.set_yticklabels(_month_labels())
+    ax.set_yticks(range(len(tabla)))
+    ax.set_yticklabels(ylabels)
     ax.set_xticks(range(len(tabla.columns)))
     ax.set_xticklabels(tabla.columns.tolist(), rotation=30, ha="right", fontsize=9)
 
-    ax.set_title("Estacionalidad de estrenos por categoría (mes × categoría)", fontsize=13, color=ps.COLOR_TV)
+    ax.set_title(title, fontsize=13, color=ps.COLOR_TV)
 
     cbar = plt.colorbar(im, ax=ax, fraction=0.03, pad=0.03)
     cbar.set_label("# estrenos")
@@ -63,11 +76,10 @@ def _plot_heatmap_estacionalidad(df: pd.DataFrame, out_png_path: str):
     ps.add_source_note()  
     plt.tight_layout()
     os.makedirs(os.path.dirname(out_png_path), exist_ok=True)
-    plt.savefig(out_png_path, dpi=220, facecolor=ps.COLOR_BG, bbox_inches="tight")
+    ps.save_figure(out_png_path, dpi=220, facecolor=ps.COLOR_BG, bbox_inches="tight")
     plt.close()
 
-def _plot_barras_totales_por_mes(df: pd.DataFrame, out_png_path: str):
-    tot_mes = df.groupby("mes")["title"].count().sort_index()
+def _plot_barras_totales_por_mes(tot_mes: pd.Series, out_png_path: str):
     tot_mes = _ensure_month_order(tot_mes)
 
     plt.figure(figsize=(10, 5.5), facecolor=ps.COLOR_BG)
@@ -87,26 +99,34 @@ def _plot_barras_totales_por_mes(df: pd.DataFrame, out_png_path: str):
     ps.add_source_note()
     plt.tight_layout()
     os.makedirs(os.path.dirname(out_png_path), exist_ok=True)
-    plt.savefig(out_png_path, dpi=220, facecolor=ps.COLOR_BG, bbox_inches="tight")
+    ps.save_figure(out_png_path, dpi=220, facecolor=ps.COLOR_BG, bbox_inches="tight")
     plt.close()
 
-def run(df: pd.DataFrame, outdir: str = "outputs") -> dict:
+def run(df: pd.DataFrame, outdir: str = "outputs", tables: dict | None = None, mask=None) -> dict:
     outdir_q6 = os.path.join(outdir, "q6")
     os.makedirs(outdir_q6, exist_ok=True)
+    df_src = df
+    df, tables = dv.restrict(df, tables, mask, COLUMNS)
 
-    base = _prepare_estacionalidad(df)
+    base = _prepare_estacionalidad(df, tables)
 
-    tabla_mes_categoria = (
-        base.pivot_table(index="mes", columns="listed_in", values="title", aggfunc="count", fill_value=0)
-            .sort_index()
-    )
-    totales_mes = base.groupby("mes")["title"].count().sort_index()
+    tablas = _seasonality_tables(dv.with_source(base, df, "title"))
+    tabla_mes_categoria = _trim_zeros(tablas["month"])
+    totales_mes = tabla_mes_categoria.sum(axis=1).rename("title")
 
-    _plot_heatmap_estacionalidad(base, os.path.join(outdir_q6, "q6_heatmap_categorias.png"))
-    _plot_barras_totales_por_mes(base, os.path.join(outdir_q6, "q6_barras_meses.png"))
+    _plot_heatmap_estacionalidad(_ensure_month_order(tabla_mes_categoria),
+                                 os.path.join(outdir_q6, "q6_heatmap_categorias.png"))
+    _plot_barras_totales_por_mes(totales_mes, os.path.join(outdir_q6, "q6_barras_meses.png"))
+    _plot_heatmap_estacionalidad(tablas["dow"].loc[:, tabla_mes_categoria.columns],
+                                 os.path.join(outdir_q6, "q6_heatmap_dia_semana.png"),
+                                 ylabels=ss.DOW_LABELS,
+                                 title="Estrenos por categoría según día de la semana")
 
-    return {
-        "base": base,
+    # 'base' (explosión por categoría) se reconstruye bajo demanda
+    return Result({
         "tabla_mes_categoria": tabla_mes_categoria,
         "totales_mes": totales_mes,
-    }
+        "tabla_dia_semana": tablas["dow"],
+        "tabla_semana_iso": tablas["iso_week"],
+        "tabla_anio_mes": tablas["year_month"],
+    }, lazy={"base": dv.deferred(_prepare_estacionalidad, df_src, tables, mask, COLUMNS)})
@@ -6,12 +6,14 @@
 # 2. Normalizar ratings y mapear a audiencias con normalize_and_explode_ratings y map_rating_to_audience
 # 3. Explotar géneros y mapear a género canónico con explode_listed_in y add_genre_from_listed_in
 # 4. Calcular ranking y pivotes por tipo, audiencia y género
-# 5. Graficar los resultados
+# 5. Ranking Top-k de directores dentro de cada país (cruce por title_id con la explosión de países)
+# 6. Graficar los resultados
 
 # Outputs:
 # - outputs/q7/q7_top20_directores_tipo_stacked.png
 # - outputs/q7/q7_top20_directores_audiencia_stacked.png
 # - outputs/q7/q7_top20_directores_genero_dominante.png
+# - outputs/q7/q7_top10_directores_por_pais.csv
 
 # Cleaning:
 # - cl.expand_and_normalize_directors(df): Limpia y expande la columna 'director' para agrupar correctamente.
@@ -19,6 +21,7 @@
 # - cl.map_rating_to_audience(): Mapea los ratings normalizados a categorías de audiencia.
 # - cl.explode_listed_in(df): Explota la columna de géneros para analizar cada género por separado.
 # - cl.add_genre_from_listed_in(df): Mapea los géneros a una categoría canónica para análisis.
+# - cl.expand_and_normalize_countries(df): Expande y normaliza países para el ranking por país.
 
 from __future__ import annotations
 import os
@@ -27,23 +30,41 @@ import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
 from utils import plot_style as ps
 from utils import cleaning as cl
+from utils import derived as dv
+from utils import ranking as rk
+from utils.results import Result
+
+# Tablas derivadas que consume (ver utils.derived)
+TABLES = ("directors", "directors_ratings", "directors_genres", "countries")
+# Columnas del CSV que necesita (incluye las de sus tablas derivadas)
+COLUMNS = ("director", "type", "rating", "listed_in", "country")
 
 
 # Devuelve un DF expandido por director con 'director_final' y columnas originales.
-def _prepare_directors_base(df: pd.DataFrame) -> pd.DataFrame:
+def _prepare_directors_base(df: pd.DataFrame, tables: dict | None = None) -> pd.DataFrame:
     required = {"director", "type", "rating"}
     missing = required.difference(df.columns)
     if missing:
         raise ValueError(f"Faltan columnas requeridas: {sorted(missing)}")
 
-    dfx = cl.expand_and_normalize_directors(df)
-    dfx["type"] = dfx["type"].astype(str).str.strip()
-    return dfx
+    # expand_and_normalize_directors + strip de 'type'
+    return dv.get("directors", df, tables)
 
 # Índice con los nombres del Top-N directores por cantidad total de títulos.
+# Ordenamiento parcial (argpartition): no se ordenan todos los directores para quedarse con N.
 def _top_directors(dfx: pd.DataFrame, topn: int = 20) -> pd.Index:
-    counts = dfx.groupby("director_final").size().sort_values(ascending=False)
-    return counts.head(topn).index
+    return rk.top_k_counts(dfx["director_final"], topn).index
+
+# Top-k directores dentro de cada país, todos los países en una sola pasada vectorizada.
+# Cada título cuenta una vez por (país, director); empates por nombre de director.
+def _top_directors_by_country(df: pd.DataFrame, base: pd.DataFrame, k: int = 10,
+                              tables: dict | None = None) -> pd.DataFrame:
+    countries = dv.get("countries", df, tables)
+    pairs = (
+        countries[["title_id", "country_final"]].drop_duplicates()
+        .merge(base[["title_id", "director_final"]].drop_duplicates(), on="title_id")
+    )
+    return rk.group_top_k_frame(pairs, "country_final", "director_final", k)
 
 
 # Obitne conteos por tipo de contenido (Movie/TV Show) para los directores en top_index
@@ -62,11 +83,11 @@ def _pivot_director_type(dfx: pd.DataFrame, top_index: pd.Index) -> pd.DataFrame
     return pv[["Movie", "TV Show", "Total"]]
 
 # Obtiene conteos por audiencia (Adulto/Infantil) para los directores en top_index
-def _pivot_director_audience(dfx: pd.DataFrame, top_index: pd.Index) -> pd.DataFrame:
-    r = cl.normalize_and_explode_ratings(dfx)
-    r["audiencia"] = r["rating_norm"].map(lambda x: cl.map_rating_to_audience(x, mode="adult_kids"))
-
+def _pivot_director_audience(df: pd.DataFrame, top_index: pd.Index, tables: dict | None = None) -> pd.DataFrame:
+    r = dv.get("directors_ratings", df, tables)
     sub = r[r["director_final"].isin(top_index)]
+    sub = sub.assign(audiencia=sub["rating_norm"].map(lambda x: cl.map_rating_to_audience(x, mode="adult_kids")))
+
     grp = sub.groupby(["director_final", "audiencia"], as_index=False).size()
     pv = grp.pivot(index="director_final", columns="audiencia", values="size").fillna(0).astype(int)
 
@@ -110,10 +131,10 @@ _MARKER_GENRES = {"Internacional/Regional", "TV (General)"}
 
 def _pivot_director_genre(df_original: pd.DataFrame,
                           top_index: pd.Index,
-                          drop_markers: bool = True) -> pd.DataFrame:
-    dfx = cl.explode_listed_in(df_original)
-    dfx = cl.add_genre_from_listed_in(dfx)
-    dfx = cl.expand_and_normalize_directors(dfx)
+                          drop_markers: bool = True,
+                          tables: dict | None = None) -> pd.DataFrame:
+    # explode_listed_in + add_genre_from_listed_in + expand_and_normalize_directors
+    dfx = dv.get("directors_genres", df_original, tables)
 
     dfx = dfx[dfx["director_final"].isin(top_index)].copy()
     if dfx.empty:
@@ -174,7 +195,7 @@ def _plot_stacked_barh(df_slice: pd.DataFrame, left_col: str, right_col: str, ti
 
     ps.add_source_note()
     plt.tight_layout()
-    plt.savefig(outpath, dpi=220, facecolor=ps.COLOR_BG)
+    ps.save_figure(outpath, dpi=220, facecolor=ps.COLOR_BG)
     plt.close()
 
 
@@ -222,22 +243,27 @@ def _plot_director_dominant_genre(
 
     ps.add_source_note()
     plt.tight_layout()
-    plt.savefig(outpath, dpi=220)
+    ps.save_figure(outpath, dpi=220)
     plt.close()
 
 
 
-def run(df: pd.DataFrame, outdir: str = "outputs", topn: int = 20) -> dict:
+def run(df: pd.DataFrame, outdir: str = "outputs", topn: int = 20, tables: dict | None = None, mask=None) -> dict:
     outdir_q7 = os.path.join(outdir, "q7")
     os.makedirs(outdir_q7, exist_ok=True)
+    df_src = df
+    df, tables = dv.restrict(df, tables, mask, COLUMNS)
 
-    base = _prepare_directors_base(df)
+    base = _prepare_directors_base(df, tables)
     top_idx = _top_directors(base, topn=topn)
 
     pv_tipo = _pivot_director_type(base, top_idx)
-    pv_audiencia = _pivot_director_audience(base, top_idx)
+    pv_audiencia = _pivot_director_audience(df, top_idx, tables)
+
+    dom_genre = _pivot_director_genre(df, top_idx, drop_markers=True, tables=tables)
 
-    dom_genre = _pivot_director_genre(df, top_idx, drop_markers=True)
+    top_por_pais = _top_directors_by_country(df, base, k=10, tables=tables)
+    top_por_pais.to_csv(os.path.join(outdir_q7, "q7_top10_directores_por_pais.csv"), index=False)
 
     _plot_stacked_barh(
         pv_tipo,
@@ -261,10 +287,11 @@ def run(df: pd.DataFrame, outdir: str = "outputs", topn: int = 20) -> dict:
         title=f"Género dominante por director (Top {topn})",
     )
 
-    return {
-        "base": base,                 
+    # 'base' (explosión de directores) se reconstruye bajo demanda
+    return Result({
         "ranking": top_idx,             
         "pivot_tipo": pv_tipo,         
         "pivot_audiencia": pv_audiencia,   
         "dominant_genre": dom_genre,  
-    }
+        "top_por_pais": top_por_pais,
+    }, lazy={"base": dv.deferred(_prepare_directors_base, df_src, tables, mask, COLUMNS)})
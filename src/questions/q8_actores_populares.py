@@ -7,6 +7,10 @@
 # 3. Calcular ranking de actores por cantidad de títulos
 # 4. Calcular pivotes por rating y proporciones
 # 5. Graficar ranking, distribución por rating y heatmap
+#
+# Map-reduce por shards (mapreduce.py): map_partials cuenta títulos por actor, actor × rating y
+# actor × tipo en un bloque de filas; merge_partials suma los conteos y run(partials=...) arma
+# los pivotes del Top-N a partir de la suma.
 
 # Outputs:
 # - outputs/q8/q8_top_actores_count_barh.png
@@ -27,12 +31,21 @@ import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
 from utils import plot_style as ps
 from utils import cleaning as cl
+from utils import derived as dv
+from utils import ranking as rk
+from utils import partials as pu
+from utils.results import Result
+
+# Tablas derivadas que consume (ver utils.derived)
+TABLES = ("cast", "cast_ratings")
+# Columnas del CSV que necesita (incluye las de sus tablas derivadas)
+COLUMNS = ("cast", "type", "rating")
 
 # Orden de ratings más comunes 
 RATING_ORDER = [ "TV-MA","TV-14","TV-PG","PG-13","PG","R","G","TV-Y7","TV-Y","NR"]
 
 # Devuelve DF con 'cast_final', 'type' y 'rating' listos 
-def _prepare_cast_base(df: pd.DataFrame) -> pd.DataFrame:
+def _prepare_cast_base(df: pd.DataFrame, tables: dict | None = None) -> pd.DataFrame:
 
     if "cast" not in df.columns:
         raise ValueError("El DataFrame debe contener la columna 'cast'.")
@@ -41,26 +54,40 @@ def _prepare_cast_base(df: pd.DataFrame) -> pd.DataFrame:
     if "rating" not in df.columns:
         raise ValueError("El DataFrame debe contener la columna 'rating'.")
 
-    dfx = cl.expand_and_normalize_cast(df)
-    dfx["type"] = dfx["type"].astype(str).str.strip()
-    return dfx
+    # expand_and_normalize_cast + strip de 'type'
+    return dv.get("cast", df, tables)
+
+# Conteos por actor, actor × rating_norm y actor × tipo (en orden de primera aparición)
+def map_partials(df: pd.DataFrame, tables: dict | None = None) -> dict:
+    tables = {} if tables is None else tables
+    base = _prepare_cast_base(df, tables)
+    return {
+        "actor": pu.tally(base, "cast_final"),
+        "actor_rating": pu.tally(dv.get("cast_ratings", df, tables), ["cast_final", "rating_norm"]),
+        "actor_type": pu.tally(base, ["cast_final", "type"]),
+    }
+
+def merge_partials(parts: list) -> dict:
+    return {key: pu.merge_tallies(p[key] for p in parts) for key in ("actor", "actor_rating", "actor_type")}
 
 # Índice con los nombres del Top-N actores por cantidad total de títulos.
-def _top_actors(dfx: pd.DataFrame, topn: int = 20) -> pd.Index:
-    counts = dfx.groupby("cast_final").size().sort_values(ascending=False)
-    return counts.head(topn).index
+# Ordenamiento parcial (argpartition): no se ordena a todo el elenco para quedarse con N.
+def _top_actors(counts: pd.Series, topn: int = 20) -> pd.Index:
+    counts = counts.sort_index()
+    # índice alfabético: la posición sirve como desempate (igual que rk.top_k_counts)
+    return counts.index[rk.top_k_positions(counts.to_numpy(), topn)]
+
+def _of_top(tally: pd.Series, top_idx: pd.Index) -> pd.Series:
+    return tally[tally.index.get_level_values("cast_final").isin(top_idx)]
 
 # Conteo total por actor (solo Top-N)
-def _pivot_actor_counts(dfx: pd.DataFrame, top_idx: pd.Index) -> pd.DataFrame:
-    sub = dfx[dfx["cast_final"].isin(top_idx)]
-    pv = sub.groupby("cast_final").size().sort_values(ascending=True)  # asc para barh
+def _pivot_actor_counts(counts: pd.Series, top_idx: pd.Index) -> pd.DataFrame:
+    pv = _of_top(counts, top_idx).sort_index().sort_values(ascending=True)  # asc para barh
     return pv.to_frame(name="Total")
 
 # Conteo por actor × rating_norm (solo Top-N).
-def _pivot_actor_by_rating(dfx: pd.DataFrame, top_idx: pd.Index) -> pd.DataFrame:
-    r = cl.normalize_and_explode_ratings(dfx)
-    sub = r[r["cast_final"].isin(top_idx)]
-    grp = sub.groupby(["cast_final", "rating_norm"], as_index=False).size()
+def _pivot_actor_by_rating(actor_rating: pd.Series, top_idx: pd.Index) -> pd.DataFrame:
+    grp = _of_top(actor_rating, top_idx).rename("size").reset_index()
     pv = grp.pivot(index="cast_final", columns="rating_norm", values="size").fillna(0).astype(int)
 
     # Reordenar columnas por RATING_ORDER y dejar al final cualquier rating raro
@@ -96,7 +123,7 @@ def _plot_barh_top_counts(pv_counts: pd.DataFrame, outpath: str):
 
     ps.add_source_note()
     plt.tight_layout()
-    plt.savefig(outpath, dpi=220, facecolor=ps.COLOR_BG)
+    ps.save_figure(outpath, dpi=220, facecolor=ps.COLOR_BG)
     plt.close()
 
 def _plot_heatmap_actors_ratings(pv_rating: pd.DataFrame, outpath: str):
@@ -125,7 +152,7 @@ def _plot_heatmap_actors_ratings(pv_rating: pd.DataFrame, outpath: str):
 
     ps.add_source_note()
     plt.tight_layout()
-    plt.savefig(outpath, dpi=220, facecolor=ps.COLOR_BG, bbox_inches="tight")
+    ps.save_figure(outpath, dpi=220, facecolor=ps.COLOR_BG, bbox_inches="tight")
     plt.close()
 
 def _plot_donut(series: pd.Series, title: str, outpath: str):
@@ -169,7 +196,7 @@ def _plot_donut(series: pd.Series, title: str, outpath: str):
 
     ps.add_source_note()
     plt.tight_layout()
-    plt.savefig(outpath, dpi=220, facecolor=ps.COLOR_BG, bbox_inches="tight")
+    ps.save_figure(outpath, dpi=220, facecolor=ps.COLOR_BG, bbox_inches="tight")
     plt.close()
 
 
@@ -180,35 +207,42 @@ def _plot_donut_ratings(pv_rating: pd.DataFrame, outpath: str):
     _plot_donut(s, "Distribución de ratings (actores Top)", outpath)
 
 
-def _plot_donut_types(base: pd.DataFrame, top_idx: pd.Index, outpath: str):
-    if base is None or base.empty or top_idx is None or len(top_idx) == 0:
+def _plot_donut_types(actor_type: pd.Series, top_idx: pd.Index, outpath: str):
+    if actor_type is None or actor_type.empty or top_idx is None or len(top_idx) == 0:
         return
-    sub = base[base["cast_final"].isin(top_idx)]
-    s = sub["type"].value_counts()
+    # mismo orden que value_counts() sobre las filas de los actores Top
+    s = pu.tally_to_value_counts(_of_top(actor_type, top_idx).groupby(level="type", sort=False).sum())
     _plot_donut(s, "Distribución por tipo (actores Top)", outpath)
 
 
-def run(df: pd.DataFrame, outdir: str = "outputs", topn: int = 20) -> dict:
+# 'partials': conteos ya sumados (merge_partials); si no vienen se calculan sobre df
+def run(df: pd.DataFrame, outdir: str = "outputs", topn: int = 20, tables: dict | None = None,
+        partials: dict | None = None, mask=None) -> dict:
 
     outdir_q8 = os.path.join(outdir, "q8")
     os.makedirs(outdir_q8, exist_ok=True)
+    if partials is not None and mask is not None:
+        raise ValueError("'partials' y 'mask' no se pueden combinar (los parciales son del catálogo entero).")
+    df_src = df
+    df, tables = dv.restrict(df, tables, mask, COLUMNS)
 
-    base = _prepare_cast_base(df)
-    top_idx = _top_actors(base, topn=topn)
+    if partials is None:
+        partials = map_partials(df, tables)
+    top_idx = _top_actors(partials["actor"], topn=topn)
 
-    pv_counts = _pivot_actor_counts(base, top_idx)
+    pv_counts = _pivot_actor_counts(partials["actor"], top_idx)
 
-    pv_rating = _pivot_actor_by_rating(base, top_idx)
+    pv_rating = _pivot_actor_by_rating(partials["actor_rating"], top_idx)
     props_rating = _pivot_props_from_rating(pv_rating)
 
     _plot_barh_top_counts(pv_counts, os.path.join(outdir_q8, "q8_top_actores_count_barh.png"))
     _plot_heatmap_actors_ratings(pv_rating, os.path.join(outdir_q8, "q8_top_actores_rating_heatmap.png"))
     _plot_donut_ratings( pv_rating, os.path.join(outdir_q8, "q8_top_actores_rating_donut.png"))
-    _plot_donut_types(base, top_idx, os.path.join(outdir_q8, "q8_top_actores_type_donut.png"))
+    _plot_donut_types(partials["actor_type"], top_idx, os.path.join(outdir_q8, "q8_top_actores_type_donut.png"))
 
-    return {
-        "base": base,              
+    # 'base' (explosión del elenco) se reconstruye bajo demanda
+    return Result({
         "ranking": pv_counts,
         "pv_rating": pv_rating,
         "props_rating": props_rating,
-    }
\ No newline at end of file
+    }, lazy={"base": dv.deferred(_prepare_cast_base, df_src, tables, mask, COLUMNS)})
\ No newline at end of file
@@ -4,15 +4,24 @@
 # Pipeline:
 # 1. Limpiar y normalizar la columna 'duration' con normalize_duration
 # 2. Separar películas y series por tipo
-# 3. Graficar histogramas de duración para películas y series
-# 4. Devolver los DataFrames filtrados por tipo y duración
+# 3. Acumular histogramas enteros (bincount, mergeables) de minutos y temporadas por tipo
+# 4. Media, mediana y percentiles desde los histogramas; también por género
+# 5. Graficar histogramas de duración para películas y series
+# 6. Devolver los DataFrames filtrados por tipo y duración
+
+# Los histogramas se pueden acumular por chunks (summarize_durations) sin guardar filas por título.
+# Map-reduce por shards (mapreduce.py): map_partials acumula los histogramas (total y por género)
+# de un bloque de filas, merge_partials los suma y run(partials=...) grafica desde la suma.
 
 # Outputs:
 # - outputs/q9/q9_movies_duration_hist.png 
 # - outputs/q9/q9_tvshows_duration_hist.png
+# - outputs/q9/q9_duracion_por_genero.csv
 
 # Cleaning:
 # - cl.normalize_duration(df): Normaliza la columna 'duration' y la separa en minutos para películas y temporadas para series.
+# - Tablas derivadas 'genres' / 'countries' (utils.derived): género canónico y país normalizado por
+#   title_id, para las estadísticas por género (y por país en summarize_durations con by="country").
 
 from __future__ import annotations
 import os
@@ -21,6 +30,17 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from utils import plot_style as ps
 from utils import cleaning as cl
+from utils import derived as dv
+from utils import sketches as sk
+from utils.results import Result
+
+# Tablas derivadas que consume (ver utils.derived)
+TABLES = ("durations", "genres")
+# Columnas del CSV que necesita (incluye las de sus tablas derivadas)
+COLUMNS = ("type", "duration", "title", "listed_in")
+
+# Medida de duración de cada tipo
+_MEASURE = {"Movie": "duration_minutes", "TV Show": "duration_seasons"}
 
 
 # Añade líneas de media y mediana, con etiquetas
@@ -42,24 +62,64 @@ def _add_central_tendency_lines(ax, mean_val: float, median_val: float, y_top: f
 
 
 
-# Calcula media y mediana, dict
-def _compute_basic_stats(series: pd.Series) -> dict:
-    s = series.dropna().astype(float)
-    if s.empty:
-        return {}
-    return {
-        "count": int(s.shape[0]),
-        "mean": float(s.mean()),
-        "median": float(s.median()),
-    }
+# (pares title_id / grupo, columna del grupo) desde las tablas derivadas compartidas; cada título
+# cuenta una vez por grupo
+def _group_pairs(df: pd.DataFrame, by: str, tables: dict | None = None) -> tuple:
+    if by == "genre":
+        return dv.get("genres", df, tables)[["title_id", "genre_main"]], "genre_main"
+    if by == "country":
+        return dv.get("countries", df, tables)[["title_id", "country_final"]].drop_duplicates(), "country_final"
+    raise ValueError(f"Agrupación no soportada: {by} (opciones: 'genre', 'country')")
 
 
-def _plot_hist_movies(df: pd.DataFrame, outpath: str) -> dict:
-    data = df["duration_minutes"].dropna().astype(float)
-    if data.empty:
+# Suma a 'acc' ({tipo: {grupo: IntHistogram}}) los histogramas de un DF ya normalizado (alineado
+# por posición con el df de 'groups'). Sin 'groups' hay un único grupo "Total" por tipo.
+def _accumulate(acc: dict, df_clean: pd.DataFrame, groups: tuple | None = None) -> dict:
+    if groups is None:
+        dfx, col = df_clean, None
+    else:
+        pairs, col = groups
+        dfx = df_clean.iloc[pairs["title_id"].to_numpy()].assign(**{col: pairs[col].to_numpy()})
+
+    for tipo, measure in _MEASURE.items():
+        sub = dfx[dfx["type"] == tipo]
+        if col is None:
+            new = {"Total": sk.IntHistogram.from_values(sub[measure])}
+        else:
+            new = sk.group_histograms(sub[measure], sub[col])
+        sk.merge_groups(acc.setdefault(tipo, {}), new)
+    return acc
+
+
+# Tabla tipo / grupo / count / mean / median / percentiles
+def _stats_table(acc: dict, group_name: str = "grupo") -> pd.DataFrame:
+    frames = []
+    for tipo, hists in acc.items():
+        st = sk.stats_frame(hists, index_name=group_name)
+        if not st.empty:
+            frames.append(st.reset_index().assign(type=tipo))
+    if not frames:
+        return pd.DataFrame(columns=["type", group_name, "count", "mean", "median"])
+    out = pd.concat(frames, ignore_index=True)
+    return out[["type", group_name] + [c for c in out.columns if c not in ("type", group_name)]]
+
+
+# Versión incremental: recorre chunks crudos (p. ej. pd.read_csv(..., chunksize=...)) y solo
+# guarda histogramas. by: None (por tipo), "genre" o "country".
+def summarize_durations(chunks, by: str | None = None) -> pd.DataFrame:
+    acc = {}
+    for chunk in chunks:
+        chunk = chunk.reset_index(drop=True)
+        _accumulate(acc, cl.normalize_duration(chunk), _group_pairs(chunk, by) if by else None)
+    return _stats_table(acc, by or "grupo")
+
+
+def _plot_hist_movies(hist: sk.IntHistogram, outpath: str) -> dict:
+    if hist.count == 0:
         return {}
 
-    stats = _compute_basic_stats(data)
+    stats = hist.stats()
+    values, weights = hist.nonzero()
 
     plt.figure(figsize=(12, 6), facecolor=ps.COLOR_BG)
     ax = plt.gca()
@@ -68,8 +128,9 @@ def _plot_hist_movies(df: pd.DataFrame, outpath: str) -> dict:
     n_bins = 60
 
     counts, bins, patches = ax.hist(
-        data,
+        values,
         bins=n_bins,
+        weights=weights,
         color=ps.COLOR_MOVIE,
         edgecolor="#000000",   
         alpha=0.9
@@ -90,19 +151,19 @@ def _plot_hist_movies(df: pd.DataFrame, outpath: str) -> dict:
 
     ps.add_source_note("Fuente: Netflix dataset. Elaboración propia")
     plt.tight_layout()
-    plt.savefig(outpath, dpi=220, facecolor=ps.COLOR_BG)
+    ps.save_figure(outpath, dpi=220, facecolor=ps.COLOR_BG)
     plt.close()
 
     return stats
 
 
-def _plot_hist_tvshows(df: pd.DataFrame, outpath: str) -> dict:
-    data = df["duration_seasons"].dropna().astype(float)
-    if data.empty:
+def _plot_hist_tvshows(hist: sk.IntHistogram, outpath: str) -> dict:
+    if hist.count == 0:
         return {}
 
-    stats = _compute_basic_stats(data)
-    max_seasons = int(data.max())
+    stats = hist.stats()
+    values, weights = hist.nonzero()
+    max_seasons = int(values.max())
     bins = np.arange(0.5, max_seasons + 1.5, 1)
 
     plt.figure(figsize=(12, 6), facecolor=ps.COLOR_BG)
@@ -111,8 +172,9 @@ def _plot_hist_tvshows(df: pd.DataFrame, outpath: str) -> dict:
 
 
     counts, bins, patches = ax.hist(
-        data,
+        values,
         bins=bins,
+        weights=weights,
         color=ps.COLOR_MOVIE,
         edgecolor="#000000",   
         alpha=0.9
@@ -133,29 +195,67 @@ def _plot_hist_tvshows(df: pd.DataFrame, outpath: str) -> dict:
 
     ps.add_source_note("Fuente: Netflix dataset. Elaboración propia")
     plt.tight_layout()
-    plt.savefig(outpath, dpi=220, facecolor=ps.COLOR_BG)
+    ps.save_figure(outpath, dpi=220, facecolor=ps.COLOR_BG)
     plt.close()
 
     return stats
 
 
-def run(df: pd.DataFrame, outdir: str = "outputs") -> dict:
+# Histogramas {tipo: {"Total": h}} y {tipo: {género: h}} de un bloque de filas
+def map_partials(df: pd.DataFrame, tables: dict | None = None) -> dict:
+    df_clean = dv.get("durations", df, tables)
+    return {
+        "total": _accumulate({}, df_clean),
+        "genre": _accumulate({}, df_clean, _group_pairs(df, "genre", tables)),
+    }
+
+# Suma de histogramas por tipo y grupo; los grupos quedan ordenados como en group_histograms
+def merge_partials(parts: list) -> dict:
+    merged = {}
+    for name in ("total", "genre"):
+        acc = {}
+        for p in parts:
+            for tipo, hists in p[name].items():
+                sk.merge_groups(acc.setdefault(tipo, {}), hists)
+        merged[name] = {tipo: dict(sorted(hists.items())) for tipo, hists in acc.items()}
+    return merged
+
+
+# Título + duración de los títulos de un tipo (sin faltantes)
+def _titles_duration(df: pd.DataFrame, content_type: str, col: str,
+                     tables: dict | None = None) -> pd.DataFrame:
+    durations = dv.with_source(dv.get("durations", df, tables), df, "title")
+    return durations[durations["type"] == content_type][["title", col]].dropna()
+
+
+# 'partials': histogramas ya sumados (merge_partials); si no vienen se calculan sobre df
+def run(df: pd.DataFrame, outdir: str = "outputs", tables: dict | None = None,
+        partials: dict | None = None, mask=None) -> dict:
     outdir_q9 = os.path.join(outdir, "q9")
     os.makedirs(outdir_q9, exist_ok=True)
+    if partials is not None and mask is not None:
+        raise ValueError("'partials' y 'mask' no se pueden combinar (los parciales son del catálogo entero).")
+    df_src = df
+    df, tables = dv.restrict(df, tables, mask, COLUMNS)
 
-    df_clean = cl.normalize_duration(df)
+    if partials is None:
+        partials = map_partials(df, tables)
 
-    movies = df_clean[df_clean["type"] == "Movie"].copy()
-    tvshows = df_clean[df_clean["type"] == "TV Show"].copy()
+    hists = partials["total"]
+    stats_movies = _plot_hist_movies(hists["Movie"]["Total"], os.path.join(outdir_q9, "q9_movies_duration_hist.png"))
+    stats_tv     = _plot_hist_tvshows(hists["TV Show"]["Total"], os.path.join(outdir_q9, "q9_tvshows_duration_hist.png"))
 
-    stats_movies = _plot_hist_movies(movies, os.path.join(outdir_q9, "q9_movies_duration_hist.png"))
-    stats_tv     = _plot_hist_tvshows(tvshows, os.path.join(outdir_q9, "q9_tvshows_duration_hist.png"))
+    por_genero = _stats_table(partials["genre"], "genre")
+    por_genero.to_csv(os.path.join(outdir_q9, "q9_duracion_por_genero.csv"), index=False)
 
-    return {
-        "movies": movies[["title", "duration_minutes"]].dropna(),
-        "tvshows": tvshows[["title", "duration_seasons"]].dropna(),
+    # Los frames por título (movies / tvshows) se reconstruyen bajo demanda
+    return Result({
         "stats": {
             "movies": stats_movies,
             "tvshows": stats_tv,
-        }
-    }
+        },
+        "stats_por_genero": por_genero,
+    }, lazy={
+        "movies": dv.deferred(_titles_duration, df_src, tables, mask, COLUMNS, "Movie", "duration_minutes"),
+        "tvshows": dv.deferred(_titles_duration, df_src, tables, mask, COLUMNS, "TV Show", "duration_seasons"),
+    })
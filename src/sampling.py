@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# Modo preview por muestreo estratificado, con intervalos de confianza bootstrap.
+#
+# 1. Antes de cualquier cleaning se toma una muestra estratificada por (type, year_added):
+#    en cada estrato se eligen round(fracción * N_h) títulos (al menos 1) y cada título
+#    muestreado pesa N_h / n_h (estimador de Horvitz-Thompson), así los conteos escalan al
+#    catálogo completo.
+# 2. Para q1 (proporciones), q3/q4 (pivotes) y q7/q8 (rankings) se estiman los conteos
+#    escalados y su IC 95% con bootstrap de Poisson: cada réplica reasigna pesos ~ Poisson(1)
+#    a los títulos, y los conteos de todas las celdas salen de un producto con la matriz
+#    dispersa título × celda (las explosiones por país/rating/director no se re-arman).
+# 3. Solo se reportan (y exportan, marcadas como estimación) esas estimaciones: el resto de las
+#    preguntas no tiene escalado y no corre. Con --sample 1.0 las preguntas estimadas corren
+#    sobre la muestra (sin figuras) para verificar que la estimación reproduce el valor exacto.
+#
+# Uso:
+#   python main.py --sample 0.1
+#   python main.py --sample 0.05 --sample-seed 7 --only q3,q7
+
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from utils import derived as dv
+from utils import ranking as rk
+
+N_BOOT = 200
+BOOT_BLOCK = 50
+TYPES = ("Movie", "TV Show")
+# preguntas con estimación escalada (claves de main.QUESTIONS)
+ESTIMATED = ("q1", "q3", "q4", "q7", "q8")
+
+
+# Muestra estratificada por (type, year_added). Devuelve (muestra con índice 0..n-1, pesos)
+def stratified_sample(df: pd.DataFrame, fraction: float, seed: int = 0) -> tuple:
+    if not 0 < fraction <= 1:
+        raise ValueError(f"La fracción de muestreo debe estar en (0, 1]: {fraction}")
+    for col in ("type", "date_added"):
+        if col not in df.columns:
+            raise ValueError(f"El muestreo estratificado necesita la columna '{col}'.")
+
+    year = pd.to_datetime(df["date_added"], errors="coerce").dt.year
+    strata = pd.MultiIndex.from_arrays([df["type"].astype(str).str.strip(), year.fillna(-1).astype(int)])
+    codes, _ = pd.factorize(strata)
+    sizes = np.bincount(codes)
+    take = np.maximum(1, np.rint(fraction * sizes)).astype(np.int64)
+
+    rng = np.random.default_rng(seed)
+    perm = rng.permutation(len(df))
+    # posición de cada fila (en orden aleatorio) dentro de su estrato
+    pos = pd.Series(codes[perm]).groupby(codes[perm]).cumcount().to_numpy()
+    chosen = np.sort(perm[pos < take[codes[perm]]])
+
+    sample = df.iloc[chosen].reset_index(drop=True)
+    weights = (sizes / take)[codes[chosen]]
+    return sample, weights
+
+
+# Conteos ponderados por celda + réplicas bootstrap.
+# title_ids / cell_codes: una fila por (título, celda) de la explosión; devuelve (estimación, réplicas B × celdas)
+def _weighted_cells(title_ids, cell_codes, n_cells: int, weights: np.ndarray, n_boot: int, seed: int) -> tuple:
+    title_ids = np.asarray(title_ids, dtype=np.int64)
+    cell_codes = np.asarray(cell_codes, dtype=np.int64)
+    ok = cell_codes >= 0
+    # un título que aparece dos veces en la misma celda (p. ej. "Usa, United States") cuenta dos
+    # veces, igual que en las preguntas, que cuentan filas de la explosión
+    m = sp.csr_matrix((np.ones(ok.sum()), (title_ids[ok], cell_codes[ok])), shape=(len(weights), n_cells))
+    mt = m.T.tocsr()
+
+    est = mt @ weights
+    rng = np.random.default_rng(seed)
+    boot = np.empty((n_boot, n_cells))
+    for start in range(0, n_boot, BOOT_BLOCK):
+        stop = min(n_boot, start + BOOT_BLOCK)
+        w = rng.poisson(1.0, size=(stop - start, len(weights))) * weights
+        boot[start:stop] = (mt @ w.T).T
+    return est, boot
+
+
+def _ci(boot: np.ndarray) -> tuple:
+    lo, hi = np.nanpercentile(boot, [2.5, 97.5], axis=0)
+    return lo, hi
+
+
+# Pivote (entidad × tipo) estimado, con IC del Total
+def _pivot_estimate(title_ids, labels: pd.Series, types: pd.Series, weights, n_boot, seed, name) -> pd.DataFrame:
+    l_codes, l_names = pd.factorize(labels, sort=True)
+    t_codes = pd.Index(TYPES).get_indexer(types.astype(str).str.strip())
+    cells = np.where((l_codes >= 0) & (t_codes >= 0), l_codes * len(TYPES) + t_codes, -1)
+    est, boot = _weighted_cells(title_ids, cells, len(l_names) * len(TYPES), weights, n_boot, seed)
+
+    est = est.reshape(len(l_names), len(TYPES))
+    tot_boot = boot.reshape(n_boot, len(l_names), len(TYPES)).sum(axis=2)
+    lo, hi = _ci(tot_boot)
+    out = pd.DataFrame(est, index=pd.Index(np.asarray(l_names), name=name), columns=list(TYPES))
+    out["Total"] = out["Movie"] + out["TV Show"]
+    out["Total_ic_bajo"], out["Total_ic_alto"] = lo, hi
+    return rk.top_k_frame(out, "Total", len(out))
+
+
+# Ranking Top-N estimado; 'en_top' = fracción de réplicas en las que la entidad queda en el Top-N
+def _ranking_estimate(title_ids, labels: pd.Series, weights, topn, n_boot, seed, name) -> pd.DataFrame:
+    codes, names = pd.factorize(labels, sort=True)
+    est, boot = _weighted_cells(title_ids, codes, len(names), weights, n_boot, seed)
+    top = rk.top_k_positions(est, topn)
+
+    k = min(topn, len(names))
+    kth = -np.partition(-boot, k - 1, axis=1)[:, k - 1] if k else np.zeros(n_boot)
+    lo, hi = _ci(boot[:, top])
+    return pd.DataFrame({
+        "Total": est[top],
+        "ic_bajo": lo,
+        "ic_alto": hi,
+        "en_top": (boot[:, top] >= kth[:, None]).mean(axis=0),
+    }, index=pd.Index(np.asarray(names)[top], name=name))
+
+
+# Proporción de películas/series por release_year (q1), con IC por réplica
+def _q1_estimate(sample: pd.DataFrame, weights, n_boot, seed) -> pd.DataFrame:
+    years = pd.to_numeric(sample["release_year"], errors="coerce")
+    y_codes, y_names = pd.factorize(years, sort=True)
+    t_codes = pd.Index(TYPES).get_indexer(sample["type"].astype(str).str.strip())
+    cells = np.where((y_codes >= 0) & (t_codes >= 0), y_codes * len(TYPES) + t_codes, -1)
+    est, boot = _weighted_cells(np.arange(len(sample)), cells, len(y_names) * len(TYPES), weights, n_boot, seed)
+
+    est = est.reshape(len(y_names), len(TYPES))
+    boot = boot.reshape(n_boot, len(y_names), len(TYPES))
+    total, total_boot = est.sum(axis=1), boot.sum(axis=2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        prop = est[:, 0] / total
+        prop_boot = boot[:, :, 0] / total_boot
+    lo, hi = _ci(prop_boot)
+    out = pd.DataFrame({
+        "Movie": est[:, 0], "TV Show": est[:, 1], "total": total,
+        "prop_movies": prop, "prop_movies_ic_bajo": lo, "prop_movies_ic_alto": hi,
+    }, index=pd.Index(np.asarray(y_names).astype(int), name="release_year"))
+    out["prop_series"] = 1.0 - out["prop_movies"]
+    return out[out["total"] > 0]
+
+
+# Estimaciones escaladas + IC para las preguntas seleccionadas (claves de main.QUESTIONS)
+def preview_estimates(sample: pd.DataFrame, weights: np.ndarray, keys, topn: int = 20,
+                      n_boot: int = N_BOOT, seed: int = 0) -> dict:
+    tables = {}
+    out = {}
+    if "q1" in keys:
+        out["q1"] = _q1_estimate(sample, weights, n_boot, seed)
+    if "q3" in keys:
+        c = dv.with_source(dv.get("countries", sample, tables), sample, "type")
+        out["q3"] = _pivot_estimate(c["title_id"], c["country_final"], c["type"], weights, n_boot, seed, "country_final")
+    if "q4" in keys:
+        r = dv.get("ratings", sample, tables)
+        out["q4"] = _pivot_estimate(r["title_id"], r["rating_norm"], r["type"], weights, n_boot, seed, "rating_norm")
+    if "q7" in keys:
+        d = dv.get("directors", sample, tables)
+        out["q7"] = _ranking_estimate(d["title_id"], d["director_final"], weights, topn, n_boot, seed, "director_final")
+    if "q8" in keys:
+        c = dv.get("cast", sample, tables)
+        out["q8"] = _ranking_estimate(c["title_id"], c["cast_final"], weights, topn, n_boot, seed, "cast_final")
+    return out
+
+
+# Valor exacto de cada pregunta comparable con su estimación (conteos, no proporciones)
+_EXACT = {
+    "q1": lambda r: r[["Movie", "TV Show"]],
+    "q3": lambda r: r["pivot_total"]["Total"],
+    "q4": lambda r: r["counts"]["Total"],
+    "q7": lambda r: r["pivot_tipo"]["Total"],
+    "q8": lambda r: r["ranking"]["Total"],
+}
+
+# Con fracción 1.0 todos los pesos valen 1 y cada estimación tiene que reproducir exactamente lo
+# que calcula la pregunta sobre la muestra; devuelve las claves que no coinciden
+def check_exact(results: dict, estimates: dict) -> list:
+    bad = []
+    for key, est in estimates.items():
+        if key not in results:
+            continue
+        exact = _EXACT[key](results[key])
+        cols = exact.columns if isinstance(exact, pd.DataFrame) else "Total"
+        got = est.reindex(exact.index)[cols]
+        if not np.allclose(got.to_numpy(dtype=float), exact.to_numpy(dtype=float), equal_nan=False):
+            bad.append(key)
+    return bad
+
+
+def report_preview(estimates: dict, fraction: float, n_sample: int, n_total: int) -> None:
+    print(f"[preview] Muestra estratificada (type × year_added): {n_sample} de {n_total} títulos "
+          f"({fraction:.0%}). Conteos escalados al catálogo, IC 95% bootstrap.")
+    print()
+    titles = {
+        "q1": "[Q1] Proporción de películas por año de estreno",
+        "q3": "[Q3] Países (Movie / TV Show estimados)",
+        "q4": "[Q4] Rating vs Tipo (estimado)",
+        "q7": "[Q7] Top directores (estimado; en_top = estabilidad del puesto)",
+        "q8": "[Q8] Top actores (estimado; en_top = estabilidad del puesto)",
+    }
+    with pd.option_context("display.width", 160, "display.max_columns", None, "display.float_format", lambda v: f"{v:,.2f}"):
+        for key, table in estimates.items():
+            print(titles[key] + ":")
+            print(table.head(10))
+            print()
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+# Scheduler DAG de preguntas y tablas derivadas, con liberación por conteo de referencias.
+#
+# Cada pregunta declara en su módulo las tablas derivadas que consume (TABLES, ver
+# utils.derived). El scheduler:
+# 1. Arma el DAG pregunta -> tablas -> tablas de las que dependen
+# 2. Ordena las preguntas con una heurística greedy que minimiza las tablas vivas a la vez
+#    (prefiere la pregunta que construye menos tablas nuevas y libera más al terminar)
+# 3. Construye cada tabla una sola vez, justo antes de su primer consumidor
+# 4. Libera cada tabla apenas termina su último consumidor (pregunta o tabla dependiente)
+# 5. Registra tiempo, RSS actual y pico de RSS de cada etapa
+#
+# Nota: una pregunta no debe devolver la tabla dentro de su resultado (esa referencia la
+# mantendría viva aunque el scheduler la haya soltado); los frames por fila van como claves
+# perezosas de utils.results.Result.
+
+from __future__ import annotations
+import gc
+import time
+import resource
+
+import pandas as pd
+
+from utils import derived as dv
+
+
+def _read_status() -> dict:
+    out = {}
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    key, val = line.split(":", 1)
+                    out[key] = int(val.split()[0]) / 1024.0
+    except OSError:
+        pass
+    return out
+
+# (RSS actual, pico de RSS) en MB. Sin /proc se usa ru_maxrss (pico de todo el proceso)
+def rss_mb() -> tuple:
+    st = _read_status()
+    if "VmRSS" in st:
+        return st["VmRSS"], st.get("VmHWM", st["VmRSS"])
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    return peak, peak
+
+# Reinicia el pico (VmHWM) para medir el pico de cada etapa por separado (Linux)
+def reset_peak_rss() -> None:
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+    except OSError:
+        pass
+
+
+# Consumidores de cada tabla: preguntas que la declaran + tablas que dependen de ella
+def _consumers(questions: dict) -> dict:
+    needed = dv.closure(t for tabs in questions.values() for t in tabs)
+    cons = {t: set() for t in needed}
+    for key, tabs in questions.items():
+        for t in tabs:
+            cons[t].add(key)
+    for t in needed:
+        for d in dv.deps(t):
+            cons[d].add(f"table:{t}")
+    return cons
+
+
+# Orden greedy: menor (tablas nuevas - tablas liberadas al terminar), desempate por orden original
+def plan(questions: dict) -> list:
+    cons = _consumers(questions)
+    remaining = list(questions)
+    built, pending = set(), {t: set(c) for t, c in cons.items()}
+    order = []
+
+    while remaining:
+        def score(key):
+            needed = dv.closure(questions[key])
+            new = [t for t in needed if t not in built]
+            # consumidores de cada tabla después de correr 'key' (y construir lo que necesita)
+            left = {t: pending[t] - {key} - {f"table:{n}" for n in new} for t in pending}
+            freed = [t for t in needed if not left[t]]
+            return (len(new) - len(freed), remaining.index(key))
+
+        key = min(remaining, key=score)
+        needed = dv.closure(questions[key])
+        for t in needed:
+            if t not in built:
+                built.add(t)
+                for d in dv.deps(t):
+                    pending[d].discard(f"table:{t}")
+        for t in questions[key]:
+            pending[t].discard(key)
+        remaining.remove(key)
+        order.append(key)
+    return order
+
+
+def _stage(stages: list, name: str, t0: float, live: dict) -> None:
+    rss, peak = rss_mb()
+    stages.append({
+        "stage": name,
+        "seconds": time.perf_counter() - t0,
+        "rss_mb": rss,
+        "peak_mb": peak,
+        "live_tables": ",".join(live) or "-",
+    })
+    reset_peak_rss()
+
+
+# Corre las preguntas según el plan. 'questions' = [(clave, función(df, outdir, tables), TABLES)]
+# Con 'cache' (dict) las tablas que ya están ahí se reutilizan y las construidas se guardan en
+# él sin liberarse (modo watch: las tablas quedan vivas entre corridas).
+# Con 'store' ({tabla: utils.store.MappedTable}) esas tablas se adjuntan del almacén en vez de construirse
+def run_scheduled(df: pd.DataFrame, questions: list, outdir: str, cache: dict | None = None,
+                  store: dict | None = None) -> tuple:
+    fns = {key: fn for key, fn, _ in questions}
+    decl = {key: tuple(tabs) for key, _, tabs in questions}
+    pending = {t: set(c) for t, c in _consumers(decl).items()}
+
+    live = {} if cache is None else cache
+    stages = []
+    results = {}
+
+    def release(t: str, consumer: str) -> None:
+        pending[t].discard(consumer)
+        if cache is None and not pending[t] and t in live:
+            del live[t]
+            gc.collect()
+            _stage(stages, f"free:{t}", time.perf_counter(), live)
+
+    reset_peak_rss()
+    for key in plan(decl):
+        for t in dv.closure(decl[key]):
+            if t in live:
+                continue
+            t0 = time.perf_counter()
+            if store is not None and t in store:
+                live[t] = store[t].to_frame(df)
+                _stage(stages, f"attach:{t}", t0, live)
+            else:
+                live[t] = dv.build(t, df, live)
+                _stage(stages, f"build:{t}", t0, live)
+            for d in dv.deps(t):
+                release(d, f"table:{t}")
+
+        t0 = time.perf_counter()
+        results[key] = fns[key](df, outdir, {t: live[t] for t in decl[key]})
+        _stage(stages, f"run:{key}", t0, live)
+        for t in decl[key]:
+            release(t, key)
+
+    return results, pd.DataFrame(stages)
+
+
+def report_stages(stages: pd.DataFrame) -> None:
+    if stages.empty:
+        return
+    print("[scheduler] Etapas (RSS en MB):")
+    with pd.option_context("display.max_rows", None, "display.width", 140):
+        print(stages.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    print(f"[scheduler] Pico de RSS: {stages['peak_mb'].max():.1f} MB")
+    print()
@@ -0,0 +1,428 @@
+# -*- coding: utf-8 -*-
+# Backend SQLite: el catálogo se ingiere una vez en un archivo SQLite local (stdlib sqlite3)
+# y los pivotes de q1–q9 se calculan con agregaciones SQL sobre índices en disco.
+#
+# Esquema:
+#   titles(title_id, show_id, type, title, release_year, year_added, month_added,
+#          duration_type, duration_minutes, duration_seasons)
+#   title_country(title_id, country)        title_cast(title_id, actor)
+#   title_director(title_id, director)      title_listed_in(title_id, listed_in, genre)
+#   title_rating(title_id, rating)
+# Las tablas puente se llenan con las mismas funciones de utils.cleaning que usan las preguntas
+# (mismos tokens, mismos alias y duplicados), así los conteos coinciden con la ruta pandas.
+# Cada puente tiene índices (clave, title_id) y (title_id, clave): los GROUP BY y los filtros
+# de un recorte se resuelven solo con índices, sin volver a explotar el CSV.
+#
+# La ingesta es por chunks (utils.readers) y se escribe en un archivo temporal que se publica con
+# os.replace; la base guarda ruta, tamaño y mtime de la fuente y se reutiliza mientras no cambie.
+# En memoria solo viven un chunk durante la ingesta y los resultados agregados al consultar.
+#
+# Uso:
+#   python main.py --sql netflix.sqlite
+#   python main.py --sql netflix.sqlite --only q3,q7 --where type=Movie --where country=Japan
+
+from __future__ import annotations
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from utils import cleaning as cl
+from utils import ranking as rk
+from utils import readers
+from utils import sketches as sk
+
+SCHEMA_VERSION = 1
+CHUNKSIZE = readers.CHUNKSIZE
+TYPES = ("Movie", "TV Show")
+RATING_ORDER = ["TV-MA", "TV-14", "TV-PG", "PG-13", "PG", "R", "G", "TV-Y7", "TV-Y", "NR"]
+
+_DDL = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE titles (
+    title_id INTEGER PRIMARY KEY,
+    show_id TEXT,
+    type TEXT,
+    title TEXT,
+    release_year INTEGER,
+    year_added INTEGER,
+    month_added INTEGER,
+    duration_type TEXT,
+    duration_minutes INTEGER,
+    duration_seasons INTEGER
+);
+CREATE TABLE title_country (title_id INTEGER NOT NULL, country TEXT NOT NULL);
+CREATE TABLE title_cast (title_id INTEGER NOT NULL, actor TEXT NOT NULL);
+CREATE TABLE title_director (title_id INTEGER NOT NULL, director TEXT NOT NULL);
+CREATE TABLE title_listed_in (title_id INTEGER NOT NULL, listed_in TEXT NOT NULL, genre TEXT NOT NULL);
+CREATE TABLE title_rating (title_id INTEGER NOT NULL, rating TEXT NOT NULL);
+"""
+
+# tabla puente -> (columnas de entrada, función de cleaning, {columna SQL: columna del resultado})
+BRIDGES = {
+    "title_country": (["country"], cl.expand_and_normalize_countries, {"country": "country_final"}),
+    "title_cast": (["cast"], cl.expand_and_normalize_cast, {"actor": "cast_final"}),
+    "title_director": (["director"], cl.expand_and_normalize_directors, {"director": "director_final"}),
+    "title_listed_in": (["listed_in"], lambda d: cl.add_genre_from_listed_in(cl.explode_listed_in(d)),
+                        {"listed_in": "listed_in", "genre": "genre_main"}),
+    "title_rating": (["rating"], cl.normalize_and_explode_ratings, {"rating": "rating_norm"}),
+}
+
+_INDEXES = [
+    "CREATE INDEX idx_titles_type ON titles (type)",
+    "CREATE INDEX idx_titles_release_year ON titles (release_year)",
+    "CREATE INDEX idx_titles_year_added ON titles (year_added)",
+    "CREATE INDEX idx_title_listed_in_genre ON title_listed_in (genre, title_id)",
+] + [
+    stmt
+    for table, (_, _, cols) in BRIDGES.items()
+    for key in [next(iter(cols))]
+    for stmt in (f"CREATE INDEX idx_{table}_key ON {table} ({key}, title_id)",
+                 f"CREATE INDEX idx_{table}_title ON {table} (title_id, {key})")
+]
+
+# filtro de recorte -> subconsulta de title_id (todas resueltas por índice)
+SLICES = {
+    "type": "SELECT title_id FROM titles WHERE type = ?",
+    "release_year": "SELECT title_id FROM titles WHERE release_year = ?",
+    "year_added": "SELECT title_id FROM titles WHERE year_added = ?",
+    "country": "SELECT title_id FROM title_country WHERE country = ?",
+    "cast": "SELECT title_id FROM title_cast WHERE actor = ?",
+    "director": "SELECT title_id FROM title_director WHERE director = ?",
+    "listed_in": "SELECT title_id FROM title_listed_in WHERE listed_in = ?",
+    "genre": "SELECT title_id FROM title_listed_in WHERE genre = ?",
+    "rating": "SELECT title_id FROM title_rating WHERE rating = ?",
+}
+_INT_SLICES = {"release_year", "year_added"}
+
+
+# ---------------- Ingesta ----------------
+def _records(frame: pd.DataFrame, cols: list) -> list:
+    out = frame[cols].astype(object)
+    return list(out.where(out.notna(), None).itertuples(index=False, name=None))
+
+
+def _as_int(s: pd.Series) -> pd.Series:
+    return pd.to_numeric(s, errors="coerce").astype("Int64")
+
+
+def _titles_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    dates = cl.add_year_and_month(chunk)
+    durations = cl.normalize_duration(chunk)
+    return pd.DataFrame({
+        "title_id": chunk["title_id"],
+        "show_id": chunk["show_id"],
+        "type": chunk["type"].astype(str).str.strip().where(chunk["type"].notna()),
+        "title": chunk["title"],
+        "release_year": _as_int(chunk["release_year"]),
+        "year_added": _as_int(dates["year_added"]),
+        "month_added": _as_int(dates["month_added"]),
+        "duration_type": durations["type"].where(chunk["type"].notna()),
+        "duration_minutes": _as_int(durations["duration_minutes"]),
+        "duration_seasons": _as_int(durations["duration_seasons"]),
+    })
+
+
+def _insert(con: sqlite3.Connection, table: str, frame: pd.DataFrame, cols: list) -> None:
+    marks = ", ".join("?" for _ in cols)
+    con.executemany(f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({marks})", _records(frame, cols))
+
+
+def _source_meta(src: str) -> dict:
+    st = os.stat(src)
+    return {"schema": str(SCHEMA_VERSION), "source": os.path.abspath(src),
+            "size": str(st.st_size), "mtime_ns": str(st.st_mtime_ns)}
+
+
+# Ingiere 'src' (cualquier formato de utils.readers) en 'db_path'; devuelve la cantidad de títulos
+def ingest(src: str, db_path: str, chunksize: int = CHUNKSIZE) -> int:
+    tmp = f"{db_path}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+    con = sqlite3.connect(tmp)
+    n = 0
+    try:
+        con.execute("PRAGMA journal_mode = OFF")
+        con.execute("PRAGMA synchronous = OFF")
+        con.executescript(_DDL)
+        for chunk in readers.iter_chunks(src, chunksize):
+            chunk = chunk.assign(title_id=np.arange(n, n + len(chunk), dtype=np.int64))
+            n += len(chunk)
+            titles = _titles_chunk(chunk)
+            _insert(con, "titles", titles, list(titles.columns))
+            for table, (inputs, fn, cols) in BRIDGES.items():
+                if not set(inputs).issubset(chunk.columns):
+                    continue
+                out = fn(chunk[["title_id"] + inputs])[["title_id"] + list(cols.values())]
+                _insert(con, table, out.set_axis(["title_id"] + list(cols), axis=1), ["title_id"] + list(cols))
+        for stmt in _INDEXES:
+            con.execute(stmt)
+        con.executemany("INSERT INTO meta VALUES (?, ?)", list(_source_meta(src).items()) + [("titles", str(n))])
+        con.commit()
+        con.execute("ANALYZE")
+    finally:
+        con.close()
+    os.replace(tmp, db_path)
+    return n
+
+
+def _is_fresh(db_path: str, src: str) -> bool:
+    if not os.path.exists(db_path):
+        return False
+    try:
+        con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            meta = dict(con.execute("SELECT key, value FROM meta"))
+        finally:
+            con.close()
+    except sqlite3.DatabaseError:
+        return False
+    return all(meta.get(k) == v for k, v in _source_meta(src).items())
+
+
+# Conexión a la base de 'src', reingiriendo solo si la fuente cambió (o rebuild=True)
+def open_store(src: str, db_path: str, rebuild: bool = False, chunksize: int = CHUNKSIZE) -> sqlite3.Connection:
+    if rebuild or not _is_fresh(db_path, src):
+        n = ingest(src, db_path, chunksize)
+        print(f"[sql] Base '{db_path}' creada desde '{src}' ({n} títulos).")
+    else:
+        print(f"[sql] Reutilizando '{db_path}' (la fuente no cambió).")
+    return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+
+# ---------------- Recortes ----------------
+# "clave=valor" -> (clave, valor); las claves válidas son las de SLICES
+def parse_where(items) -> dict:
+    where = {}
+    for item in items or []:
+        key, sep, value = item.partition("=")
+        key = key.strip()
+        if not sep or key not in SLICES:
+            raise ValueError(f"Filtro inválido: '{item}' (formato clave=valor, claves: {sorted(SLICES)})")
+        where[key] = int(value) if key in _INT_SLICES else value.strip()
+    return where
+
+
+# Condición SQL extra para restringir 'alias'.title_id al recorte (intersección de filtros)
+def _scope(where: dict | None, alias: str = "t") -> tuple:
+    if not where:
+        return "", []
+    sub = " INTERSECT ".join(SLICES[k] for k in where)
+    return f" AND {alias}.title_id IN ({sub})", list(where.values())
+
+
+# Agrega a la condición "AND columna IN (entidades)" (p. ej. solo el Top-N)
+def _only(scope: str, params: list, column: str, entities=None) -> tuple:
+    if entities is None:
+        return scope, params
+    return f"{scope} AND {column} IN ({', '.join('?' for _ in entities)})", params + list(entities)
+
+
+def _query(con: sqlite3.Connection, sql: str, params, columns: list) -> pd.DataFrame:
+    return pd.DataFrame(con.execute(sql, params).fetchall(), columns=columns)
+
+
+# (índice, columna, size) agregado en SQL -> pivote entero con las columnas pedidas presentes
+def _pivot(grp: pd.DataFrame, index: str, columns: str, ensure=()) -> pd.DataFrame:
+    pivot = grp.pivot(index=index, columns=columns, values="size").fillna(0).astype(int)
+    pivot.columns.name = columns
+    for col in ensure:
+        if col not in pivot.columns:
+            pivot[col] = 0
+    return pivot
+
+
+# ---------------- Pivotes q1–q9 ----------------
+def q1_pivot(con: sqlite3.Connection, where: dict | None = None) -> pd.DataFrame:
+    scope, params = _scope(where)
+    grp = _query(con, f"""
+        SELECT release_year, type, COUNT(*) FROM titles t
+        WHERE release_year IS NOT NULL AND type IN ('Movie', 'TV Show'){scope}
+        GROUP BY release_year, type""", params, ["release_year", "type", "size"])
+    counts = _pivot(grp, "release_year", "type", TYPES).sort_index()
+    counts["total"] = counts["Movie"] + counts["TV Show"]
+    counts = counts[counts["total"] > 0].copy()
+    counts["prop_movies"] = counts["Movie"] / counts["total"]
+    counts["prop_series"] = counts["TV Show"] / counts["total"]
+    return counts[["Movie", "TV Show", "total", "prop_movies", "prop_series"]]
+
+
+def q2_pivot(con: sqlite3.Connection, where: dict | None = None) -> pd.DataFrame:
+    scope, params = _scope(where)
+    grp = _query(con, f"""
+        SELECT year_added, type, COUNT(*) FROM titles t
+        WHERE year_added IS NOT NULL AND type IS NOT NULL{scope}
+        GROUP BY year_added, type""", params, ["year_added", "type", "size"])
+    return _pivot(grp, "year_added", "type", TYPES).sort_index()[list(TYPES)]
+
+
+# Entidad de un puente × tipo, con Total y orden desc (desempate por nombre)
+def _bridge_by_type(con, table: str, key: str, index_name: str, where: dict | None, entities=None) -> pd.DataFrame:
+    scope, params = _scope(where)
+    scope, params = _only(scope, params, f"b.{key}", entities)
+    grp = _query(con, f"""
+        SELECT b.{key}, t.type, COUNT(*) FROM {table} b JOIN titles t ON t.title_id = b.title_id
+        WHERE t.type IS NOT NULL{scope}
+        GROUP BY b.{key}, t.type""", params, [index_name, "type", "size"])
+    pivot = _pivot(grp, index_name, "type", TYPES)
+    pivot["Total"] = pivot["Movie"] + pivot["TV Show"]
+    return pivot[["Movie", "TV Show", "Total"]]
+
+
+def q3_pivot(con: sqlite3.Connection, where: dict | None = None) -> pd.DataFrame:
+    pivot = _bridge_by_type(con, "title_country", "country", "country_final", where)
+    return rk.top_k_frame(pivot, "Total", len(pivot))
+
+
+def q4_pivot(con: sqlite3.Connection, where: dict | None = None) -> pd.DataFrame:
+    pivot = _bridge_by_type(con, "title_rating", "rating", "rating_norm", where)
+    return pivot.sort_values("Total", ascending=False)
+
+
+# Conteos entidad × rating (join de dos puentes por title_id), agregados en SQL
+def _entity_ratings(con, table: str, key: str, where: dict | None, entities=None) -> pd.DataFrame:
+    scope, params = _only(*_scope(where, "b"), f"b.{key}", entities)
+    return _query(con, f"""
+        SELECT b.{key}, r.rating, COUNT(*) FROM {table} b JOIN title_rating r ON r.title_id = b.title_id
+        WHERE 1 = 1{scope}
+        GROUP BY b.{key}, r.rating""", params, ["entity", "rating_norm", "size"])
+
+
+def _audience_pivot(grp: pd.DataFrame, index_name: str, ensure=()) -> pd.DataFrame:
+    grp = grp.assign(audiencia=grp["rating_norm"].map(lambda x: cl.map_rating_to_audience(x, mode="adult_kids")))
+    grp = grp.groupby(["entity", "audiencia"], as_index=False)["size"].sum()
+    pivot = _pivot(grp, "entity", "audiencia", ensure)
+    pivot.index.name = index_name
+    pivot.columns.name = None
+    return pivot
+
+
+def q5_pivot(con: sqlite3.Connection, where: dict | None = None) -> pd.DataFrame:
+    pivot = _audience_pivot(_entity_ratings(con, "title_country", "country", where), "country_final")
+    pivot["Total"] = pivot.sum(axis=1)
+    return rk.top_k_frame(pivot, "Total", len(pivot))
+
+
+def q6_pivot(con: sqlite3.Connection, where: dict | None = None) -> pd.DataFrame:
+    scope, params = _scope(where)
+    grp = _query(con, f"""
+        SELECT t.month_added, l.listed_in, COUNT(*) FROM title_listed_in l JOIN titles t ON t.title_id = l.title_id
+        WHERE t.month_added IS NOT NULL AND t.title IS NOT NULL{scope}
+        GROUP BY t.month_added, l.listed_in""", params, ["mes", "listed_in", "size"])
+    return _pivot(grp, "mes", "listed_in").sort_index()
+
+
+# Top-N por cantidad de filas del puente (desempate alfabético, como utils.ranking)
+def _top_entities(con, table: str, key: str, topn: int, where: dict | None) -> pd.Series:
+    scope, params = _scope(where, "b")
+    rows = con.execute(f"""
+        SELECT b.{key}, COUNT(*) AS n FROM {table} b
+        WHERE 1 = 1{scope}
+        GROUP BY b.{key} ORDER BY n DESC, b.{key} LIMIT ?""", params + [topn]).fetchall()
+    return pd.Series([n for _, n in rows], index=pd.Index([k for k, _ in rows]), name="count")
+
+
+def q7_pivot(con: sqlite3.Connection, where: dict | None = None, topn: int = 20) -> dict:
+    top = _top_entities(con, "title_director", "director", topn, where)
+    top.index.name = "director_final"
+
+    # los directores del Top-N sin tipo cargado quedan con Total 0, como en la ruta pandas
+    by_type = _bridge_by_type(con, "title_director", "director", "director_final", where, top.index)
+    by_type = by_type.reindex(top.index.sort_values(), fill_value=0).sort_values("Total", ascending=True)
+
+    grp = _entity_ratings(con, "title_director", "director", where, top.index)
+    audiencia = _audience_pivot(grp, "director_final", ("Adulto", "Infantil"))
+    audiencia["Total"] = audiencia["Adulto"] + audiencia["Infantil"]
+    audiencia = audiencia.sort_values("Total", ascending=True)[["Infantil", "Adulto", "Total"]]
+    return {"ranking": top, "pivot_tipo": by_type, "pivot_audiencia": audiencia}
+
+
+def q8_pivot(con: sqlite3.Connection, where: dict | None = None, topn: int = 20) -> dict:
+    top = _top_entities(con, "title_cast", "actor", topn, where)
+    ranking = top.sort_index().sort_values(ascending=True).to_frame(name="Total")
+    ranking.index.name = "cast_final"
+
+    grp = _entity_ratings(con, "title_cast", "actor", where, top.index)
+    pv = _pivot(grp, "entity", "rating_norm")
+    pv.index.name = "cast_final"
+    cols_present = [c for c in RATING_ORDER if c in pv.columns]
+    pv = pv[cols_present + [c for c in pv.columns if c not in cols_present]]
+    pv["Total"] = pv.sum(axis=1)
+    return {"ranking": ranking, "pv_rating": pv.sort_values("Total", ascending=True)}
+
+
+# Histogramas de duración {tipo: {grupo: IntHistogram}} a partir de filas (tipo, grupo, valor, conteo)
+def _histograms(rows) -> dict:
+    if not rows:
+        return {}
+    df = pd.DataFrame(rows, columns=["tipo", "grupo", "valor", "n"])
+    acc = {}
+    for (tipo, grupo), g in df.groupby(["tipo", "grupo"], sort=True):
+        counts = np.bincount(g["valor"].to_numpy(dtype=np.int64), weights=g["n"].to_numpy())
+        acc.setdefault(tipo, {})[grupo] = sk.IntHistogram(counts.astype(np.int64))
+    return acc
+
+
+def _duration_stats(acc: dict, group_name: str) -> pd.DataFrame:
+    frames = [sk.stats_frame(h, index_name=group_name).reset_index().assign(type=tipo)
+              for tipo, h in acc.items()]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=["type", group_name, "count", "mean", "median"])
+    out = pd.concat(frames, ignore_index=True)
+    return out[["type", group_name] + [c for c in out.columns if c not in ("type", group_name)]]
+
+
+# Estadísticas de duración por tipo y por género; la mediana y los percentiles salen de
+# histogramas armados con GROUP BY valor (exactos, sin traer filas por título)
+def q9_pivot(con: sqlite3.Connection, where: dict | None = None) -> dict:
+    scope, params = _scope(where)
+    measure = "CASE t.duration_type WHEN 'Movie' THEN t.duration_minutes ELSE t.duration_seasons END"
+    per_type = con.execute(f"""
+        SELECT t.duration_type, 'Total', {measure} AS v, COUNT(*) FROM titles t
+        WHERE t.duration_type IN ('Movie', 'TV Show') AND v IS NOT NULL{scope}
+        GROUP BY t.duration_type, v""", params).fetchall()
+    per_genre = con.execute(f"""
+        SELECT t.duration_type, g.genre, {measure} AS v, COUNT(DISTINCT t.title_id) FROM titles t
+        JOIN title_listed_in g ON g.title_id = t.title_id
+        WHERE t.duration_type IN ('Movie', 'TV Show') AND v IS NOT NULL{scope}
+        GROUP BY t.duration_type, g.genre, v""", params).fetchall()
+
+    totals = _histograms(per_type)
+    stats = {name: totals[tipo]["Total"].stats() if tipo in totals else {}
+             for name, tipo in (("movies", "Movie"), ("tvshows", "TV Show"))}
+    return {"stats": stats, "stats_por_genero": _duration_stats(_histograms(per_genre), "genre")}
+
+
+# clave de pregunta -> función(con, where) que devuelve sus pivotes
+PIVOTS = {
+    "q1": q1_pivot,
+    "q2": q2_pivot,
+    "q3": q3_pivot,
+    "q4": q4_pivot,
+    "q5": q5_pivot,
+    "q6": q6_pivot,
+    "q7": q7_pivot,
+    "q8": q8_pivot,
+    "q9": q9_pivot,
+}
+
+
+def run_pivots(con: sqlite3.Connection, keys, where: dict | None = None) -> dict:
+    return {key: PIVOTS[key](con, where) for key in keys if key in PIVOTS}
+
+
+def report_pivots(results: dict, where: dict | None = None) -> None:
+    label = ", ".join(f"{k}={v}" for k, v in (where or {}).items()) or "catálogo completo"
+    print(f"[sql] Pivotes calculados en SQLite ({label}).")
+    print()
+    with pd.option_context("display.width", 160, "display.max_columns", None):
+        for key, res in results.items():
+            tables = res if isinstance(res, dict) else {"pivot": res}
+            for name, table in tables.items():
+                print(f"[{key.upper()}] {name}:")
+                print(pd.DataFrame(table).T if isinstance(table, dict) else table.head(10))
+                print()
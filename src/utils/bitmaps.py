@@ -0,0 +1,176 @@
+# Índices bitmap por valor categórico, para recortar todas las preguntas a un subconjunto
+#
+# "Solo lo agregado en 2019–2021", "solo TV-MA", "solo títulos con España": en vez de filtrar el
+# DataFrame y volver a limpiar todo, cada campo (type, rating, year_added, country, genre) guarda
+# un bitmap empaquetado por valor (np.packbits: 1 bit por título, n_filas / 8 bytes por valor).
+# Los filtros se combinan con operaciones bit a bit sobre bytes:
+#   mismo campo      OR   (--where country=Spain --where country=Mexico)
+#   campos distintos AND  (--where type=Movie --where rating=TV-MA)
+#   campo!=valor     NOT  (--where type!=Movie)
+#   year_added       admite rangos (--where year_added=2019-2021)
+# El resultado se desempaqueta a una máscara bool que reciben los qN.run(mask=...): las tablas
+# derivadas se recortan de las del catálogo entero (utils.derived.restrict), sin re-cleaning.
+#
+# Los valores salen de las mismas tablas derivadas que usan las preguntas (rating_norm, país y
+# género canónicos), así que armar los índices con el caché del scheduler no limpia nada dos veces.
+
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from utils import derived as dv
+
+# campo -> (tabla derivada o None = columna de df, columna con el valor)
+FIELDS = {
+    "type":       (None, "type"),
+    "rating":     ("ratings", "rating_norm"),
+    "year_added": ("dates", "year_added"),
+    "country":    ("countries", "country_final"),
+    "genre":      ("genres", "genre_main"),
+}
+_RANGE_FIELDS = {"year_added"}
+
+
+@dataclass(frozen=True)
+class BitmapIndex:
+    name: str
+    vocab: List[str]
+    bits: np.ndarray      # uint8 (n_valores, ceil(n_filas / 8)), fila i = títulos con vocab[i]
+    n_rows: int
+    codes: Dict[str, int]
+
+    def __len__(self) -> int:
+        return len(self.vocab)
+
+    def __contains__(self, value) -> bool:
+        return value in self.codes
+
+    # Bitmap de 'value' (vista); todo en cero si no existe
+    def get(self, value: str) -> np.ndarray:
+        code = self.codes.get(value)
+        if code is None:
+            return empty(self.n_rows)
+        return self.bits[code]
+
+    def any_of(self, values) -> np.ndarray:
+        codes = [self.codes[v] for v in values if v in self.codes]
+        if not codes:
+            return empty(self.n_rows)
+        return np.bitwise_or.reduce(self.bits[codes], axis=0)
+
+    # Títulos por valor (popcount de cada fila)
+    def sizes(self) -> pd.Series:
+        return pd.Series(np.bitwise_count(self.bits).sum(axis=1, dtype=np.int64),
+                         index=pd.Index(self.vocab, name=self.name), name="filas")
+
+
+def empty(n_rows: int) -> np.ndarray:
+    return np.zeros((n_rows + 7) // 8, dtype=np.uint8)
+
+# Complemento, con los bits de relleno del último byte en cero
+def invert(bits: np.ndarray, n_rows: int) -> np.ndarray:
+    out = np.bitwise_not(bits)
+    if n_rows % 8:
+        out[-1] &= np.uint8((0xFF << (8 - n_rows % 8)) & 0xFF)
+    return out
+
+def to_mask(bits: np.ndarray, n_rows: int) -> np.ndarray:
+    return np.unpackbits(bits, count=n_rows).view(bool)
+
+def count(bits: np.ndarray) -> int:
+    return int(np.bitwise_count(bits).sum())
+
+
+def _make_index(name: str, values: np.ndarray, rows: np.ndarray, n_rows: int) -> BitmapIndex:
+    codes, vocab = pd.factorize(pd.Series(values, dtype=object), sort=True)
+    bits = np.zeros((len(vocab), (n_rows + 7) // 8), dtype=np.uint8)
+    np.bitwise_or.at(bits, (codes, rows >> 3), (0x80 >> (rows & 7)).astype(np.uint8))
+    vocab = [str(v) for v in vocab]
+    return BitmapIndex(name, vocab, bits, n_rows, {v: i for i, v in enumerate(vocab)})
+
+
+# (valores, posiciones de fila) de un campo; las tablas sin title_id están alineadas con df.index
+def _field_values(df: pd.DataFrame, name: str, tables: dict | None) -> tuple:
+    table, col = FIELDS[name]
+    if table is None:
+        values = df[col].astype(str).str.strip().where(df[col].notna())
+        rows = np.arange(len(df), dtype=np.int64)
+    else:
+        src = dv.get(table, df, tables)
+        values = src[col]
+        if "title_id" in src.columns:
+            rows = src["title_id"].to_numpy(dtype=np.int64)
+        else:
+            rows = df.index.get_indexer(src.index).astype(np.int64)
+    ok = values.notna().to_numpy() & (rows >= 0)
+    values = values[ok]
+    if name in _RANGE_FIELDS:
+        values = values.astype(np.int64).astype(str)
+    values = values.to_numpy(dtype=object)
+    keep = values != ""
+    return values[keep], rows[ok][keep]
+
+
+# Índices de df; 'tables' es el caché de tablas derivadas (se completa con las que falten)
+def build_bitmaps(df: pd.DataFrame, tables: dict | None = None,
+                  fields: Iterable[str] | None = None) -> Dict[str, BitmapIndex]:
+    names = list(fields or FIELDS)
+    unknown = set(names).difference(FIELDS)
+    if unknown:
+        raise ValueError(f"Campos desconocidos: {sorted(unknown)} (opciones: {sorted(FIELDS)})")
+    return {name: _make_index(name, *_field_values(df, name, tables), len(df)) for name in names}
+
+
+# Columnas de df que necesitan los campos
+def required_columns(fields: Iterable[str]) -> list:
+    cols = []
+    for name in fields:
+        table, col = FIELDS[name]
+        for c in ((col,) if table is None else dv.TABLES[table][2]):
+            if c not in cols:
+                cols.append(c)
+    return cols
+
+
+def _expand(key: str, value: str) -> list:
+    if key not in _RANGE_FIELDS:
+        return [value]
+    lo, sep, hi = value.partition("-")
+    try:
+        lo = int(lo)
+        hi = int(hi) if sep else lo
+    except ValueError:
+        raise ValueError(f"Valor inválido para '{key}': '{value}' (un año o un rango, p. ej. 2019-2021)") from None
+    return [str(y) for y in range(lo, hi + 1)]
+
+# "campo=valor" / "campo!=valor" repetibles -> {(campo, negado): [valores]}
+def parse_where(items) -> dict:
+    query = {}
+    for item in items or []:
+        key, sep, value = item.partition("=")
+        negate = key.endswith("!")
+        key = key.rstrip("!").strip().lower()
+        if not sep or key not in FIELDS or not value.strip():
+            raise ValueError(f"Filtro inválido: '{item}' (formato campo=valor o campo!=valor, "
+                             f"campos: {sorted(FIELDS)})")
+        query.setdefault((key, negate), []).extend(_expand(key, value.strip()))
+    return query
+
+def describe(query: dict) -> str:
+    parts = []
+    for (key, negate), values in query.items():
+        op = "not in" if negate else "in"
+        parts.append(f"{key} {op} {values}" if len(values) > 1 else f"{key}{'!=' if negate else '='}{values[0]}")
+    return " AND ".join(parts)
+
+
+# Bitmap de los títulos que cumplen 'query' (AND entre campos, OR dentro de cada uno)
+def select(index: Dict[str, BitmapIndex], query: dict, n_rows: int) -> np.ndarray:
+    out = invert(empty(n_rows), n_rows)
+    for (key, negate), values in query.items():
+        bits = index[key].any_of(values)
+        np.bitwise_and(out, invert(bits, n_rows) if negate else bits, out=out)
+    return out
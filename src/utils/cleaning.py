@@ -2,6 +2,8 @@
 from __future__ import annotations
 import re
 import difflib
+import importlib.util
+from contextlib import contextmanager
 from typing import Dict, List
 import pandas as pd
 import collections
@@ -141,17 +143,116 @@ def _canon_country(tok: str) -> str:
     cand = difflib.get_close_matches(tok, CANON_COUNTRIES, n=1, cutoff=0.85)
     return cand[0] if cand else tok
 
+# ---------------- Memos de canonicalización ----------------
+# token crudo -> valor canónico. Se comparten entre llamadas (y entre snapshots en batch.py),
+# así el fuzzy matching y la normalización corren una vez por token distinto.
+_CANON_CACHES: Dict[str, Dict[str, str]] = {"country": {}, "rating": {}}
+
+def canonical_country_token(tok) -> str:
+    if not isinstance(tok, str):
+        return ""
+    t = _clean_country_token(tok)
+    t = COUNTRY_ALIASES.get(t, t)
+    return _canon_country(t)
+
+def _map_with_cache(tokens: pd.Series, kind: str, fn) -> pd.Series:
+    cache = _CANON_CACHES[kind]
+    for tok in tokens.dropna().unique():
+        if tok not in cache:
+            cache[tok] = fn(tok)
+    return tokens.map(cache).fillna("")
+
+# Precalcula el memo para un vocabulario de tokens crudos y lo devuelve (para pasarlo a workers)
+def warm_canon_caches(country_tokens=(), rating_tokens=()) -> Dict[str, Dict[str, str]]:
+    _map_with_cache(pd.Series(list(country_tokens), dtype=object), "country", canonical_country_token)
+    _map_with_cache(pd.Series(list(rating_tokens), dtype=object), "rating", normalize_rating_token)
+    return export_canon_caches()
+
+def export_canon_caches() -> Dict[str, Dict[str, str]]:
+    return {k: dict(v) for k, v in _CANON_CACHES.items()}
+
+def seed_canon_caches(caches: Dict[str, Dict[str, str]]) -> None:
+    for k, v in caches.items():
+        _CANON_CACHES.setdefault(k, {}).update(v)
+
+# Vacía los memos (p. ej. para medir tiempos en frío en perf.py)
+def clear_canon_caches() -> None:
+    for cache in _CANON_CACHES.values():
+        cache.clear()
+
+# ---------------- Motor de strings ----------------
+# "object": split / explode / replace / strip de pandas (una lista Python por fila).
+# "arrow":  los mismos pasos con kernels de pyarrow.compute sobre el buffer de strings: el split
+#           da un ListArray que se aplana sin crear listas Python y la explosión es un take()
+#           con los índices padre.
+# Las dos rutas devuelven exactamente los mismos tokens.
+STRING_ENGINES = ("object", "arrow")
+_STRING_ENGINE = {"name": "object"}
+
+# Todos los caracteres con str.isspace() (el último es U+3000) como clase literal: significa lo
+# mismo en 're' y en RE2 (con pandas >= 3 '.str.replace' sobre str corre en RE2, donde '\s' es
+# solo ASCII). Después de colapsar, el único blanco posible en los bordes es " ".
+_WHITESPACE = "".join(c for c in map(chr, range(0x3001)) if c.isspace())
+_WS_RUN = "[" + _WHITESPACE + "]+"
+
+def set_string_engine(name: str) -> None:
+    if name not in STRING_ENGINES:
+        raise ValueError(f"Motor de strings desconocido: {name} (opciones: {list(STRING_ENGINES)})")
+    if name == "arrow" and importlib.util.find_spec("pyarrow") is None:
+        raise ImportError("El motor 'arrow' necesita el paquete 'pyarrow' (pip install pyarrow).")
+    _STRING_ENGINE["name"] = name
+
+def get_string_engine() -> str:
+    return _STRING_ENGINE["name"]
+
+# Cambia el motor dentro de un bloque 'with' (p. ej. para comparar rutas en perf.py)
+@contextmanager
+def string_engine(name: str):
+    previous = get_string_engine()
+    set_string_engine(name)
+    try:
+        yield
+    finally:
+        _STRING_ENGINE["name"] = previous
+
+# Mismo dtype de texto que pandas usa por defecto (str respaldado por Arrow si está disponible)
+def _from_arrow(arr, like: pd.Series) -> pd.Series:
+    dtype = like.dtype if isinstance(like.dtype, pd.StringDtype) else object
+    if dtype is object:
+        return pd.Series(arr.to_numpy(zero_copy_only=False), dtype=object)
+    return pd.Series(pd.array(arr, dtype=dtype))
+
+def _split_explode_arrow(dfx: pd.DataFrame, values: pd.Series, dst: str) -> pd.DataFrame:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    lists = pc.split_pattern(pa.array(values, type=pa.large_string()), ",")
+    parents = pc.list_parent_indices(lists).to_numpy()
+    out = dfx.take(parents).reset_index(drop=True)
+    out[dst] = _from_arrow(pc.list_flatten(lists).cast(pa.string()), values)
+    return out
+
+# values.split(",") explotado en la columna 'dst' (una fila por token, índice 0..n-1)
+def _split_explode(dfx: pd.DataFrame, values: pd.Series, dst: str) -> pd.DataFrame:
+    if _STRING_ENGINE["name"] == "arrow":
+        return _split_explode_arrow(dfx, values, dst)
+    dfx[dst] = values.str.split(",")
+    return dfx.explode(dst, ignore_index=True)
+
+# Colapsa espacios en blanco internos y recorta los bordes
+def _squeeze_spaces(values: pd.Series) -> pd.Series:
+    values = values.astype(str)
+    if _STRING_ENGINE["name"] == "arrow":
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        arr = pc.replace_substring_regex(pa.array(values, type=pa.string()), _WS_RUN, " ")
+        return _from_arrow(pc.utf8_trim(arr, " "), values).set_axis(values.index)
+    return values.str.replace(_WS_RUN, " ", regex=True).str.strip(" ")
+
 def expand_and_normalize_countries(df: pd.DataFrame) -> pd.DataFrame:
     dfx = df.copy()
     dfx["country"] = dfx["country"].fillna("").astype(str)
-    dfx["country_tokens"] = dfx["country"].str.split(",")
-    dfx = dfx.explode("country_tokens", ignore_index=True)
-    dfx["country_final"] = (
-        dfx["country_tokens"]
-        .map(lambda x: _clean_country_token(x) if isinstance(x, str) else "")
-        .map(lambda x: COUNTRY_ALIASES.get(x, x))
-        .map(_canon_country)
-    )
+    dfx = _split_explode(dfx, dfx["country"], "country_tokens")
+    dfx["country_final"] = _map_with_cache(dfx["country_tokens"], "country", canonical_country_token)
     dfx = dfx[dfx["country_final"] != ""].copy()
     return dfx
 
@@ -161,31 +262,31 @@ RATING_ALIASES = {
     "TV Y7 FV": "TV-Y7-FV","PG 13": "PG-13","NC 17": "NC-17","UR": "NR","NR.": "NR"
 }
 
+def normalize_rating_token(tok: str) -> str:
+    t = str(tok).strip()
+    t = re.sub(r"\s+", " ", t).upper().replace(".", "")
+    t = t.replace(" TV ", " TV-").replace(" Y7 FV", "-Y7-FV").replace(" Y7", "-Y7")
+    t = RATING_ALIASES.get(t, t)
+    t = (t.replace("TV MA", "TV-MA").replace("TV 14", "TV-14").replace("TV PG", "TV-PG")
+           .replace("TV G", "TV-G").replace("TV Y", "TV-Y").replace("TV Y7", "TV-Y7")
+           .replace("PG 13", "PG-13").replace("NC 17", "NC-17"))
+    t = re.sub(r"-{2,}", "-", t)
+    return t
+
 def normalize_and_explode_ratings(df: pd.DataFrame) -> pd.DataFrame:
     dfx = df.copy()
     dfx = dfx.dropna(subset=["rating"])
-    dfx["rating_tokens"] = dfx["rating"].astype(str).str.split(",")
-    dfx = dfx.explode("rating_tokens", ignore_index=True)
-
-    def _norm(tok: str) -> str:
-        t = str(tok).strip()
-        t = re.sub(r"\s+", " ", t).upper().replace(".", "")
-        t = t.replace(" TV ", " TV-").replace(" Y7 FV", "-Y7-FV").replace(" Y7", "-Y7")
-        t = RATING_ALIASES.get(t, t)
-        t = (t.replace("TV MA", "TV-MA").replace("TV 14", "TV-14").replace("TV PG", "TV-PG")
-               .replace("TV G", "TV-G").replace("TV Y", "TV-Y").replace("TV Y7", "TV-Y7")
-               .replace("PG 13", "PG-13").replace("NC 17", "NC-17"))
-        t = re.sub(r"-{2,}", "-", t)
-        return t
-
-    dfx["rating_norm"] = dfx["rating_tokens"].map(_norm)
+    dfx = _split_explode(dfx, dfx["rating"].astype(str), "rating_tokens")
+    dfx["rating_norm"] = _map_with_cache(dfx["rating_tokens"], "rating", normalize_rating_token)
     dfx = dfx[dfx["rating_norm"] != ""].copy()
     return dfx
 
 # ---------------- Fechas ----------------
 def ensure_datetime(df: pd.DataFrame, col: str = "date_added") -> pd.DataFrame:
     dfx = df.copy()
-    dfx[col] = pd.to_datetime(dfx[col], errors="coerce")
+    # si ya viene como datetime (p. ej. validado por utils.schema) no se vuelve a parsear
+    if not pd.api.types.is_datetime64_any_dtype(dfx[col]):
+        dfx[col] = pd.to_datetime(dfx[col], errors="coerce")
     return dfx
 
 def add_year_and_month(df: pd.DataFrame, date_col: str = "date_added") -> pd.DataFrame:
@@ -198,9 +299,8 @@ def add_year_and_month(df: pd.DataFrame, date_col: str = "date_added") -> pd.Dat
 def explode_listed_in(df: pd.DataFrame) -> pd.DataFrame:
     dfx = df.copy()
     dfx = dfx.dropna(subset=["listed_in"])
-    dfx["listed_in"] = dfx["listed_in"].astype(str).str.split(",")
-    dfx = dfx.explode("listed_in", ignore_index=True)
-    dfx["listed_in"] = dfx["listed_in"].astype(str).str.replace(r"\s+", " ", regex=True).str.strip().str.title()
+    dfx = _split_explode(dfx, dfx["listed_in"].astype(str), "listed_in")
+    dfx["listed_in"] = _squeeze_spaces(dfx["listed_in"]).str.title()
     dfx = dfx[dfx["listed_in"] != ""]
     return dfx
 
@@ -208,14 +308,8 @@ def explode_listed_in(df: pd.DataFrame) -> pd.DataFrame:
 def expand_and_normalize_directors(df: pd.DataFrame) -> pd.DataFrame:
     dfx = df.copy()
     dfx["director"] = dfx["director"].fillna("").astype(str)
-    dfx["director_tokens"] = dfx["director"].str.split(",")
-    dfx = dfx.explode("director_tokens", ignore_index=True)
-    dfx["director_final"] = (
-        dfx["director_tokens"]
-        .astype(str)
-        .str.replace(r"\s+", " ", regex=True)
-        .str.strip()
-    )
+    dfx = _split_explode(dfx, dfx["director"], "director_tokens")
+    dfx["director_final"] = _squeeze_spaces(dfx["director_tokens"])
     dfx = dfx[dfx["director_final"] != ""].copy()
     return dfx
 
@@ -256,14 +350,8 @@ def expand_and_normalize_cast(df: pd.DataFrame) -> pd.DataFrame:
 
     dfx = df.copy()
     dfx["cast"] = dfx["cast"].fillna("").astype(str)
-    dfx["cast_tokens"] = dfx["cast"].str.split(",")
-    dfx = dfx.explode("cast_tokens", ignore_index=True)
-    dfx["cast_final"] = (
-        dfx["cast_tokens"]
-        .astype(str)
-        .str.replace(r"\s+", " ", regex=True)
-        .str.strip()
-    )
+    dfx = _split_explode(dfx, dfx["cast"], "cast_tokens")
+    dfx["cast_final"] = _squeeze_spaces(dfx["cast_tokens"])
     dfx = dfx[dfx["cast_final"] != ""].copy()
     return dfx
 
@@ -315,10 +403,17 @@ def normalize_to_words_en(text: str, min_len: int = 3) -> list[str]:
     out = [t for t in tokens if len(t) >= min_len and t not in ENGLISH_STOPWORDS]
     return out
 
-def count_top_words(series: pd.Series, topn: int = 20, min_len: int = 3) -> pd.Series:
+def count_words(series: pd.Series, min_len: int = 3) -> collections.Counter:
     counter = collections.Counter()
     for txt in series.dropna().astype(str):
         counter.update(normalize_to_words_en(txt, min_len=min_len))
+    return counter
+
+def count_top_words(series: pd.Series, topn: int = 20, min_len: int = 3) -> pd.Series:
+    return top_words(count_words(series, min_len=min_len), topn=topn)
+
+# Top-N de un Counter ya armado (p. ej. la suma de los Counters de cada shard)
+def top_words(counter: collections.Counter, topn: int = 20) -> pd.Series:
     if not counter:
         return pd.Series(dtype=int)
     most_common = counter.most_common(topn)
@@ -0,0 +1,150 @@
+# Detección de casi-duplicados (re-lanzamientos regionales, especiales re-listados) con MinHash + LSH
+#
+# 1. Shingles: title + description pasan por el tokenizador de q10 (cl.normalize_to_words_en);
+#    cada par de palabras consecutivas es un shingle (un título de una sola palabra usa la palabra).
+#    Las palabras se hashean con pd.util.hash_array (estable entre procesos) y los bigramas se
+#    combinan con aritmética uint64, todo vectorizado.
+# 2. MinHash: num_perm funciones hash (a * x + b) >> 32 (multiply-shift); la firma de cada título
+#    es el mínimo por función sobre sus shingles (np.minimum.reduceat), por lotes de filas para
+#    acotar la matriz shingles × funciones.
+# 3. LSH: la firma se corta en 'bands' bandas; dos títulos que coinciden en una banda entera son
+#    candidatos. Por banda se ordenan las claves y solo se comparan vecinos con la misma clave
+#    (cadena, no todos los pares del bucket), así el costo es O(n log n) y no cuadrático.
+# 4. Cada par candidato se verifica con la similitud estimada (fracción de funciones que
+#    coinciden, ≈ Jaccard) y los pares verificados se unen en clusters (componentes conexas).
+#
+# Con bands × rows = num_perm, la probabilidad de ser candidato a similitud s es
+# 1 - (1 - s^rows)^bands: con 64 = 16 × 4 un par con s = 0.7 es candidato el 99% de las veces
+# (la verificación con THRESHOLD descarta los que no llegan).
+# Memoria: la firma ocupa num_perm × 4 bytes por título (256 B con 64 funciones).
+
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+from utils import cleaning as cl
+
+NUM_PERM = 64
+BANDS = 16
+THRESHOLD = 0.7
+BATCH = 4096
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+_EMPTY = np.iinfo(np.uint32).max
+
+
+# (fila, hash uint64) de los shingles de cada texto; filas sin palabras no aportan shingles
+def shingle_hashes(texts) -> tuple:
+    tokens = [cl.normalize_to_words_en(t) for t in texts]
+    lens = np.fromiter((len(t) for t in tokens), dtype=np.int64, count=len(tokens))
+    if lens.sum() == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint64)
+    words = pd.util.hash_array(np.fromiter((w for t in tokens for w in t), dtype=object, count=int(lens.sum())))
+    row = np.repeat(np.arange(len(tokens)), lens)
+
+    same = row[1:] == row[:-1]
+    bigrams = (words[:-1][same] * _MIX) ^ words[1:][same]
+    single = lens[row] == 1
+    rows = np.concatenate([row[:-1][same], row[single]])
+    hashes = np.concatenate([bigrams, words[single]])
+    order = np.argsort(rows, kind="stable")
+    return rows[order], hashes[order]
+
+
+def _hash_params(num_perm: int, seed: int) -> tuple:
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+# Firmas MinHash uint32 (n × num_perm); los textos sin shingles quedan con la firma vacía
+def minhash_signatures(texts: pd.Series, num_perm: int = NUM_PERM, seed: int = 0, batch: int = BATCH) -> np.ndarray:
+    a, b = _hash_params(num_perm, seed)
+    texts = list(texts)
+    sig = np.full((len(texts), num_perm), _EMPTY, dtype=np.uint32)
+    for start in range(0, len(texts), batch):
+        rows, hashes = shingle_hashes(texts[start:start + batch])
+        if rows.size == 0:
+            continue
+        values = ((hashes[:, None] * a[None, :] + b[None, :]) >> np.uint64(32)).astype(np.uint32)
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        sig[start + rows[starts]] = np.minimum.reduceat(values, starts, axis=0)
+    return sig
+
+
+# Fracción de funciones en las que coinciden las firmas de cada par (≈ Jaccard de los shingles)
+def signature_similarity(sig: np.ndarray, i: np.ndarray, j: np.ndarray, batch: int = 1 << 16) -> np.ndarray:
+    out = np.empty(len(i), dtype=float)
+    for start in range(0, len(i), batch):
+        sl = slice(start, start + batch)
+        out[sl] = (sig[i[sl]] == sig[j[sl]]).mean(axis=1)
+    return out
+
+
+# Pares candidatos (i < j) que coinciden en al menos una banda (y en el bloque, si se da)
+def lsh_candidates(sig: np.ndarray, bands: int = BANDS, block=None) -> tuple:
+    n, num_perm = sig.shape
+    if num_perm % bands:
+        raise ValueError(f"num_perm ({num_perm}) debe ser múltiplo de bands ({bands}).")
+    rows_per_band = num_perm // bands
+    valid = np.flatnonzero(sig[:, 0] != _EMPTY)
+    block = np.zeros(n, dtype=np.uint64) if block is None else np.asarray(block).astype(np.uint64)
+
+    pairs = []
+    for band in range(bands):
+        cols = sig[valid, band * rows_per_band:(band + 1) * rows_per_band].astype(np.uint64)
+        key = block[valid] * _MIX
+        for c in range(rows_per_band):
+            key = (key ^ cols[:, c]) * _MIX
+        order = np.argsort(key, kind="stable")
+        k = key[order]
+        same = np.flatnonzero(k[1:] == k[:-1])
+        pairs.append(valid[order[same]] * n + valid[order[same + 1]])
+    if not pairs:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    code = np.unique(np.concatenate(pairs))
+    return code // n, code % n
+
+
+# Un cluster por grupo de casi-duplicados. Devuelve, alineado con df:
+# cluster (-1 si no tiene duplicados), tamano_cluster, canonica (primera fila del cluster) y
+# similitud (estimada contra la fila canónica)
+def near_duplicates(df: pd.DataFrame, threshold: float = THRESHOLD, num_perm: int = NUM_PERM,
+                    bands: int = BANDS, seed: int = 0, block_col: str | None = "type") -> pd.DataFrame:
+    for col in ("title", "description"):
+        if col not in df.columns:
+            raise ValueError(f"La deduplicación necesita la columna '{col}'.")
+    n = len(df)
+    texts = df["title"].fillna("").astype(str) + " " + df["description"].fillna("").astype(str)
+    sig = minhash_signatures(texts, num_perm=num_perm, seed=seed)
+
+    block = None
+    if block_col is not None and block_col in df.columns:
+        block, _ = pd.factorize(df[block_col].astype(str).str.strip())
+    i, j = lsh_candidates(sig, bands=bands, block=block)
+    keep = signature_similarity(sig, i, j) >= threshold
+    i, j = i[keep], j[keep]
+
+    graph = sp.coo_matrix((np.ones(len(i), dtype=np.int8), (i, j)), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    sizes = np.bincount(labels, minlength=labels.max() + 1 if n else 0)
+    dup = sizes[labels] > 1 if n else np.zeros(0, dtype=bool)
+
+    first = np.full(len(sizes), n, dtype=np.int64)
+    np.minimum.at(first, labels, np.arange(n))
+    canon = first[labels]
+    cluster = np.full(n, -1, dtype=np.int64)
+    cluster[dup] = pd.factorize(canon[dup])[0]
+    return pd.DataFrame({
+        "cluster": cluster,
+        "tamano_cluster": np.where(dup, sizes[labels], 1),
+        "canonica": ~dup | (canon == np.arange(n)),
+        "similitud": np.where(dup, signature_similarity(sig, canon, np.arange(n)), np.nan),
+    }, index=df.index)
+
+
+# Deja solo la fila canónica de cada cluster
+def collapse(df: pd.DataFrame, dups: pd.DataFrame) -> pd.DataFrame:
+    return df[dups["canonica"].to_numpy()].reset_index(drop=True)
@@ -0,0 +1,202 @@
+# Tablas derivadas compartidas entre preguntas
+#
+# Cada tabla tiene un nombre, las tablas de las que depende ("raw" = DataFrame original) y la
+# función que la construye a partir de utils.cleaning. Las preguntas piden sus tablas con
+# get(nombre, df, tables): si el dict 'tables' ya la tiene (la armó el scheduler u otra pregunta)
+# se reutiliza; si no, se construye en el momento.
+#
+# Las tablas devueltas son compartidas: las preguntas no deben modificarlas in place
+# (usar .assign / .copy() para agregar columnas).
+#
+# Cada builder recibe solo las columnas de df que declara (y las explosiones de ratings toman
+# 'rating' por title_id), así una tabla lleva title_id + sus columnas de entrada + las derivadas
+# y nada más: el caché de watch se invalida por esas columnas declaradas. Lo que una pregunta
+# necesite además del df (type, title, ...) lo toma con with_source.
+
+from __future__ import annotations
+import weakref
+from functools import partial
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils import cleaning as cl
+
+
+RAW = "raw"
+
+
+def _strip_type(dfx: pd.DataFrame) -> pd.DataFrame:
+    dfx["type"] = dfx["type"].astype(str).str.strip()
+    return dfx
+
+def _build_ratings(df: pd.DataFrame) -> pd.DataFrame:
+    dfx = df.assign(title_id=np.arange(len(df), dtype=np.int64)).dropna(subset=["rating", "type"]).copy()
+    dfx["type"] = dfx["type"].astype(str).str.strip()
+    return cl.normalize_and_explode_ratings(dfx)
+
+def _build_seasonality(df: pd.DataFrame) -> pd.DataFrame:
+    dfx = cl.ensure_datetime(df.assign(title_id=np.arange(len(df), dtype=np.int64)), "date_added")
+    dfx = dfx.dropna(subset=["date_added", "listed_in"]).copy()
+    dfx["mes"] = dfx["date_added"].dt.month
+    return cl.explode_listed_in(dfx)
+
+def _build_directors_genres(df: pd.DataFrame) -> pd.DataFrame:
+    dfx = cl.explode_listed_in(df.assign(title_id=np.arange(len(df), dtype=np.int64)))
+    dfx = cl.add_genre_from_listed_in(dfx)
+    return cl.expand_and_normalize_directors(dfx)
+
+# 'title_id' = posición del título en df, para poder cruzar elenco/directores/países entre explosiones
+def _build_cast(df: pd.DataFrame) -> pd.DataFrame:
+    dfx = df.assign(title_id=np.arange(len(df), dtype=np.int64))
+    return _strip_type(cl.expand_and_normalize_cast(dfx))
+
+def _build_countries(df: pd.DataFrame) -> pd.DataFrame:
+    dfx = df.assign(title_id=np.arange(len(df), dtype=np.int64))
+    return cl.expand_and_normalize_countries(dfx)
+
+# Un género canónico por (título, género); solo title_id + géneros, para cruzar por title_id
+def _build_genres(df: pd.DataFrame) -> pd.DataFrame:
+    dfx = df[["listed_in"]].assign(title_id=np.arange(len(df), dtype=np.int64))
+    dfx = cl.add_genre_from_listed_in(cl.explode_listed_in(dfx))
+    return dfx.drop_duplicates(subset=["title_id", "genre_main"], ignore_index=True)
+
+def _build_directors(df: pd.DataFrame) -> pd.DataFrame:
+    dfx = df.assign(title_id=np.arange(len(df), dtype=np.int64))
+    return _strip_type(cl.expand_and_normalize_directors(dfx))
+
+# Explosión de ratings de una tabla por título ('rating' de df por title_id)
+def _explode_ratings(table: pd.DataFrame, df: pd.DataFrame) -> pd.DataFrame:
+    return cl.normalize_and_explode_ratings(with_source(table, df, "rating"))
+
+
+# nombre -> (dependencias, builder, columnas de df que usa)
+TABLES: Dict[str, Tuple[Tuple[str, ...], Callable, Tuple[str, ...]]] = {
+    "dates":             ((RAW,), cl.add_year_and_month, ("date_added",)),
+    "countries":         ((RAW,), _build_countries, ("country",)),
+    "countries_ratings": (("countries", RAW), _explode_ratings, ("rating",)),
+    "ratings":           ((RAW,), _build_ratings, ("rating", "type")),
+    "seasonality":       ((RAW,), _build_seasonality, ("date_added", "listed_in")),
+    "genres":            ((RAW,), _build_genres, ("listed_in",)),
+    "directors":         ((RAW,), _build_directors, ("director", "type")),
+    "directors_ratings": (("directors", RAW), _explode_ratings, ("rating",)),
+    "directors_genres":  ((RAW,), _build_directors_genres, ("listed_in", "director")),
+    "cast":              ((RAW,), _build_cast, ("cast", "type")),
+    "cast_ratings":      (("cast", RAW), _explode_ratings, ("rating",)),
+    "durations":         ((RAW,), cl.normalize_duration, ("type", "duration")),
+}
+
+
+def deps(name: str) -> Tuple[str, ...]:
+    return tuple(d for d in TABLES[name][0] if d != RAW)
+
+# Cierre transitivo de tablas necesarias (dependencias primero)
+def closure(names) -> list:
+    out = []
+    def visit(n):
+        if n in out:
+            return
+        for d in deps(n):
+            visit(d)
+        out.append(n)
+    for n in names:
+        visit(n)
+    return out
+
+
+def build(name: str, df: pd.DataFrame, inputs: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    dep_names, builder, cols = TABLES[name]
+    raw = df[[c for c in cols if c in df.columns]]
+    args = [raw if d == RAW else inputs[d] for d in dep_names]
+    return builder(*args)
+
+
+# 'table' con columnas de df agregadas: por title_id en las explosiones, por índice en las
+# tablas alineadas con df (dates, durations)
+def with_source(table: pd.DataFrame, df: pd.DataFrame, cols) -> pd.DataFrame:
+    cols = [cols] if isinstance(cols, str) else list(cols)
+    if "title_id" in table.columns:
+        ids = table["title_id"].to_numpy()
+        return table.assign(**{c: df[c].array.take(ids) for c in cols})
+    return table.assign(**{c: df[c] for c in cols})
+
+
+def get(name: str, df: pd.DataFrame, tables: Dict[str, pd.DataFrame] | None = None) -> pd.DataFrame:
+    if name not in TABLES:
+        raise KeyError(f"Tabla derivada desconocida: '{name}'")
+    if tables is not None and name in tables:
+        return tables[name]
+    inputs = {d: get(d, df, tables) for d in deps(name)}
+    out = build(name, df, inputs)
+    if tables is not None:
+        tables[name] = out
+    return out
+
+
+# ---------------- Recortes por máscara de filas ----------------
+# Las explosiones llevan 'title_id' (posición del título en df) y dates / durations conservan el
+# índice de df: las dos se pueden recortar a un subconjunto de títulos con un filtro booleano,
+# sin volver a correr el cleaning. Los title_id se renumeran a posiciones dentro del recorte,
+# igual que si la tabla se hubiera construido sobre df[mask].
+
+def _restrict_table(table: pd.DataFrame, df: pd.DataFrame, mask: np.ndarray, new_ids: np.ndarray):
+    if "title_id" in table.columns:
+        ids = table["title_id"].to_numpy()
+        keep = mask[ids]
+        out = table[keep].reset_index(drop=True)
+        out["title_id"] = new_ids[ids[keep]]
+        return out
+    if df.index.is_unique:
+        pos = df.index.get_indexer(table.index)
+        if (pos >= 0).all():
+            return table[mask[pos]]
+    return None
+
+
+# Tablas derivadas de df[mask], recortadas de las de df ('tables', que se completa si falta alguna).
+# dv.get la trata como un dict que ya tiene todas las tablas: cada una se recorta al pedirla.
+class MaskedTables(dict):
+    def __init__(self, df: pd.DataFrame, tables: Dict[str, pd.DataFrame] | None, mask: np.ndarray):
+        super().__init__()
+        self._df = df
+        self._tables = {} if tables is None else tables
+        self._mask = mask
+        self._new_ids = np.cumsum(mask, dtype=np.int64) - 1
+
+    def __contains__(self, name) -> bool:
+        return name in TABLES
+
+    def __missing__(self, name: str) -> pd.DataFrame:
+        out = _restrict_table(get(name, self._df, self._tables), self._df, self._mask, self._new_ids)
+        if out is None:
+            # sin title_id ni índice alineado con df: se construye sobre el recorte
+            out = build(name, self._df[self._mask], {d: self[d] for d in deps(name)})
+        self[name] = out
+        return out
+
+
+# (df[mask] con 'columns', tablas del recorte) para qN.run(mask=...). Sin máscara devuelve df y
+# 'tables' tal cual (un dict nuevo si es None)
+def restrict(df: pd.DataFrame, tables: Dict[str, pd.DataFrame] | None, mask, columns=None) -> tuple:
+    if mask is None:
+        return df, ({} if tables is None else tables)
+    mask = np.asarray(mask, dtype=bool)
+    if mask.shape != (len(df),):
+        raise ValueError(f"La máscara tiene {mask.size} valores y el DataFrame {len(df)} filas.")
+    cols = df.columns if columns is None else [c for c in columns if c in df.columns]
+    return df.loc[mask, cols], MaskedTables(df, tables, mask)
+
+
+def _rebuild(fn: Callable, df: pd.DataFrame, refs, mask, columns, args: tuple, kwargs: dict):
+    sub, tables = restrict(df, dict(refs), mask, columns)
+    return fn(sub, *args, tables=tables, **kwargs)
+
+# Reconstrucción diferida de un frame por fila (claves perezosas de utils.results.Result):
+# fn(df[mask], *args, tables=..., **kwargs). Guarda df de origen y la máscara, no el recorte, y
+# referencias débiles a las tablas de 'tables' (lo que devolvió restrict): mientras sigan vivas
+# (caché de watch, otra pregunta) se reutilizan; si el scheduler ya las liberó, se reconstruyen.
+def deferred(fn: Callable, df: pd.DataFrame, tables, mask, columns, *args, **kwargs) -> Callable:
+    source = tables._tables if isinstance(tables, MaskedTables) else (tables or {})
+    refs = weakref.WeakValueDictionary(source)
+    return partial(_rebuild, fn, df, refs, mask, columns, args, kwargs)
@@ -0,0 +1,76 @@
+# Dataset sintético con el esquema de netflix.csv, determinista por semilla
+#
+# Pensado para benchmarks y pruebas de carga: mismos tipos de valores sucios que el CSV real
+# (alias de países, ratings mal cargados, fechas faltantes, temporadas con/sin "s"), en
+# proporciones fijas para que dos corridas con la misma semilla den exactamente los mismos datos.
+
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+_COUNTRIES = [
+    "United States", "India", "United Kingdom", "Usa", "Japan", "South Korea", "Spain", "France ",
+    "Canada", "Mexico", "Germany", "Argentina", "Brazil", "Turkey", "Egypt", "Nigeria", "Reino Unido",
+    "Italy", "Australia", "Colombia", "Chile", "Peru", "Poland", "Sweden", "Norway", "Denmark",
+    "Belgium", "Netherlands", "Ireland", "Israel", "Thailand", "Philippines", "Unitd States",
+]
+_RATINGS = ["TV-MA", "TV-14", "TV-PG", "R", "PG-13", "PG", "TV-Y7", "TV-Y", "TV-G", "NR", "G", "TV MA", "NC-17", "74 min"]
+_GENRES = [
+    "Dramas", "Comedies", "International Movies", "TV Dramas", "Documentaries", "Action & Adventure",
+    "Kids' TV", "Crime TV Shows", "Horror Movies", "Thrillers", "Romantic Movies", "Stand-Up Comedy",
+    "Anime Series", "Reality TV", "Docuseries", "International TV Shows", "Sci-Fi & Fantasy",
+]
+_WORDS = ("love family war secret life young woman man world city story dark journey friends death truth "
+          "power mystery school dream night home lost king queen").split()
+_MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August",
+           "September", "October", "November", "December"]
+
+
+# Lista separada por comas con entre lo y hi elementos distintos de 'vocab' por fila
+def _multi(rng: np.random.Generator, vocab, n: int, lo: int, hi: int) -> list:
+    vocab = np.asarray(vocab, dtype=object)
+    sizes = rng.integers(lo, hi + 1, size=n)
+    return [", ".join(vocab[rng.choice(len(vocab), size=k, replace=False)]) for k in sizes]
+
+
+def make_netflix_like(n_rows: int = 3000, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    n = n_rows
+    is_movie = rng.random(n) < 0.7
+
+    minutes = rng.integers(60, 181, size=n)
+    seasons = rng.integers(1, 9, size=n)
+    plural = np.where(rng.random(n) < 0.6, "s", "")
+    duration = np.where(is_movie, [f"{m} min" for m in minutes], [f"{s} Season{p}" for s, p in zip(seasons, plural)])
+    duration[rng.random(n) < 0.01] = ""
+
+    release = rng.integers(1980, 2022, size=n)
+    year_added = np.maximum(release, 2008) + (rng.random(n) * (2022 - np.maximum(release, 2008))).astype(int)
+    date_added = np.array([f"{_MONTHS[m]} {d:02d}, {y}" for m, d, y in
+                           zip(rng.integers(0, 12, size=n), rng.integers(1, 29, size=n), year_added)], dtype=object)
+    date_added[rng.random(n) < 0.02] = None
+
+    actors = [f"Actor {i}" for i in range(max(50, n // 3))]
+    directors = [f"Director {i}" for i in range(max(20, n // 10))]
+
+    def with_nulls(values: list, p: float) -> np.ndarray:
+        arr = np.asarray(values, dtype=object)
+        arr[rng.random(n) < p] = None
+        return arr
+
+    ratings = np.asarray(_RATINGS, dtype=object)[rng.integers(0, len(_RATINGS), size=n)]
+    return pd.DataFrame({
+        "show_id": [f"s{i + 1}" for i in range(n)],
+        "type": np.where(is_movie, "Movie", "TV Show"),
+        "title": [s.title() for s in _multi(rng, _WORDS, n, 1, 3)],
+        "director": with_nulls(_multi(rng, directors, n, 1, 2), 0.3),
+        "cast": with_nulls(_multi(rng, actors, n, 1, 8), 0.1),
+        "country": with_nulls(_multi(rng, _COUNTRIES, n, 1, 3), 0.1),
+        "date_added": date_added,
+        "release_year": release,
+        "rating": with_nulls(list(ratings), 0.01),
+        "duration": duration,
+        "listed_in": _multi(rng, _GENRES, n, 1, 3),
+        "description": [" ".join(np.asarray(_WORDS)[rng.integers(0, len(_WORDS), size=k)]) + "."
+                        for k in rng.integers(8, 21, size=n)],
+    })
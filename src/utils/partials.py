@@ -0,0 +1,50 @@
+# Agregados parciales por bloque de filas y su merge, para el map-reduce por shards (mapreduce.py)
+#
+# Cada pregunta que admite shards expone map_partials(df, tables) -> dict (sus agregados sobre un
+# bloque contiguo de filas) y merge_partials(parts) -> dict (la combinación, en orden de shard).
+# Los parciales son conteos, así que el merge es una suma exacta (asociativa):
+# - tallies: Series de conteos indexada por una o más claves (groupby(sort=False).size())
+# - Counters de palabras
+# Ambos conservan el orden de primera aparición: sumar los shards en orden da el mismo orden que
+# contar el catálogo entero de una vez, así los desempates (value_counts, most_common) no cambian.
+
+from __future__ import annotations
+import collections
+
+import numpy as np
+import pandas as pd
+
+
+# Conteo de filas por combinación de 'cols', en orden de primera aparición (sin NaN, como value_counts)
+def tally(df: pd.DataFrame, cols) -> pd.Series:
+    cols = [cols] if isinstance(cols, str) else list(cols)
+    return df.groupby(cols, sort=False).size()
+
+
+def merge_tallies(parts) -> pd.Series:
+    parts = list(parts)
+    non_empty = [p for p in parts if len(p)]
+    if len(non_empty) <= 1:
+        return non_empty[0] if non_empty else parts[0]
+    merged = pd.concat(non_empty)
+    return merged.groupby(level=list(range(merged.index.nlevels)), sort=False).sum()
+
+
+def merge_counters(parts) -> collections.Counter:
+    total = collections.Counter()
+    for counter in parts:
+        total.update(counter)
+    return total
+
+
+# Mismo orden que value_counts(): conteo desc, empates en orden de primera aparición
+def tally_to_value_counts(t: pd.Series) -> pd.Series:
+    return t.rename("count").sort_values(ascending=False, kind="stable")
+
+
+# Límites [inicio, fin) de 'shards' bloques contiguos de tamaño parejo sobre n filas
+def shard_bounds(n: int, shards: int) -> list:
+    if shards < 1:
+        raise ValueError(f"La cantidad de shards debe ser al menos 1: {shards}")
+    edges = np.linspace(0, n, min(shards, max(n, 1)) + 1).astype(np.int64)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:])]
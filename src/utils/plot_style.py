@@ -1,5 +1,22 @@
 # Utilidades de estilo para los gráficos 
+#
+# Dos formas de dibujar:
+# - pyplot (plt.figure + apply_netflix_style + add_source_note + save_figure): usa la figura
+#   "actual" global, así que no sirve desde varios hilos.
+# - capa orientada a objetos (FigureTemplate): Figure + FigureCanvasAgg explícitos, sin pyplot.
+#   Cada hilo guarda una figura por plantilla y la limpia (fig.clear) en lugar de crear otra;
+#   render_many dibuja varios gráficos en paralelo en un pool de hilos.
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Optional
+
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 
 # Paleta Netflix 
 COLOR_BG = "#f5f5f1"
@@ -7,17 +24,117 @@ COLOR_MOVIE = "#e50914"
 COLOR_MOVIE_ALT = "#b20710"
 COLOR_TV = "#221f1f"
 
+# Destino de las figuras: None = savefig directo a disco; si no, callable(outpath, bytes)
+_FIGURE_SINK = None
+# Sink especial: no renderiza ni escribe (modos preview que solo necesitan las tablas)
+_SKIP = object()
+
+SOURCE_NOTE = "Fuente: Netflix dataset. Elaboración propia"
+
+# Sin 'ax' usa los ejes actuales de pyplot; con 'ax' solo toca ese eje y su figura
 def apply_netflix_style(ax=None):  
     if ax is None:
         ax = plt.gca()
     ax.set_facecolor(COLOR_BG)
-    plt.gcf().set_facecolor(COLOR_BG)
+    ax.figure.set_facecolor(COLOR_BG)
     ax.grid(alpha=0.3, linestyle="--", axis="y")
     return ax
 
-def add_source_note(text: str = "Fuente: Netflix dataset. Elaboración propia"):    
-    plt.figtext(
+def add_source_note(text: str = SOURCE_NOTE, fig=None):    
+    figtext = plt.figtext if fig is None else fig.text
+    figtext(
         0.99, 0.01, text,
         ha="right", va="bottom",
         fontsize=8, color=COLOR_TV, alpha=0.7
     )
+
+# Reemplazo de plt.savefig: guarda la figura (la actual de pyplot si no se pasa 'fig') en disco o,
+# si hay un sink activo, la renderiza a un buffer en memoria y le entrega los bytes
+def save_figure(outpath: str, fig=None, **kwargs):
+    fig = plt.gcf() if fig is None else fig
+    if _FIGURE_SINK is _SKIP:
+        return
+    if _FIGURE_SINK is None:
+        fig.savefig(outpath, **kwargs)
+        return
+    fmt = os.path.splitext(outpath)[1].lstrip(".") or None
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, **kwargs)
+    _FIGURE_SINK(outpath, buf.getvalue())
+
+@contextmanager
+def figure_sink(sink):
+    global _FIGURE_SINK
+    prev, _FIGURE_SINK = _FIGURE_SINK, sink
+    try:
+        yield
+    finally:
+        _FIGURE_SINK = prev
+
+# Corre el bloque sin renderizar figuras (save_figure no hace nada)
+@contextmanager
+def no_figures():
+    with figure_sink(_SKIP):
+        yield
+
+
+# ---------------- Capa orientada a objetos (thread-safe) ----------------
+_LOCAL = threading.local()
+
+# Plantilla de figura: tamaño, fondo, nota de fuente y parámetros de guardado
+@dataclass(frozen=True)
+class FigureTemplate:
+    figsize: tuple = (10, 6)
+    facecolor: str = COLOR_BG
+    source_note: Optional[str] = SOURCE_NOTE
+    dpi: int = 220
+    tight: bool = True
+
+    # Figura + eje con estilo. Reutiliza la figura de esta plantilla en el hilo actual (limpia)
+    def figure(self):
+        pool = _LOCAL.__dict__.setdefault("figures", {})
+        fig = pool.get(self)
+        if fig is None:
+            fig = Figure(figsize=self.figsize, facecolor=self.facecolor)
+            FigureCanvasAgg(fig)
+            pool[self] = fig
+        else:
+            fig.clear()
+            fig.set_size_inches(self.figsize)
+        ax = apply_netflix_style(fig.add_subplot())
+        return fig, ax
+
+    # draw(fig, ax) dibuja el contenido; la plantilla agrega la nota, ajusta y guarda
+    def render(self, draw: Callable, outpath: str, **save_kwargs) -> None:
+        if _FIGURE_SINK is _SKIP:
+            return
+        fig, ax = self.figure()
+        try:
+            draw(fig, ax)
+            if self.source_note:
+                add_source_note(self.source_note, fig=fig)
+            if self.tight:
+                fig.tight_layout()
+            save_kwargs.setdefault("dpi", self.dpi)
+            save_kwargs.setdefault("facecolor", self.facecolor)
+            save_figure(outpath, fig=fig, **save_kwargs)
+        finally:
+            fig.clear()  # libera los artistas; la figura queda lista para el próximo gráfico
+
+
+WIDE = FigureTemplate(figsize=(10, 5))
+STANDARD = FigureTemplate(figsize=(10, 6))
+LARGE = FigureTemplate(figsize=(12, 6))
+
+
+# Renderiza varios gráficos en paralelo. jobs: (plantilla, draw, outpath) o (plantilla, draw, outpath, kwargs)
+def render_many(jobs, max_workers: int | None = None) -> None:
+    jobs = list(jobs)
+    if len(jobs) <= 1 or max_workers == 1:
+        for job in jobs:
+            job[0].render(job[1], job[2], **(job[3] if len(job) > 3 else {}))
+        return
+    with ThreadPoolExecutor(max_workers=max_workers or min(len(jobs), os.cpu_count() or 1, 8)) as pool:
+        futures = [pool.submit(job[0].render, job[1], job[2], **(job[3] if len(job) > 3 else {})) for job in jobs]
+        for f in futures:
+            f.result()
@@ -0,0 +1,301 @@
+# Listas de posteo por entidad: valor canónico -> ids de fila ordenados (int32)
+#
+# Para "todos los títulos del director X" o "todo lo de país Y en el género Z" no hace falta
+# volver a correr expand_and_normalize_* ni filtrar la explosión: cada entidad (actor, director,
+# país canónico, género canónico) se guarda como un índice invertido en formato CSR:
+#   vocab    lista ordenada de valores distintos
+#   offsets  int64, n_valores + 1; los ids del valor i son rows[offsets[i]:offsets[i + 1]]
+#   rows     int32, ids de fila (posición en el CSV) ordenados y sin repetir dentro de cada valor
+# Un lookup es un dict + un slice (sin copias); AND / OR se resuelven con merges de arrays
+# ordenados (searchsorted sobre la lista más larga, o sort de runs ya ordenados).
+#
+# Layout en disco (se abre con np.load(mmap_mode="r"), sin parsear nada salvo el vocabulario):
+#   <root>/meta.json                 fuente (ruta, tamaño, mtime) y filas
+#   <root>/<entidad>.offsets.npy
+#   <root>/<entidad>.rows.npy
+#   <root>/<entidad>.vocab.json
+#   <root>/titles.<col>.data.npy     show_id / type / title: bytes UTF-8 concatenados (uint8) ...
+#   <root>/titles.<col>.offsets.npy  ... y offsets int64 (n_filas + 1), como las listas
+#   <root>/titles.release_year.npy   float64 (NaN = faltante)
+# La tabla de títulos va al lado de las listas para que --find muestre los títulos encontrados
+# decodificando solo esas filas, sin volver a leer el CSV.
+# Se escribe completo en un directorio temporal y se publica con rename.
+
+from __future__ import annotations
+import os
+import json
+import uuid
+import shutil
+from dataclasses import dataclass
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from utils import readers
+from utils import store
+
+FORMAT = 2
+META = "meta.json"
+
+# columnas de la tabla de títulos (texto salvo release_year)
+TITLE_COLUMNS = ["show_id", "type", "title", "release_year"]
+_TITLE_NUMERIC = {"release_year"}
+
+# entidad -> tabla de utils.store.DERIVED_TABLES (columnas de entrada, cleaning, columna canónica)
+ENTITIES = {
+    "cast": "cast",
+    "director": "directors",
+    "country": "countries",
+    "genre": "genres",
+}
+
+_EMPTY = np.empty(0, dtype=np.int32)
+
+
+@dataclass(frozen=True)
+class PostingList:
+    name: str
+    vocab: List[str]
+    offsets: np.ndarray   # int64 (memmap al cargar de disco)
+    rows: np.ndarray      # int32 (memmap al cargar de disco)
+    codes: Dict[str, int]
+
+    def __len__(self) -> int:
+        return len(self.vocab)
+
+    def __contains__(self, value) -> bool:
+        return value in self.codes
+
+    # Ids de fila de 'value' (vista, sin copia); vacío si no existe
+    def get(self, value: str) -> np.ndarray:
+        code = self.codes.get(value)
+        if code is None:
+            return _EMPTY
+        return self.rows[self.offsets[code]:self.offsets[code + 1]]
+
+    def any_of(self, values) -> np.ndarray:
+        return union(*(self.get(v) for v in values))
+
+    def all_of(self, values) -> np.ndarray:
+        return intersect(*(self.get(v) for v in values))
+
+    # Cantidad de filas por valor
+    def sizes(self) -> pd.Series:
+        return pd.Series(np.diff(self.offsets), index=pd.Index(self.vocab, name=self.name), name="filas")
+
+
+# Intersección de listas ordenadas sin repetidos: de la más corta a la más larga, cada paso
+# busca los ids de la lista actual en la siguiente (searchsorted, O(a log b))
+def intersect(*lists) -> np.ndarray:
+    if not lists:
+        return _EMPTY
+    lists = sorted(lists, key=len)
+    out = np.asarray(lists[0])
+    for other in lists[1:]:
+        if len(out) == 0:
+            break
+        other = np.asarray(other)
+        pos = np.searchsorted(other, out)
+        pos[pos == len(other)] = 0
+        out = out[other[pos] == out] if len(other) else _EMPTY
+    return np.array(out, dtype=np.int32)
+
+
+# Unión de listas ordenadas: el sort estable (timsort) detecta los runs ya ordenados y los mezcla
+def union(*lists) -> np.ndarray:
+    lists = [np.asarray(x) for x in lists if len(x)]
+    if not lists:
+        return _EMPTY
+    if len(lists) == 1:
+        return np.array(lists[0], dtype=np.int32)
+    merged = np.sort(np.concatenate(lists), kind="stable")
+    return merged[np.r_[True, merged[1:] != merged[:-1]]].astype(np.int32, copy=False)
+
+
+def _make_list(name: str, values: np.ndarray, rows: np.ndarray) -> PostingList:
+    codes, vocab = pd.factorize(pd.Series(values, dtype=object), sort=True)
+    key = np.unique((codes.astype(np.int64) << 32) | rows.astype(np.int64))
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(key >> 32, minlength=len(vocab)), out=offsets[1:])
+    vocab = [str(v) for v in vocab]
+    return PostingList(name, vocab, offsets, (key & 0xFFFFFFFF).astype(np.int32),
+                       {v: i for i, v in enumerate(vocab)})
+
+
+# Listas de posteo de un DataFrame o de un iterable de chunks (ids = posición global de la fila)
+def build_postings(data, entities: Iterable[str] | None = None) -> Dict[str, PostingList]:
+    names = list(entities or ENTITIES)
+    unknown = set(names).difference(ENTITIES)
+    if unknown:
+        raise ValueError(f"Entidades desconocidas: {sorted(unknown)} (opciones: {sorted(ENTITIES)})")
+    frames = [data] if isinstance(data, pd.DataFrame) else data
+
+    values = {n: [] for n in names}
+    rows = {n: [] for n in names}
+    offset = 0
+    for chunk in frames:
+        for name in names:
+            cols, builder, value_col = store.DERIVED_TABLES[ENTITIES[name]]
+            missing = set(cols).difference(chunk.columns)
+            if missing:
+                raise ValueError(f"Faltan columnas para '{name}': {sorted(missing)}")
+            base = chunk[cols].reset_index(drop=True)
+            base["_row"] = np.arange(offset, offset + len(base), dtype=np.int64)
+            out = builder(base)
+            v = out[value_col].to_numpy(dtype=object)
+            ok = pd.notna(v) & (v != "")
+            values[name].append(v[ok])
+            rows[name].append(out["_row"].to_numpy()[ok])
+        offset += len(chunk)
+
+    return {
+        name: _make_list(name,
+                         np.concatenate(values[name]) if values[name] else np.empty(0, dtype=object),
+                         np.concatenate(rows[name]) if rows[name] else np.empty(0, dtype=np.int64))
+        for name in names
+    }
+
+
+def _source_meta(src: str) -> dict:
+    st = os.stat(src)
+    return {"format": FORMAT, "source": os.path.abspath(src), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _save_npy(path: str, arr: np.ndarray) -> None:
+    with open(path, "wb") as fh:
+        np.save(fh, np.ascontiguousarray(arr))
+
+
+# Columnas de texto como bytes concatenados + offsets; faltante = cadena vacía (read_csv ya
+# lee los campos vacíos como NaN, así que se recupera igual)
+def _save_titles(titles: pd.DataFrame, root: str) -> None:
+    for col in TITLE_COLUMNS:
+        if col in _TITLE_NUMERIC:
+            _save_npy(os.path.join(root, f"titles.{col}.npy"),
+                      pd.to_numeric(titles[col], errors="coerce").to_numpy(dtype=np.float64))
+            continue
+        encoded = [v.encode("utf-8") if isinstance(v, str) else b"" for v in titles[col].tolist()]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        _save_npy(os.path.join(root, f"titles.{col}.data.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+        _save_npy(os.path.join(root, f"titles.{col}.offsets.npy"), offsets)
+
+
+def save_postings(postings: Dict[str, PostingList], root: str, meta: dict | None = None,
+                  titles: pd.DataFrame | None = None) -> None:
+    parent = os.path.dirname(os.path.abspath(root))
+    os.makedirs(parent, exist_ok=True)
+    tmp = os.path.join(parent, f".{os.path.basename(root)}.tmp-{uuid.uuid4().hex[:8]}")
+    try:
+        os.makedirs(tmp)
+        for name, pl in postings.items():
+            _save_npy(os.path.join(tmp, f"{name}.offsets.npy"), pl.offsets)
+            _save_npy(os.path.join(tmp, f"{name}.rows.npy"), pl.rows)
+            with open(os.path.join(tmp, f"{name}.vocab.json"), "w", encoding="utf-8") as fh:
+                json.dump(pl.vocab, fh, ensure_ascii=False)
+        extra = {"entities": list(postings)}
+        if titles is not None:
+            _save_titles(titles, tmp)
+            extra["titles"] = TITLE_COLUMNS
+        with open(os.path.join(tmp, META), "w", encoding="utf-8") as fh:
+            json.dump(dict(meta or {"format": FORMAT}, **extra), fh, indent=2)
+
+        old = None
+        if os.path.exists(root):
+            old = os.path.join(parent, f".{os.path.basename(root)}.old-{uuid.uuid4().hex[:8]}")
+            os.rename(root, old)
+        os.rename(tmp, root)
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def read_meta(root: str) -> dict:
+    path = os.path.join(root, META)
+    if not os.path.isfile(path):
+        return {}
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+# Abre las listas guardadas en 'root' (offsets y rows mapeados en memoria, solo lectura)
+def load_postings(root: str, entities: Iterable[str] | None = None) -> Dict[str, PostingList]:
+    meta = read_meta(root)
+    if not meta:
+        raise FileNotFoundError(f"No hay listas de posteo en '{root}'.")
+    if meta.get("format") != FORMAT:
+        raise ValueError(f"Formato de listas de posteo no soportado: {meta.get('format')}")
+    out = {}
+    for name in entities or meta["entities"]:
+        with open(os.path.join(root, f"{name}.vocab.json"), encoding="utf-8") as fh:
+            vocab = json.load(fh)
+        out[name] = PostingList(
+            name=name,
+            vocab=vocab,
+            offsets=np.load(os.path.join(root, f"{name}.offsets.npy"), mmap_mode="r"),
+            rows=np.load(os.path.join(root, f"{name}.rows.npy"), mmap_mode="r"),
+            codes={v: i for i, v in enumerate(vocab)},
+        )
+    return out
+
+
+# Filas 'rows' de la tabla de títulos guardada en 'root' (mmap: solo se decodifican esas filas)
+def load_titles(root: str, rows) -> pd.DataFrame:
+    if read_meta(root).get("titles") != TITLE_COLUMNS:
+        raise FileNotFoundError(f"No hay tabla de títulos en '{root}'.")
+    rows = np.asarray(rows, dtype=np.int64)
+    out = {}
+    for col in TITLE_COLUMNS:
+        if col in _TITLE_NUMERIC:
+            values = np.load(os.path.join(root, f"titles.{col}.npy"), mmap_mode="r")
+            out[col] = pd.array(np.asarray(values[rows]), dtype="Float64").astype("Int64")
+            continue
+        data = np.load(os.path.join(root, f"titles.{col}.data.npy"), mmap_mode="r")
+        offsets = np.load(os.path.join(root, f"titles.{col}.offsets.npy"), mmap_mode="r")
+        text = (bytes(data[offsets[r]:offsets[r + 1]]).decode("utf-8") for r in rows)
+        out[col] = np.array([t or np.nan for t in text], dtype=object)
+    return pd.DataFrame(out, index=rows)
+
+
+# Listas de 'src' guardadas en 'root': se reconstruyen (leyendo por chunks) solo si la fuente cambió.
+# La misma pasada guarda la tabla de títulos (TITLE_COLUMNS)
+def open_postings(src: str, root: str, rebuild: bool = False,
+                  chunksize: int = readers.CHUNKSIZE) -> Dict[str, PostingList]:
+    meta = _source_meta(src)
+    current = read_meta(root)
+    fresh = (all(current.get(k) == v for k, v in meta.items())
+             and set(current.get("entities", ())) == set(ENTITIES)
+             and current.get("titles") == TITLE_COLUMNS)
+    if rebuild or not fresh:
+        cols = sorted({c for t in ENTITIES.values() for c in store.DERIVED_TABLES[t][0]}.union(TITLE_COLUMNS))
+        kept = []
+
+        def chunks():
+            for chunk in readers.iter_chunks(src, chunksize=chunksize, columns=cols):
+                kept.append(chunk[TITLE_COLUMNS].reset_index(drop=True))
+                yield chunk
+
+        postings = build_postings(chunks())
+        titles = pd.concat(kept, ignore_index=True) if kept else pd.DataFrame(columns=TITLE_COLUMNS)
+        save_postings(postings, root, meta, titles)
+        print(f"[postings] Listas de posteo de '{src}' guardadas en '{root}'.")
+    return load_postings(root)
+
+
+# "entidad=valor" repetible -> {entidad: [valores]}; mismo entidad = OR, entidades distintas = AND
+def parse_query(items) -> dict:
+    query = {}
+    for item in items or []:
+        key, sep, value = item.partition("=")
+        key = key.strip().lower()
+        if not sep or key not in ENTITIES or not value.strip():
+            raise ValueError(f"Búsqueda inválida: '{item}' (formato entidad=valor, entidades: {sorted(ENTITIES)})")
+        query.setdefault(key, []).append(value.strip())
+    return query
+
+
+def query_rows(postings: Dict[str, PostingList], query: dict) -> np.ndarray:
+    return intersect(*(postings[key].any_of(values) for key, values in query.items()))
@@ -0,0 +1,109 @@
+# Rankings Top-N con ordenamiento parcial (np.argpartition)
+#
+# En lugar de ordenar todas las entidades con sort_values para quedarse con 20 o 30, se elige
+# el umbral del k-ésimo valor con argpartition (O(n)) y solo se ordenan los candidatos.
+# Desempate determinista: a igual valor gana la etiqueta menor (orden alfabético); todo lo que
+# empata con el k-ésimo entra como candidato, así el corte no depende del orden de entrada.
+#
+# group_top_k resuelve "Top-k por grupo" (p. ej. directores por país) para todos los grupos a la
+# vez sobre códigos factorizados, sin loops por grupo.
+
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+
+# Posiciones de los k mayores de 'values' ya ordenadas (desc, desempate por 'tiebreak' asc)
+def top_k_positions(values: np.ndarray, k: int, tiebreak: np.ndarray | None = None) -> np.ndarray:
+    values = np.asarray(values)
+    n = len(values)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if tiebreak is None:
+        tiebreak = np.arange(n)
+
+    if k < n:
+        kth = values[np.argpartition(values, n - k)[n - k]]
+        cand = np.flatnonzero(values >= kth)
+    else:
+        cand = np.arange(n)
+
+    order = np.lexsort((np.asarray(tiebreak)[cand], -values[cand]))
+    return cand[order[:k]]
+
+
+# Top-k de una Series numérica indexada por etiqueta (desc, desempate por etiqueta)
+def top_k_series(s: pd.Series, k: int) -> pd.Series:
+    if s.empty:
+        return s
+    # el desempate solo se evalúa sobre los candidatos, no sobre todas las etiquetas
+    pos = top_k_positions(s.to_numpy(), k, s.index.astype(str).to_numpy(dtype=object))
+    return s.iloc[pos]
+
+
+# Top-k filas de un DataFrame por una columna (desc, desempate por índice)
+def top_k_frame(df: pd.DataFrame, col: str, k: int) -> pd.DataFrame:
+    if df.empty:
+        return df
+    return df.loc[top_k_series(df[col], k).index]
+
+
+# Conteo de ocurrencias por etiqueta (factorize + bincount) y Top-k, sin groupby + sort completo
+def top_k_counts(labels: pd.Series, k: int) -> pd.Series:
+    codes, uniques = pd.factorize(labels, sort=True)
+    valid = codes >= 0
+    counts = np.bincount(codes[valid], minlength=len(uniques))
+    # factorize(sort=True): el código ya respeta el orden alfabético, sirve como desempate
+    pos = top_k_positions(counts, k)
+    return pd.Series(counts[pos], index=pd.Index(np.asarray(uniques)[pos], name=labels.name), name="count")
+
+
+# Top-k ítems por grupo en una sola pasada vectorizada.
+# group_codes / item_codes: códigos factorizados (>= 0) de cada fila; weights opcional (default 1).
+# Devuelve arrays (grupo, ítem, valor, rank 1..k) ordenados por grupo y rank.
+def group_top_k(group_codes: np.ndarray, item_codes: np.ndarray, k: int,
+                weights: np.ndarray | None = None) -> tuple:
+    group_codes = np.asarray(group_codes, dtype=np.int64)
+    item_codes = np.asarray(item_codes, dtype=np.int64)
+    if len(group_codes) == 0 or k <= 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty, empty
+
+    n_items = int(item_codes.max()) + 1
+    key = group_codes * n_items + item_codes
+    span = (int(group_codes.max()) + 1) * n_items
+    if span <= max(4 * len(key), 1 << 20):
+        # espacio de claves chico: conteo denso directo, sin ordenar filas
+        dense = np.bincount(key, weights=weights, minlength=span)
+        uniq = np.flatnonzero(dense)
+        vals = dense[uniq]
+    else:
+        uniq, inv = np.unique(key, return_inverse=True)
+        vals = np.bincount(inv, weights=weights, minlength=len(uniq))
+    g, it = np.divmod(uniq, n_items)
+
+    # Orden: grupo asc, valor desc, ítem asc -> el rank es la posición dentro del bloque del grupo
+    order = np.lexsort((it, -vals, g))
+    g, it, vals = g[order], it[order], vals[order]
+    starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+    group_start = np.repeat(starts, np.diff(np.r_[starts, len(g)]))
+    rank = np.arange(len(g)) - group_start + 1
+
+    keep = rank <= k
+    if weights is None:
+        vals = vals.astype(np.int64)
+    return g[keep], it[keep], vals[keep], rank[keep]
+
+
+# Versión DataFrame: Top-k de item_col dentro de cada valor de group_col (conteo de filas)
+def group_top_k_frame(df: pd.DataFrame, group_col: str, item_col: str, k: int) -> pd.DataFrame:
+    g_codes, g_names = pd.factorize(df[group_col], sort=True)
+    i_codes, i_names = pd.factorize(df[item_col], sort=True)
+    valid = (g_codes >= 0) & (i_codes >= 0)
+    g, it, vals, rank = group_top_k(g_codes[valid], i_codes[valid], k)
+    return pd.DataFrame({
+        group_col: np.asarray(g_names)[g],
+        item_col: np.asarray(i_names)[it],
+        "count": vals,
+        "rank": rank,
+    })
@@ -0,0 +1,168 @@
+# Lectura del dataset en varios formatos, siempre por chunks
+#
+# El formato se detecta por magic bytes y, si no alcanza, por extensión:
+# - compresión: gzip (.gz), zstd (.zst, requiere el paquete 'zstandard'), bz2, xz
+# - contenedor: CSV, JSON Lines (.jsonl / .ndjson, o primer carácter '{'), SQLite
+# La descompresión es en streaming (pandas abre el archivo comprimido y lee por chunks):
+# nunca se escribe una copia descomprimida a disco.
+#
+# Cada lector es un generador de DataFrames de a lo sumo 'chunksize' filas con las mismas
+# columnas y tipos que pd.read_csv sobre el CSV original, así preguntas y loaders no
+# distinguen el origen. Para agregar un formato alcanza con registrarlo en READERS.
+
+from __future__ import annotations
+import os
+import bz2
+import gzip
+import lzma
+import sqlite3
+import importlib.util
+from typing import Callable, Dict, Iterator
+
+import numpy as np
+import pandas as pd
+
+CHUNKSIZE = 20000
+SQLITE_TABLE = "netflix"
+
+_MAGIC = {
+    b"\x1f\x8b": "gzip",
+    b"\x28\xb5\x2f\xfd": "zstd",
+    b"BZh": "bz2",
+    b"\xfd7zXZ\x00": "xz",
+}
+_SQLITE_MAGIC = b"SQLite format 3\x00"
+_COMPRESSED_EXT = {".gz": "gzip", ".zst": "zstd", ".bz2": "bz2", ".xz": "xz"}
+_TEXT_EXT = {".csv": "csv", ".txt": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".json": "jsonl"}
+
+
+def _open_text_head(path: str, compression: str | None, n: int = 1024) -> bytes:
+    if compression is None:
+        opener = open
+    elif compression == "gzip":
+        opener = gzip.open
+    elif compression == "bz2":
+        opener = bz2.open
+    elif compression == "xz":
+        opener = lzma.open
+    else:
+        import zstandard
+        with open(path, "rb") as raw, zstandard.ZstdDecompressor().stream_reader(raw) as fh:
+            return fh.read(n)
+    with opener(path, "rb") as fh:
+        return fh.read(n)
+
+
+def _require_zstd() -> None:
+    if importlib.util.find_spec("zstandard") is None:
+        raise ImportError("Para leer archivos .zst hace falta el paquete 'zstandard' (pip install zstandard).")
+
+
+# (formato, compresión) de 'path'; formato ∈ READERS
+def detect_format(path: str) -> tuple:
+    with open(path, "rb") as fh:
+        head = fh.read(16)
+    if head.startswith(_SQLITE_MAGIC):
+        return "sqlite", None
+
+    compression = next((c for magic, c in _MAGIC.items() if head.startswith(magic)), None)
+    stem, ext = os.path.splitext(path.lower())
+    if compression is None and ext in _COMPRESSED_EXT:
+        compression = _COMPRESSED_EXT[ext]
+    if ext in _COMPRESSED_EXT:
+        ext = os.path.splitext(stem)[1]
+    if compression == "zstd":
+        _require_zstd()
+
+    if ext in _TEXT_EXT:
+        return _TEXT_EXT[ext], compression
+    text = _open_text_head(path, compression).lstrip()
+    return ("jsonl" if text.startswith(b"{") else "csv"), compression
+
+
+# Mismos tipos que read_csv: texto como string (NaN para faltantes), release_year numérico
+def _like_csv(chunk: pd.DataFrame, columns=None) -> pd.DataFrame:
+    if columns is not None:
+        chunk = chunk[[c for c in chunk.columns if c in set(columns)]]
+    chunk = chunk.copy()
+    for col in chunk.columns:
+        if col == "release_year":
+            chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+            if chunk[col].notna().all():
+                chunk[col] = chunk[col].astype("int64")
+        else:
+            s = chunk[col].astype(object)
+            chunk[col] = s.where(s.notna(), np.nan).infer_objects()
+    return chunk
+
+
+def _read_csv(path: str, compression, chunksize: int, columns) -> Iterator[pd.DataFrame]:
+    usecols = None if columns is None else (lambda c, wanted=set(columns): c in wanted)
+    with pd.read_csv(path, compression=compression, chunksize=chunksize, usecols=usecols) as reader:
+        yield from reader
+
+
+def _read_jsonl(path: str, compression, chunksize: int, columns) -> Iterator[pd.DataFrame]:
+    with pd.read_json(path, lines=True, compression=compression, chunksize=chunksize,
+                      dtype=False, convert_dates=False) as reader:
+        for chunk in reader:
+            yield _like_csv(chunk, columns)
+
+
+def _read_sqlite(path: str, compression, chunksize: int, columns, table: str = SQLITE_TABLE) -> Iterator[pd.DataFrame]:
+    con = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        tables = [r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+        if table not in tables:
+            if len(tables) != 1:
+                raise ValueError(f"No se encontró la tabla '{table}' en {path} (tablas: {tables})")
+            table = tables[0]
+        available = [r[1] for r in con.execute(f'PRAGMA table_info("{table}")')]
+        cols = available if columns is None else [c for c in available if c in set(columns)]
+        sql = "SELECT " + ", ".join(f'"{c}"' for c in cols) + f' FROM "{table}"'
+        for chunk in pd.read_sql_query(sql, con, chunksize=chunksize):
+            yield _like_csv(chunk)
+    finally:
+        con.close()
+
+
+# formato -> generador(path, compresión, chunksize, columnas)
+READERS: Dict[str, Callable[..., Iterator[pd.DataFrame]]] = {
+    "csv": _read_csv,
+    "jsonl": _read_jsonl,
+    "sqlite": _read_sqlite,
+}
+
+
+def iter_chunks(path: str, chunksize: int = CHUNKSIZE, columns=None, fmt: str | None = None) -> Iterator[pd.DataFrame]:
+    detected, compression = detect_format(path)
+    fmt = fmt or detected
+    if fmt not in READERS:
+        raise ValueError(f"Formato no soportado: {fmt} (opciones: {sorted(READERS)})")
+    if fmt == "sqlite" and compression is not None:
+        raise ValueError("Las bases SQLite comprimidas no se pueden leer en streaming.")
+    return READERS[fmt](path, compression, chunksize, columns)
+
+
+# Columnas de texto como strings respaldados por Arrow (NaN como faltante, igual que object).
+# Con pandas >= 3 + pyarrow ya es el dtype por defecto de read_csv y no se copia nada.
+def to_arrow_strings(df: pd.DataFrame) -> pd.DataFrame:
+    try:
+        dtype = pd.StringDtype("pyarrow", na_value=np.nan)
+    except TypeError:
+        dtype = pd.StringDtype("pyarrow_numpy")
+    text = [c for c in df.columns if df[c].dtype == object or isinstance(df[c].dtype, pd.StringDtype)]
+    text = [c for c in text if df[c].dtype != dtype]
+    return df.astype({c: dtype for c in text}) if text else df
+
+
+# DataFrame completo (concatenando chunks). El CSV plano se lee de una vez, como siempre
+def read_frame(path: str, columns=None, chunksize: int = CHUNKSIZE) -> pd.DataFrame:
+    fmt, compression = detect_format(path)
+    if fmt == "csv" and compression is None:
+        if columns is None:
+            return pd.read_csv(path)
+        wanted = set(columns)
+        return pd.read_csv(path, usecols=lambda c: c in wanted)
+    chunks = list(iter_chunks(path, chunksize, columns))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
@@ -0,0 +1,45 @@
+# Resultado de una pregunta: agregados compactos + frames por fila bajo demanda
+#
+# Las preguntas devolvían, junto con sus pivotes, las explosiones completas ("base") y frames por
+# título; como main() guarda todos los resultados hasta el final, el pico de memoria del reporte
+# sumaba la base de cada pregunta. Result es un dict con solo los agregados; las claves perezosas
+# guardan una función que reconstruye el frame desde el DataFrame original (utils.derived) cada
+# vez que se piden, sin quedar referenciado en el resultado:
+#
+#   res = q7.run(df)
+#   res["pivot_tipo"]        agregado (guardado)
+#   res["base"] / res.base   explosión de directores, reconstruida en el momento
+#
+# items() / values() recorren solo los agregados; lazy_keys() lista las claves perezosas.
+
+from __future__ import annotations
+from typing import Callable, Dict
+
+
+class Result(dict):
+    def __init__(self, data: dict | None = None, lazy: Dict[str, Callable] | None = None):
+        super().__init__(data or {})
+        self._lazy = dict(lazy or {})
+
+    def __missing__(self, key):
+        if key in self._lazy:
+            return self._lazy[key]()
+        raise KeyError(key)
+
+    def __getattr__(self, name):
+        lazy = self.__dict__.get("_lazy", {})
+        if name in lazy:
+            return lazy[name]()
+        raise AttributeError(name)
+
+    def __contains__(self, key) -> bool:
+        return dict.__contains__(self, key) or key in self._lazy
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def lazy_keys(self) -> list:
+        return [k for k in self._lazy if not dict.__contains__(self, k)]
+
+    def __repr__(self) -> str:
+        return f"Result({dict.__repr__(self)}, lazy={self.lazy_keys()})"
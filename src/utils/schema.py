@@ -0,0 +1,135 @@
+# Esquema tipado del CSV de Netflix, validado en una sola pasada vectorizada al cargar
+#
+# Cada columna declara dtype, si es obligatoria, categorías permitidas y/o un regex. validate()
+# arma una máscara booleana por chequeo (operaciones de columna, sin loops por fila) y devuelve:
+# - el DataFrame limpio, con tipos ya convertidos (date_added datetime64, release_year int64,
+#   type sin espacios)
+# - las filas con problemas, con la posición del registro en el CSV y los motivos, para la cuarentena
+#
+# Severidad:
+# - "fila":  la fila se descarta (show_id faltante/duplicado, type desconocido, título o año inválido)
+# - "campo": solo se anula ese valor y la fila sigue (fecha, duración o rating mal cargados); es
+#            lo mismo que hacía errors="coerce" aguas abajo, pero ahora queda registrado
+
+from __future__ import annotations
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    dtype: str                              # "str" | "int" | "date"
+    nullable: bool = True
+    categories: Optional[Tuple[str, ...]] = None
+    pattern: Optional[str] = None           # regex sobre el valor sin espacios al borde
+    severity: str = "campo"                 # "fila" | "campo"
+    date_format: Optional[str] = None
+    min_value: Optional[int] = None
+    max_value: Optional[int] = None
+
+
+RATING_PATTERN = r"(?i)^(TV[- ]?(MA|14|PG|G|Y7([- ]FV)?|Y)|G|PG|PG[- ]?13|R|NC[- ]?17|NR|UR)$"
+DURATION_PATTERN = r"(?i)^\d+\s*(min|seasons?)$"
+DATE_PATTERN = r"^[A-Z][a-z]+ \d{1,2}, \d{4}$"
+
+SCHEMA: Dict[str, ColumnSpec] = {
+    "show_id":      ColumnSpec("str", nullable=False, severity="fila"),
+    "type":         ColumnSpec("str", nullable=False, categories=("Movie", "TV Show"), severity="fila"),
+    "title":        ColumnSpec("str", nullable=False, severity="fila"),
+    "director":     ColumnSpec("str"),
+    "cast":         ColumnSpec("str"),
+    "country":      ColumnSpec("str"),
+    "date_added":   ColumnSpec("date", pattern=DATE_PATTERN, date_format="%B %d, %Y"),
+    "release_year": ColumnSpec("int", nullable=False, severity="fila", min_value=1900, max_value=2100),
+    "rating":       ColumnSpec("str", pattern=RATING_PATTERN),
+    "duration":     ColumnSpec("str", pattern=DURATION_PATTERN),
+    "listed_in":    ColumnSpec("str"),
+    "description":  ColumnSpec("str"),
+}
+
+
+# Devuelve (columna convertida, [(máscara, motivo), ...]) para una columna según su spec
+def _check_column(s: pd.Series, spec: ColumnSpec) -> tuple:
+    present = s.notna()
+    if spec.dtype in ("str", "date"):
+        s = s.where(~present, s.astype(str).str.strip())
+        present = present & (s != "")
+    checks = []
+
+    if spec.dtype == "int":
+        num = pd.to_numeric(s, errors="coerce")
+        checks.append((present & (num.isna() | (num != np.floor(num))), "no es entero"))
+        lo = spec.min_value if spec.min_value is not None else -np.inf
+        hi = spec.max_value if spec.max_value is not None else np.inf
+        checks.append(((num < lo) | (num > hi), f"fuera de rango [{lo}, {hi}]"))
+        s = num
+    elif spec.dtype == "date":
+        fmt_bad = present & ~s.str.match(spec.pattern, na=False) if spec.pattern else present & False
+        parsed = pd.to_datetime(s.where(present & ~fmt_bad), format=spec.date_format, errors="coerce")
+        checks.append((fmt_bad, "formato de fecha inválido"))
+        checks.append((present & ~fmt_bad & parsed.isna(), "fecha inexistente"))
+        s = parsed
+    else:
+        if spec.categories is not None:
+            checks.append((present & ~s.isin(spec.categories), "categoría desconocida"))
+        if spec.pattern is not None:
+            checks.append((present & ~s.str.match(spec.pattern, na=False), "no cumple el formato"))
+
+    if not spec.nullable:
+        checks.append((~present, "vacío"))
+    return s, checks
+
+
+# Valida las columnas presentes de 'df'. Devuelve (df limpio, filas en cuarentena)
+def validate(df: pd.DataFrame, schema: Dict[str, ColumnSpec] = SCHEMA) -> tuple:
+    out = df.copy()
+    reasons = np.full(len(df), "", dtype=object)
+    drop = np.zeros(len(df), dtype=bool)
+
+    for col, spec in schema.items():
+        if col not in df.columns:
+            continue
+        converted, checks = _check_column(df[col], spec)
+        if col == "show_id":
+            checks.append((converted.duplicated(keep="first") & converted.notna(), "duplicado"))
+        bad = np.zeros(len(df), dtype=bool)
+        for mask, motivo in checks:
+            mask = mask.to_numpy(dtype=bool)
+            reasons = reasons + np.where(mask, f"{col}: {motivo}; ", "")
+            bad |= mask
+        if spec.severity == "fila":
+            drop |= bad
+        else:
+            converted = converted.where(~bad)
+        out[col] = converted
+
+    flagged = reasons != ""
+    quarantine = df[flagged].copy()
+    # posición del registro (base 0, sin encabezado): un campo entre comillas puede ocupar varias
+    # líneas físicas, así que no es un número de línea del archivo
+    quarantine.insert(0, "registro", np.flatnonzero(flagged))
+    quarantine["accion"] = np.where(drop[flagged], "descartada", "campo anulado")
+    quarantine["motivos"] = [r.rstrip("; ") for r in reasons[flagged]]
+
+    clean = out[~drop].reset_index(drop=True)
+    if "release_year" in clean.columns:
+        clean["release_year"] = clean["release_year"].astype("int64")
+    return clean, quarantine
+
+
+# Conteo de problemas por motivo (una fila puede sumar en varios)
+def summarize(quarantine: pd.DataFrame) -> pd.Series:
+    if quarantine.empty:
+        return pd.Series(dtype=int, name="filas")
+    return quarantine["motivos"].str.split("; ").explode().value_counts().rename("filas")
+
+
+def write_quarantine(quarantine: pd.DataFrame, path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    quarantine.to_csv(tmp, index=False)
+    os.replace(tmp, path)
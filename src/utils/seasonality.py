@@ -0,0 +1,81 @@
+# Motor de estacionalidad sobre ordinales de día
+#
+# La fecha se convierte una sola vez a ordinales int32 (días desde 1970-01-01) y de ahí salen,
+# con aritmética entera, todas las granularidades de calendario. Cada tabla grano × categoría
+# es un np.bincount sobre la clave combinada (grano * n_categorías + código de categoría), así
+# que todas las granularidades se calculan en una pasada sobre las mismas filas, sin pivot_table.
+#
+# Granularidades:
+# - "month":      mes del año (1..12)
+# - "dow":        día de la semana (0 = lunes .. 6 = domingo)
+# - "iso_week":   semana ISO (1..53)
+# - "year_month": año × mes (PeriodIndex mensual, rango continuo entre la primera y la última fecha)
+
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+GRAINS = ("month", "dow", "iso_week", "year_month")
+DOW_LABELS = ["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"]
+
+
+# Fechas -> ordinales int32 (las fechas inválidas deben filtrarse antes)
+def to_day_ordinals(dates: pd.Series) -> np.ndarray:
+    d = pd.to_datetime(dates, errors="coerce")
+    if d.isna().any():
+        raise ValueError("Hay fechas nulas o inválidas: filtrarlas antes de calcular ordinales.")
+    return d.to_numpy(dtype="datetime64[D]").astype(np.int64).astype(np.int32)
+
+
+# Componentes de calendario de cada ordinal: {grano: (código por fila, cantidad de claves, etiquetas)}
+def calendar_keys(days: np.ndarray, grains=GRAINS) -> dict:
+    days = np.asarray(days, dtype=np.int64)
+    out = {}
+    months_abs = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)  # meses desde 1970-01
+
+    for g in grains:
+        if g == "month":
+            out[g] = (months_abs % 12, 12, pd.RangeIndex(1, 13, name="mes"))
+        elif g == "dow":
+            # 1970-01-01 fue jueves (3 con lunes = 0)
+            out[g] = ((days + 3) % 7, 7, pd.Index(DOW_LABELS, name="dia_semana"))
+        elif g == "iso_week":
+            dow = (days + 3) % 7
+            thursday = days - dow + 3  # la semana ISO pertenece al año de su jueves
+            year_start = thursday.astype("datetime64[D]").astype("datetime64[Y]").astype("datetime64[D]").astype(np.int64)
+            out[g] = ((thursday - year_start) // 7, 53, pd.RangeIndex(1, 54, name="semana_iso"))
+        elif g == "year_month":
+            if len(months_abs) == 0:
+                out[g] = (months_abs, 0, pd.PeriodIndex([], freq="M", name="anio_mes"))
+                continue
+            lo, hi = int(months_abs.min()), int(months_abs.max())
+            labels = pd.period_range(pd.Period(np.datetime64(lo, "M"), freq="M"), periods=hi - lo + 1, freq="M")
+            out[g] = (months_abs - lo, hi - lo + 1, labels.rename("anio_mes"))
+        else:
+            raise ValueError(f"Granularidad desconocida: {g} (opciones: {list(GRAINS)})")
+    return out
+
+
+# Conteos grano × categoría para todas las granularidades pedidas.
+# days: ordinales int32; cat_codes: códigos >= 0 (uno por fila); n_cats: cantidad de categorías.
+def seasonality_counts(days: np.ndarray, cat_codes: np.ndarray, n_cats: int, grains=GRAINS) -> dict:
+    cat_codes = np.asarray(cat_codes, dtype=np.int64)
+    out = {}
+    for g, (keys, n_keys, labels) in calendar_keys(days, grains).items():
+        flat = np.bincount(keys * n_cats + cat_codes, minlength=n_keys * n_cats)
+        out[g] = (flat.reshape(n_keys, n_cats), labels)
+    return out
+
+
+# Versión DataFrame: {grano: DataFrame (grano × categoría)} con categorías en orden alfabético
+def seasonality_tables(dates: pd.Series, categories: pd.Series, grains=GRAINS,
+                       category_name: str = "listed_in") -> dict:
+    codes, cats = pd.factorize(categories, sort=True)
+    if (codes < 0).any():
+        raise ValueError("Hay categorías nulas: filtrarlas antes de calcular la estacionalidad.")
+    days = to_day_ordinals(dates)
+    columns = pd.Index(cats, name=category_name)
+    return {
+        g: pd.DataFrame(grid, index=labels, columns=columns)
+        for g, (grid, labels) in seasonality_counts(days, codes, len(cats), grains).items()
+    }
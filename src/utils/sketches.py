@@ -0,0 +1,110 @@
+# Histogramas mergeables de valores enteros (duraciones en minutos / temporadas)
+#
+# IntHistogram guarda un conteo por valor entero (np.bincount). Dos histogramas se combinan
+# sumando conteos, así que se pueden armar por chunks (o por snapshot) y unir al final sin
+# guardar filas por título. Como cada valor tiene su propio bin, media, mediana y percentiles
+# son exactos (mismo resultado que pandas sobre la serie completa).
+#
+# group_histograms arma un histograma por grupo (tipo, género, país) en una sola pasada,
+# con bincount sobre la clave combinada grupo * ancho + valor.
+
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+
+def _as_int_values(values) -> np.ndarray:
+    v = pd.to_numeric(pd.Series(values), errors="coerce").dropna().to_numpy(dtype=float)
+    if v.size and ((v < 0).any() or (v != np.floor(v)).any()):
+        raise ValueError("IntHistogram solo admite valores enteros >= 0.")
+    return v.astype(np.int64)
+
+
+class IntHistogram:
+    def __init__(self, counts=None):
+        self.counts = np.zeros(0, dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+
+    @classmethod
+    def from_values(cls, values) -> "IntHistogram":
+        return cls(np.bincount(_as_int_values(values)))
+
+    # Suma otro histograma (in place) y devuelve self, para encadenar merges por chunk
+    def merge(self, other: "IntHistogram") -> "IntHistogram":
+        n = max(len(self.counts), len(other.counts))
+        out = np.zeros(n, dtype=np.int64)
+        out[:len(self.counts)] += self.counts
+        out[:len(other.counts)] += other.counts
+        self.counts = out
+        return self
+
+    def update(self, values) -> "IntHistogram":
+        return self.merge(IntHistogram.from_values(values))
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum())
+
+    def mean(self) -> float:
+        n = self.count
+        return float(np.dot(np.arange(len(self.counts)), self.counts)) / n if n else float("nan")
+
+    # Cuantil con interpolación lineal entre estadísticos de orden (igual que pandas/numpy)
+    def quantile(self, q: float) -> float:
+        n = self.count
+        if n == 0:
+            return float("nan")
+        pos = q * (n - 1)
+        lo, hi = int(np.floor(pos)), int(np.ceil(pos))
+        cum = np.cumsum(self.counts)
+        v_lo = np.searchsorted(cum, lo, side="right")
+        v_hi = np.searchsorted(cum, hi, side="right")
+        return float(v_lo + (v_hi - v_lo) * (pos - lo))
+
+    def median(self) -> float:
+        return self.quantile(0.5)
+
+    # (valores presentes, conteos) para graficar con ax.hist(..., weights=conteos)
+    def nonzero(self) -> tuple:
+        vals = np.flatnonzero(self.counts)
+        return vals, self.counts[vals]
+
+    def stats(self, percentiles=(0.25, 0.75, 0.9)) -> dict:
+        if self.count == 0:
+            return {}
+        out = {"count": self.count, "mean": self.mean(), "median": self.median()}
+        for p in percentiles:
+            out[f"p{int(round(p * 100))}"] = self.quantile(p)
+        return out
+
+
+# Un IntHistogram por valor de 'groups' (una sola pasada de bincount)
+def group_histograms(values, groups) -> dict:
+    v = pd.to_numeric(pd.Series(values).reset_index(drop=True), errors="coerce")
+    g = pd.Series(groups).reset_index(drop=True)
+    mask = v.notna() & g.notna()
+    vals = _as_int_values(v[mask])
+    codes, labels = pd.factorize(g[mask], sort=True)
+    if vals.size == 0:
+        return {}
+    width = int(vals.max()) + 1
+    flat = np.bincount(codes.astype(np.int64) * width + vals, minlength=len(labels) * width)
+    grid = flat.reshape(len(labels), width)
+    return {label: IntHistogram(grid[i]) for i, label in enumerate(labels)}
+
+
+# Combina dicts {grupo: IntHistogram} (p. ej. uno por chunk)
+def merge_groups(acc: dict, new: dict) -> dict:
+    for key, h in new.items():
+        if key in acc:
+            acc[key].merge(h)
+        else:
+            acc[key] = IntHistogram(h.counts.copy())
+    return acc
+
+
+# Tabla de estadísticas por grupo a partir de histogramas
+def stats_frame(hists: dict, index_name: str = "grupo") -> pd.DataFrame:
+    rows = {key: h.stats() for key, h in hists.items() if h.count}
+    out = pd.DataFrame.from_dict(rows, orient="index")
+    out.index.name = index_name
+    return out
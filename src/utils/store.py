@@ -0,0 +1,339 @@
+# Almacén de tablas derivadas en disco, mapeadas en memoria (solo lectura, sin re-cleaning)
+#
+# Las tablas de utils.derived (explosiones de países, elenco, directores, géneros, ratings y las
+# que cuelgan de ellas, fechas, duraciones) se escriben una vez. Cada tabla guarda:
+#   - row_id: fila de df de cada fila de la tabla (title_id en las explosiones, la posición del
+#     índice en dates / durations)
+#   - solo las columnas que el cleaning creó o modificó: texto como códigos int32 + vocabulario,
+#     números y fechas como .npy
+# Las columnas que el cleaning no tocó no se guardan: al adjuntar se toman de df por row_id.
+# Los procesos abren las tablas con np.load(mmap_mode="r"), comparten las páginas del page cache
+# y reconstruyen cada tabla (o solo su bloque de filas, para los shards) sin volver a limpiar.
+#
+# Layout:
+#   <root>/manifest.json                        versión publicada (copia del manifest de la versión)
+#   <root>/v000003/manifest.json                 huella de df y descripción de cada tabla
+#   <root>/v000003/<tabla>/row_id.npy            int32, ordenado
+#   <root>/v000003/<tabla>/<i>.npy               columna i: códigos int32 (texto) o valores
+#   <root>/v000003/<tabla>/<i>.vocab.json        valores distintos (solo texto)
+#
+# Concurrencia:
+#   - el número de versión se reserva con os.mkdir del directorio (atómico): dos publicadores
+#     nunca escriben la misma versión
+#   - manifest.json se reemplaza (os.replace) bajo un lock file y solo si la versión es más nueva
+#   - un lector deja un lease en <root>/.leases mientras abre los archivos; el prune no borra
+#     versiones con lease. Una vez mapeados, borrar los archivos no afecta al lector (POSIX)
+
+from __future__ import annotations
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from utils import cleaning as cl
+from utils import derived as dv
+
+MANIFEST = "manifest.json"
+LEASES = ".leases"
+LOCK = ".manifest.lock"
+FORMAT = 3
+LEASE_TTL = 300.0      # segundos; un lease más viejo es de un lector que murió
+LOCK_TIMEOUT = 30.0
+
+
+def _genres(df: pd.DataFrame) -> pd.DataFrame:
+    return cl.add_genre_from_listed_in(cl.explode_listed_in(df))
+
+# entidad -> (columnas de entrada, función de cleaning, columna resultante); lo usa utils.postings
+DERIVED_TABLES: Dict[str, tuple] = {
+    "countries": (["country"], cl.expand_and_normalize_countries, "country_final"),
+    "cast": (["cast"], cl.expand_and_normalize_cast, "cast_final"),
+    "directors": (["director"], cl.expand_and_normalize_directors, "director_final"),
+    "genres": (["listed_in"], _genres, "genre_main"),
+    "ratings": (["rating"], cl.normalize_and_explode_ratings, "rating_norm"),
+}
+
+
+@dataclass(frozen=True)
+class MappedTable:
+    name: str
+    version: int
+    row_id: np.ndarray              # memmap int32, ordenado
+    columns: List[list]             # [columna, tipo, dtype] en el orden de la tabla
+    arrays: Dict[str, np.ndarray]   # memmap: códigos (texto) o valores
+    vocabs: Dict[str, List[str]]
+    aligned: bool                   # índice = índice de df (dates, durations); si no, 0..n-1
+
+    def __len__(self) -> int:
+        return len(self.row_id)
+
+    # La tabla derivada de df, o de su bloque de filas [lo, hi) (df = ese bloque), sin cleaning
+    def to_frame(self, df: pd.DataFrame, lo: int = 0) -> pd.DataFrame:
+        a, b = np.searchsorted(self.row_id, [lo, lo + len(df)])
+        rows = np.asarray(self.row_id[a:b], dtype=np.int64) - lo
+        src = df.iloc[rows]
+        data = {}
+        for col, kind, dtype in self.columns:
+            if kind == "source":
+                data[col] = src[col].array
+            elif kind == "row":
+                data[col] = rows
+            elif kind == "text":
+                codes = np.asarray(self.arrays[col][a:b])
+                values = np.asarray(self.vocabs[col] + [None], dtype=object)[codes]
+                data[col] = values if dtype == "object" else pd.array(values, dtype=dtype)
+            else:
+                data[col] = self.arrays[col][a:b]
+        index = src.index if self.aligned else pd.RangeIndex(len(rows))
+        return pd.DataFrame(data, index=index)
+
+
+# Huella del contenido de df (valores, índice, columnas y dtypes)
+def fingerprint(df: pd.DataFrame) -> str:
+    h = hashlib.sha1()
+    h.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+# Fila de df de cada fila de 'table' y si el índice está alineado con df; None si no se puede mapear
+def _row_ids(table: pd.DataFrame, df: pd.DataFrame):
+    if "title_id" in table.columns:
+        rows, aligned = table["title_id"].to_numpy(dtype=np.int64), False
+    elif df.index.is_unique:
+        rows, aligned = df.index.get_indexer(table.index).astype(np.int64), True
+    else:
+        return None
+    if (rows < 0).any() or (np.diff(rows) < 0).any():
+        return None
+    return rows, aligned
+
+
+def _is_array(s: pd.Series) -> bool:
+    return isinstance(s.dtype, np.dtype) and s.dtype.kind in "biufmM"
+
+
+def _save_npy(path: str, arr: np.ndarray) -> None:
+    with open(path, "wb") as fh:
+        np.save(fh, np.ascontiguousarray(arr))
+        fh.flush()
+        os.fsync(fh.fileno())
+
+
+def _write_json(path: str, obj) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(obj, fh, ensure_ascii=False, indent=2)
+        fh.flush()
+        os.fsync(fh.fileno())
+
+
+# Escribe 'table' en 'path'; devuelve su entrada del manifest (None si no se puede mapear a df)
+def _write_table(path: str, table: pd.DataFrame, df: pd.DataFrame):
+    mapped = _row_ids(table, df)
+    if mapped is None:
+        return None
+    rows, aligned = mapped
+    os.makedirs(path)
+    _save_npy(os.path.join(path, "row_id.npy"), rows.astype(np.int32))
+    src = df.iloc[rows].reset_index(drop=True)
+    columns = []
+    for i, col in enumerate(table.columns):
+        s = table[col].reset_index(drop=True)
+        if col == "title_id" and np.array_equal(s.to_numpy(), rows):
+            columns.append([col, "row", str(s.dtype)])
+        elif col in src.columns and s.equals(src[col]):
+            columns.append([col, "source", str(s.dtype)])
+        elif _is_array(s):
+            _save_npy(os.path.join(path, f"{i}.npy"), s.to_numpy())
+            columns.append([col, "array", str(s.dtype)])
+        else:
+            codes, vocab = pd.factorize(s, sort=True)
+            _save_npy(os.path.join(path, f"{i}.npy"), codes.astype(np.int32))
+            _write_json(os.path.join(path, f"{i}.vocab.json"), [str(v) for v in vocab])
+            columns.append([col, "text", str(s.dtype)])
+    return {"n_rows": int(len(rows)), "aligned": aligned, "columns": columns}
+
+
+def read_manifest(root: str, version: int | None = None) -> dict:
+    path = os.path.join(root, MANIFEST) if version is None else os.path.join(root, f"v{version:06d}", MANIFEST)
+    if not os.path.isfile(path):
+        return {"format": FORMAT, "version": 0, "tables": {}}
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _versions(root: str) -> list:
+    return sorted(int(e[1:]) for e in os.listdir(root) if e.startswith("v") and e[1:].isdigit())
+
+
+# Reserva la siguiente versión creando su directorio (os.mkdir falla si otro la tomó)
+def _reserve_version(root: str) -> int:
+    version = max([read_manifest(root)["version"], *_versions(root)]) + 1
+    while True:
+        try:
+            os.mkdir(os.path.join(root, f"v{version:06d}"))
+            return version
+        except FileExistsError:
+            version += 1
+
+
+class _Lock:
+    def __init__(self, path: str, timeout: float = LOCK_TIMEOUT) -> None:
+        self.path = path
+        self.timeout = timeout
+
+    def __enter__(self):
+        t0 = time.monotonic()
+        while True:
+            try:
+                os.close(os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return self
+            except FileExistsError:
+                if time.monotonic() - t0 > self.timeout:
+                    raise TimeoutError(f"No se pudo tomar el lock '{self.path}'.") from None
+                time.sleep(0.01)
+
+    def __exit__(self, *exc) -> None:
+        os.remove(self.path)
+
+
+# Construye las tablas derivadas 'tables' de df (todas por defecto, con sus dependencias) y las
+# publica como una nueva versión; devuelve la versión
+def publish_derived_tables(df: pd.DataFrame, root: str, tables=None, keep: int = 2) -> int:
+    names = dv.closure(tables or dv.TABLES)
+    os.makedirs(root, exist_ok=True)
+    version = _reserve_version(root)
+    vdir_name = f"v{version:06d}"
+    vdir = os.path.join(root, vdir_name)
+
+    entries = {}
+    try:
+        built = {}
+        for name in names:
+            entry = _write_table(os.path.join(vdir, name), dv.get(name, df, built), df)
+            if entry is not None:
+                entries[name] = dict(entry, path=f"{vdir_name}/{name}")
+        manifest = {"format": FORMAT, "version": version, "source": fingerprint(df),
+                    "source_rows": int(len(df)), "tables": entries,
+                    "skipped": [n for n in names if n not in entries]}
+        _write_json(os.path.join(vdir, MANIFEST), manifest)
+    except BaseException:
+        shutil.rmtree(vdir, ignore_errors=True)
+        raise
+
+    with _Lock(os.path.join(root, LOCK)):
+        if read_manifest(root)["version"] < version:
+            tmp_manifest = os.path.join(root, f".{MANIFEST}.{uuid.uuid4().hex[:8]}")
+            _write_json(tmp_manifest, manifest)
+            os.replace(tmp_manifest, os.path.join(root, MANIFEST))
+        current = read_manifest(root)["version"]
+
+    _prune_versions(root, keep=keep, current=current)
+    return version
+
+
+def _leased(root: str, version: int) -> bool:
+    ldir = os.path.join(root, LEASES)
+    if not os.path.isdir(ldir):
+        return False
+    now = time.time()
+    for entry in os.listdir(ldir):
+        if entry.startswith(f"v{version:06d}-"):
+            try:
+                if now - os.path.getmtime(os.path.join(ldir, entry)) < LEASE_TTL:
+                    return True
+            except OSError:
+                continue
+    return False
+
+
+# Borra versiones viejas sin lease. El directorio se aparta con rename antes de mirar los leases:
+# un lector que llegó a tomar lease lo recupera; uno que llega después ya no lo encuentra y reintenta
+def _prune_versions(root: str, keep: int, current: int) -> None:
+    for version in _versions(root):
+        if version > current - keep:
+            continue
+        vdir = os.path.join(root, f"v{version:06d}")
+        trash = os.path.join(root, f".trash-v{version:06d}-{uuid.uuid4().hex[:8]}")
+        try:
+            os.rename(vdir, trash)
+        except OSError:
+            continue
+        if _leased(root, version):
+            os.rename(trash, vdir)
+        else:
+            shutil.rmtree(trash, ignore_errors=True)
+
+
+def _open_tables(root: str, manifest: dict, tables) -> Dict[str, MappedTable]:
+    out = {}
+    for name in tables or manifest["tables"]:
+        entry = manifest["tables"][name]
+        path = os.path.join(root, entry["path"])
+        arrays, vocabs = {}, {}
+        for i, (col, kind, _) in enumerate(entry["columns"]):
+            if kind in ("array", "text"):
+                arrays[col] = np.load(os.path.join(path, f"{i}.npy"), mmap_mode="r")
+            if kind == "text":
+                with open(os.path.join(path, f"{i}.vocab.json"), encoding="utf-8") as fh:
+                    vocabs[col] = json.load(fh)
+        out[name] = MappedTable(
+            name=name,
+            version=manifest["version"],
+            row_id=np.load(os.path.join(path, "row_id.npy"), mmap_mode="r"),
+            columns=entry["columns"],
+            arrays=arrays,
+            vocabs=vocabs,
+            aligned=entry["aligned"],
+        )
+    return out
+
+
+# Abre (mmap, solo lectura) las tablas de la versión publicada, o de 'version' si se indica
+def attach_derived_tables(root: str, tables=None, version: int | None = None,
+                          retries: int = 5) -> Dict[str, MappedTable]:
+    ldir = os.path.join(root, LEASES)
+    os.makedirs(ldir, exist_ok=True)
+    for attempt in range(retries):
+        manifest = read_manifest(root, version)
+        if manifest["version"] == 0:
+            raise FileNotFoundError(f"No hay tablas publicadas en '{root}'" +
+                                    (f" (versión {version})." if version is not None else "."))
+        if manifest.get("format") != FORMAT:
+            raise ValueError(f"Formato de almacén no soportado: {manifest.get('format')}")
+        lease = os.path.join(ldir, f"v{manifest['version']:06d}-{os.getpid()}-{uuid.uuid4().hex[:8]}")
+        open(lease, "w").close()
+        try:
+            return _open_tables(root, manifest, tables)
+        except FileNotFoundError:
+            # la versión se podó entre leer el manifest y tomar el lease
+            if version is not None or attempt == retries - 1:
+                raise
+        finally:
+            os.remove(lease)
+
+
+# Tablas 'tables' de df: se adjuntan si la versión publicada es de este mismo df y las tiene
+# todas; si no, se publican primero. Devuelve las que se pudieron mapear
+def open_derived_tables(df: pd.DataFrame, root: str, tables=None) -> Dict[str, MappedTable]:
+    names = dv.closure(tables or dv.TABLES)
+    manifest = read_manifest(root)
+    fresh = manifest.get("format") == FORMAT and manifest.get("source") == fingerprint(df) and \
+        set(names) <= set(manifest["tables"]) | set(manifest.get("skipped", ()))
+    if not fresh:
+        version = publish_derived_tables(df, root, names)
+        print(f"[store] Tablas derivadas publicadas en '{root}' (versión {version}).")
+        manifest = read_manifest(root, version)
+    mapped = attach_derived_tables(root, [n for n in names if n in manifest["tables"]], manifest["version"])
+    return mapped
+
+
+def required_tables(questions: Iterable) -> list:
+    return dv.closure(t for _, mod, _ in questions for t in mod.TABLES)
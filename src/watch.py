@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+# Modo watch: mantiene el proceso caliente y re-corre solo lo que cambió en el dataset.
+#
+# 1. Primera corrida completa; las tablas derivadas quedan en un caché (el scheduler no las libera)
+#    y los memos de canonicalización de utils.cleaning quedan calientes.
+# 2. Cada 'interval' segundos se mira (mtime_ns, tamaño) de DATA_PATH. Un cambio se procesa
+#    recién cuando la firma se repite en dos sondeos seguidos (archivo a medio copiar).
+# 3. Diff contra la versión en memoria por show_id: filas nuevas, borradas y modificadas, y qué
+#    columnas cambiaron. Una fila nueva o borrada cambia solo las columnas que tiene con valor;
+#    si se reordenan las filas que siguen (desempates por orden) cuentan todas las columnas.
+# 4. Del caché se descartan solo las tablas que contienen alguna columna cambiada (y las que
+#    dependen de ellas); si cambió el conjunto de filas se descarta todo, porque las tablas están
+#    indexadas por posición. Se re-corren solo las preguntas cuyo COLUMNS toca una columna cambiada.
+# 5. Los PNG se renderizan en memoria y solo se reescriben si cambiaron los bytes.
+#
+# Uso:
+#   python main.py --watch
+#   python main.py --watch --watch-interval 5 --only q3,q7
+
+from __future__ import annotations
+import os
+import time
+import threading
+from dataclasses import dataclass
+from typing import Callable, FrozenSet
+
+import numpy as np
+import pandas as pd
+
+import main as pipeline
+from utils import derived as dv
+from utils import plot_style as ps
+
+INTERVAL = 2.0
+KEY = "show_id"
+
+
+@dataclass(frozen=True)
+class FrameDiff:
+    added: int
+    removed: int
+    modified: int
+    columns: FrozenSet[str]      # columnas cuyo contenido cambió (todas si se reordenan las filas)
+    rows_changed: bool           # filas nuevas, borradas o reordenadas
+    reordered: bool = False      # las filas que siguen cambiaron de orden relativo
+
+    @property
+    def empty(self) -> bool:
+        return not self.columns
+
+
+# (mtime_ns, tamaño) del archivo, o None si no existe (p. ej. en medio de un reemplazo)
+def file_signature(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+# Diff de dos versiones del dataset alineadas por 'key'. Sin clave (o con claves repetidas)
+# no se puede alinear: se considera que cambió todo
+def diff_frames(old: pd.DataFrame, new: pd.DataFrame, key: str = KEY) -> FrameDiff:
+    all_cols = frozenset(old.columns) | frozenset(new.columns)
+    if key not in old.columns or key not in new.columns or old[key].duplicated().any() or new[key].duplicated().any():
+        return FrameDiff(len(new), len(old), 0, all_cols, True, True)
+
+    pos = pd.Index(old[key]).get_indexer(pd.Index(new[key]))  # -1 = fila nueva
+    common = np.flatnonzero(pos >= 0)
+    added = len(new) - len(common)
+    removed = len(old) - len(common)
+    rows_changed = added > 0 or removed > 0 or not np.array_equal(pos, np.arange(len(new)))
+    reordered = bool(np.any(np.diff(pos[common]) < 0))
+
+    columns = set(all_cols - (frozenset(old.columns) & frozenset(new.columns)))
+    modified = np.zeros(len(new), dtype=bool)
+    for col in new.columns.intersection(old.columns):
+        a = old[col].to_numpy(dtype=object)[pos[common]]
+        b = new[col].to_numpy(dtype=object)[common]
+        na_a, na_b = pd.isna(a), pd.isna(b)
+        neq = (na_a != na_b) | (~na_a & ~na_b & (a != b))
+        if neq.any():
+            columns.add(col)
+            modified[common[neq]] = True
+
+    # filas nuevas (en new) y borradas (en old): cambian las columnas que tienen con valor
+    gone = np.setdiff1d(np.arange(len(old)), pos[common])
+    for frame, rows in ((new, np.flatnonzero(pos < 0)), (old, gone)):
+        if len(rows):
+            present = frame.iloc[rows].notna().any()
+            columns.update(present.index[present.to_numpy()])
+
+    if reordered:
+        columns = set(all_cols)
+    return FrameDiff(added, removed, int(modified.sum()), frozenset(columns), rows_changed, reordered)
+
+
+# Preguntas (de QUESTIONS) que leen alguna de las columnas cambiadas
+def affected_questions(questions: list, columns) -> list:
+    columns = set(columns)
+    return [q for q in questions if columns & set(q[1].COLUMNS)]
+
+
+# Quita del caché las tablas que declaran alguna columna cambiada (utils.derived: cada tabla solo
+# lleva sus columnas declaradas) y las que dependen de ellas
+def invalidate(cache: dict, columns) -> list:
+    columns = set(columns)
+    stale = []
+    for name in dv.closure(list(cache)):
+        if name not in cache:
+            continue
+        if set(dv.TABLES[name][2]) & columns or any(d in stale for d in dv.deps(name)):
+            stale.append(name)
+    for name in stale:
+        del cache[name]
+    return stale
+
+
+# Sink de figuras: escribe el PNG solo si cambió respecto del que ya está en disco
+class _PngWriter:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.written = 0
+        self.unchanged = 0
+
+    def __call__(self, path: str, data: bytes) -> None:
+        try:
+            with open(path, "rb") as fh:
+                same = fh.read() == data
+        except OSError:
+            same = False
+        if not same:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp = f"{path}.tmp{threading.get_ident()}"
+            with open(tmp, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, path)
+        with self._lock:
+            if same:
+                self.unchanged += 1
+            else:
+                self.written += 1
+
+
+def _load(path: str, columns, prepare: Callable | None) -> pd.DataFrame:
+    df = pipeline.load_dataset(path, columns=columns)
+    return prepare(df) if prepare is not None else df
+
+
+# Corre 'questions' con las figuras pasando por 'writer' y las tablas en 'cache'
+def _run(df: pd.DataFrame, outdir: str, questions: list, cache: dict, writer: _PngWriter) -> dict:
+    writer.reset()
+    with ps.figure_sink(writer):
+        results, _ = pipeline.run_all_with_stages(df, outdir=outdir, questions=questions, cache=cache)
+    return results
+
+
+def _describe(d: FrameDiff) -> str:
+    rows = f"+{d.added} / -{d.removed} / ~{d.modified} filas"
+    cols = "todas (cambió el orden de las filas)" if d.reordered else ", ".join(sorted(d.columns))
+    return f"{rows}; columnas: {cols}"
+
+
+# Loop de sondeo. 'cycles' acota la cantidad de sondeos (None = hasta Ctrl+C)
+def watch(path: str, outdir: str, questions: list, columns: list | None = None,
+          prepare: Callable | None = None, interval: float = INTERVAL, cycles: int | None = None) -> dict:
+    if interval <= 0:
+        raise ValueError(f"El intervalo de sondeo debe ser positivo: {interval}")
+    if columns is not None and KEY not in columns:
+        columns = columns + [KEY]
+
+    cache, writer = {}, _PngWriter()
+    signature = file_signature(path)
+    t0 = time.perf_counter()
+    df = _load(path, columns, prepare)
+    results = _run(df, outdir, questions, cache, writer)
+    pipeline.report(results)
+    print(f"[watch] Corrida inicial: {len(df)} filas, {len(questions)} preguntas, PNG: {writer.written} escritos, "
+          f"{writer.unchanged} sin cambios ({time.perf_counter() - t0:.2f}s).")
+    print(f"[watch] Vigilando '{path}' cada {interval:g}s (Ctrl+C para salir).")
+
+    seen, polls = signature, 0
+    try:
+        while cycles is None or polls < cycles:
+            time.sleep(interval)
+            polls += 1
+            current = file_signature(path)
+            stable = current == seen
+            seen = current
+            if current is None or current == signature or not stable:
+                continue
+
+            t0 = time.perf_counter()
+            try:
+                new = _load(path, columns, prepare)
+            except (OSError, ValueError, pd.errors.ParserError) as e:
+                print(f"[watch] No se pudo leer '{path}' ({e}); se reintenta en el próximo sondeo.")
+                continue
+            signature = current
+            d = diff_frames(df, new)
+            if d.empty:
+                print("[watch] El archivo cambió pero los datos son los mismos.")
+                continue
+
+            affected = affected_questions(questions, d.columns)
+            if d.rows_changed:
+                stale = list(cache)
+                cache.clear()
+            else:
+                stale = invalidate(cache, d.columns)
+            df = new
+            refreshed = _run(df, outdir, affected, cache, writer) if affected else {}
+            results.update(refreshed)
+            pipeline.report(refreshed)
+            print(f"[watch] {_describe(d)}")
+            print(f"[watch] Preguntas re-corridas: {', '.join(k for k, _, _ in affected) or '-'}; "
+                  f"tablas invalidadas: {', '.join(stale) or '-'}; PNG: {writer.written} actualizados, "
+                  f"{writer.unchanged} sin cambios ({time.perf_counter() - t0:.2f}s).")
+    except KeyboardInterrupt:
+        print("[watch] Fin.")
+    return results